@@ -0,0 +1,114 @@
+"""
+Memory profile of the streaming CSV exports.
+
+Seeds a throwaway test database with N orders, then drains
+export_orders_csv and export_customers_csv while sampling traced Python
+memory every 10% of the rows. Flat "current" numbers mean memory does
+not grow with history.
+
+    python -m benchmarks.export_memory --orders 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'laundry_system.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from laundry import views  # noqa: E402
+from laundry.models import Customer, LaundryOrder  # noqa: E402
+
+BATCH = 20000
+STATUSES = [code for code, _ in LaundryOrder.ORDER_STATUS]
+PAYMENTS = [code for code, _ in LaundryOrder.PAYMENT_STATUS]
+
+
+def seed(orders, customers):
+    User = get_user_model()
+    admin = User.objects.create_user(username='bench-admin', password='x', user_type='admin')
+    Customer.objects.bulk_create(
+        (Customer(name=f'Customer {i}', phone=f'080{i:08d}', registered_by=admin) for i in range(customers)),
+        batch_size=BATCH,
+    )
+    customer_ids = list(Customer.objects.values_list('pk', flat=True))
+    today = timezone.now().date()
+    for start in range(0, orders, BATCH):
+        with transaction.atomic():
+            LaundryOrder.objects.bulk_create([
+                LaundryOrder(
+                    order_number=f'LAU-BENCH-{i:07d}',
+                    customer_id=customer_ids[i % len(customer_ids)],
+                    staff=admin,
+                    total_price=i % 9000 + 500,
+                    amount_paid=i % 500,
+                    balance=i % 9000,
+                    status=STATUSES[i % len(STATUSES)],
+                    payment_status=PAYMENTS[i % len(PAYMENTS)],
+                    expected_delivery_date=today,
+                )
+                for i in range(start, min(start + BATCH, orders))
+            ])
+        print(f"\rseeded {min(start + BATCH, orders)}/{orders} orders", end='', file=sys.stderr)
+    print(file=sys.stderr)
+    return admin
+
+
+def profile(name, view, user, expected_rows):
+    request = RequestFactory().get('/')
+    request.user = user
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = view(request)
+    first_byte = None
+    rows = 0
+    step = max(1, expected_rows // 10)
+    next_sample = step
+    samples = []
+    for block in response.streaming_content:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        rows += block.count(b'\n')
+        if rows >= next_sample:
+            current, peak = tracemalloc.get_traced_memory()
+            samples.append((rows, current, peak))
+            next_sample += step
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n{name}: {rows - 1} rows in {elapsed:.1f}s, first byte after {first_byte * 1000:.0f} ms")
+    print(f"{'rows':>10} {'current KiB':>12} {'peak KiB':>10}")
+    for sample_rows, sample_current, sample_peak in samples:
+        print(f"{sample_rows:>10} {sample_current // 1024:>12} {sample_peak // 1024:>10}")
+    print(f"{'end':>10} {current // 1024:>12} {peak // 1024:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--customers', type=int, default=50000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        admin = seed(args.orders, min(args.customers, args.orders) or 1)
+        profile('export_orders_csv', views.export_orders_csv, admin, args.orders)
+        profile('export_customers_csv', views.export_customers_csv, admin, Customer.objects.count())
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""
+Concurrent front-desk load test.
+
+Simulates N counter terminals, each logged in as its own staff account and
+working through a scripted mix of the front desk's requests: dashboard
+hits, search-as-you-type lookups, order lists, customer pages, new orders
+(form, then POST with a few items) and item additions to the orders it
+created. Terminal 0 is the manager's desk (bench-admin) and also pulls the
+CSV exports now and then. Terminals send their next request as soon as the
+last one is answered, unless ``--think-ms`` adds a pause.
+
+Targets:
+
+    wsgi  laundry_system.wsgi served over localhost by Django's threaded
+          WSGI server in this process (one thread per request, like a
+          threaded WSGI deployment)
+    asgi  laundry_system.asgi called in-process from one event loop, the way
+          a single uvicorn worker runs it (sync views share one thread)
+    --url an already running server; the database it uses must have been
+          seeded with ``manage.py seed_benchmark --staff N``
+
+For wsgi/asgi a throwaway database is created and seeded first. Each level
+of ``--terminals`` runs for ``--duration`` seconds and reports throughput,
+p50/p95/p99 latency and the error rate per endpoint; "database-locked" counts
+requests that failed with SQLite's "database is locked" (in-process targets
+only).
+
+    python -m benchmarks.load_test --terminals 1 2 4 8 16 --duration 20
+    python -m benchmarks.load_test --target asgi --terminals 4 8
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --terminals 8
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'laundry_system.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler  # noqa: E402
+from django.db import OperationalError, connection  # noqa: E402
+from django.test.utils import override_settings, setup_databases, teardown_databases  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from laundry.models import ClothingType, Customer, LaundryOrder  # noqa: E402
+
+PASSWORD = 'benchmark'
+# Relative frequency of each action at a counter terminal
+STAFF_MIX = {
+    'dashboard': 2, 'quick_search': 4, 'order_list': 2, 'customer_detail': 1,
+    'create_order': 2, 'add_order_items': 2,
+}
+MANAGER_MIX = {**STAFF_MIX, 'export_orders_csv': 0.2, 'export_customers_csv': 0.1}
+REQUEST_TIMEOUT = 60
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def header(self, name):
+        return next((value for key, value in self.headers if key.lower() == name), None)
+
+
+class Terminal:
+    """One counter terminal: a session and its scripted requests"""
+
+    def __init__(self, index, username, fixtures, seed):
+        self.username = username
+        self.mix = MANAGER_MIX if index == 0 else STAFF_MIX
+        self.fixtures = fixtures
+        self.rng = random.Random(seed * 1000 + index)
+        self.cookies = {}
+        self.my_orders = []
+
+    def prepare(self, method, path, form=None):
+        """``(method, path, headers, body)`` with this session's cookies and CSRF token"""
+        headers = [('Host', 'localhost')]
+        if self.cookies:
+            headers.append(('Cookie', '; '.join(f'{key}={value}' for key, value in self.cookies.items())))
+        body = b''
+        if method == 'POST':
+            body = urlencode(form or {}, doseq=True).encode()
+            headers += [
+                ('Content-Type', 'application/x-www-form-urlencoded'),
+                ('Content-Length', str(len(body))),
+                ('X-CSRFToken', self.cookies.get('csrftoken', '')),
+            ]
+        return method, path, headers, body
+
+    def absorb(self, response):
+        for key, value in response.headers:
+            if key.lower() == 'set-cookie':
+                for name, morsel in SimpleCookie(value).items():
+                    self.cookies[name] = morsel.value
+
+    def login(self):
+        """Generator of ``(endpoint, method, path, form, ok)`` that logs in; receives Responses"""
+        yield 'login form', 'GET', '/accounts/login/', None, (200,)
+        response = yield 'login', 'POST', '/accounts/login/', {
+            'username': self.username, 'password': PASSWORD,
+        }, (302,)
+        if response.status != 302:
+            raise RuntimeError(f"{self.username} could not log in ({response.status})")
+
+    def script(self):
+        """Endless generator of the terminal's requests (same protocol as login)"""
+        names, weights = zip(*self.mix.items())
+        fixtures, rng = self.fixtures, self.rng
+        while True:
+            action = rng.choices(names, weights)[0]
+            if action == 'dashboard':
+                yield action, 'GET', '/', None, (200,)
+            elif action == 'quick_search':
+                # Typing: one request per keystroke after the second
+                term = rng.choice(fixtures['search_terms'])
+                for length in range(2, len(term) + 1):
+                    yield action, 'GET', '/search/?' + urlencode({'q': term[:length]}), None, (200,)
+            elif action == 'order_list':
+                query = rng.choice(['', '?status=pending', '?payment=pending', '?q=' + rng.choice(fixtures['names'])])
+                yield action, 'GET', '/orders/' + query, None, (200,)
+            elif action == 'customer_detail':
+                yield action, 'GET', f"/customers/{rng.choice(fixtures['customers'])}/", None, (200,)
+            elif action == 'create_order':
+                yield 'create_order form', 'GET', '/order/new/', None, (200,)
+                form = {
+                    'order-customer': rng.choice(fixtures['customers']),
+                    'order-expected_delivery_date': fixtures['delivery_date'],
+                    'items-TOTAL_FORMS': 0, 'items-INITIAL_FORMS': 0,
+                }
+                for index in range(rng.randint(1, 5)):
+                    form.update({
+                        f'items-{index}-clothing_type': rng.choice(fixtures['clothing']),
+                        f'items-{index}-quantity': rng.randint(1, 4),
+                        f'items-{index}-washing': 'on',
+                    })
+                    form['items-TOTAL_FORMS'] = index + 1
+                response = yield action, 'POST', '/order/new/', form, (302,)
+                location = response.header('location') or ''
+                if response.status == 302 and location.rstrip('/').split('/')[-1].isdigit():
+                    self.my_orders = (self.my_orders + [int(location.rstrip('/').split('/')[-1])])[-20:]
+            elif action == 'add_order_items':
+                order = rng.choice(self.my_orders or fixtures['orders'])
+                yield action, 'POST', f'/order/{order}/add-items/', {
+                    'item_id': rng.choice(fixtures['clothing']), 'quantity': rng.randint(1, 3), 'washing': 'on',
+                }, (302,)
+            else:
+                yield action, 'GET', {'export_orders_csv': '/orders/export/',
+                                      'export_customers_csv': '/customers/export/'}[action], None, (200,)
+
+
+# Transports -------------------------------------------------------------------
+
+def http_request(host, port, method, path, headers, body):
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+    try:
+        conn.putrequest(method, path, skip_host=True, skip_accept_encoding=True)
+        for key, value in headers:
+            conn.putheader(key, value)
+        conn.putheader('Connection', 'close')
+        conn.endheaders(body or None)
+        response = conn.getresponse()
+        return Response(response.status, response.getheaders(), response.read())
+    finally:
+        conn.close()
+
+
+async def asgi_request(application, method, path, headers, body):
+    """One HTTP request straight into an ASGI application"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(key.lower().encode(), value.encode()) for key, value in headers],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+    status, response_headers, chunks = None, [], []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            response_headers = [(key.decode(), value.decode()) for key, value in message.get('headers', [])]
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                finished.set()
+
+    await application(scope, receive, send)
+    finished.set()
+    return Response(status, response_headers, b''.join(chunks))
+
+
+# Drivers ----------------------------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, elapsed, ok):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def run_threads(terminals, host, port, duration, think, results):
+    stop = threading.Event()
+    ready = threading.Barrier(len(terminals) + 1)
+
+    def call(terminal, request):
+        method, path, headers, body = terminal.prepare(*request)
+        try:
+            response = http_request(host, port, method, path, headers, body)
+        except OSError as exc:
+            response = Response(599, [], str(exc).encode())
+        terminal.absorb(response)
+        return response
+
+    def worker(terminal):
+        try:
+            drive(terminal.login(), lambda request: call(terminal, request), None)
+        finally:
+            ready.wait()
+        script = terminal.script()
+        drive(script, lambda request: call(terminal, request), results, stop, think, terminal.rng)
+
+    threads = [threading.Thread(target=worker, args=(terminal,), daemon=True) for terminal in terminals]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def drive(script, call, results, stop=None, think=0, rng=None):
+    """Feed ``script``'s requests to ``call`` until it ends or ``stop`` is set"""
+    try:
+        endpoint, method, path, form, ok = next(script)
+        while stop is None or not stop.is_set():
+            started = time.perf_counter()
+            response = call((method, path, form))
+            if results is not None:
+                results.record(endpoint, time.perf_counter() - started, response.status in ok)
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+            endpoint, method, path, form, ok = script.send(response)
+    except StopIteration:
+        pass
+
+
+def run_asgi(terminals, application, duration, think, results):
+    async def call(terminal, request):
+        method, path, headers, body = terminal.prepare(*request)
+        response = await asgi_request(application, method, path, headers, body)
+        terminal.absorb(response)
+        return response
+
+    async def drive_async(terminal, script, measure, stop):
+        try:
+            endpoint, method, path, form, ok = next(script)
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = await call(terminal, (method, path, form))
+                if measure:
+                    results.record(endpoint, time.perf_counter() - started, response.status in ok)
+                    if think:
+                        await asyncio.sleep(terminal.rng.expovariate(1 / think))
+                endpoint, method, path, form, ok = script.send(response)
+        except StopIteration:
+            pass
+
+    async def main():
+        never = asyncio.Event()
+        await asyncio.gather(*(drive_async(terminal, terminal.login(), False, never) for terminal in terminals))
+        stop = asyncio.Event()
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(drive_async(terminal, terminal.script(), True, stop)) for terminal in terminals]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+# Setup and reporting ----------------------------------------------------------
+
+class LockCounter(logging.Handler):
+    """Counts requests that failed with SQLite's "database is locked" (from django.request)"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        exc = record.exc_info and record.exc_info[1]
+        if isinstance(exc, OperationalError) and 'locked' in str(exc):
+            self.count += 1
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def load_fixtures():
+    """IDs and search terms the terminals pick from"""
+    customers = list(Customer.objects.order_by('?').values_list('pk', 'name', 'phone')[:500])
+    if not customers:
+        raise SystemExit("No customers: seed the database with manage.py seed_benchmark first")
+    return {
+        'customers': [pk for pk, _, _ in customers],
+        'names': sorted({name.split()[0] for _, name, _ in customers}),
+        'search_terms': [name.split()[-1] for _, name, _ in customers[:50]] + [phone[-4:] for _, _, phone in customers[:50]],
+        'clothing': list(ClothingType.objects.filter(is_active=True).values_list('pk', flat=True)),
+        'orders': list(LaundryOrder.objects.order_by('-pk').values_list('pk', flat=True)[:200]),
+        'delivery_date': timezone.localdate().isoformat(),
+    }
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(count, elapsed, results, locked):
+    total = sum(len(latencies) for latencies in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f"\n{count} terminal(s): {total / elapsed:.1f} req/s, {errors} error(s)"
+          + (f", {locked} database-locked" if locked is not None else ''))
+    print(f"  {'endpoint':<22} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    endpoints = {}
+    for endpoint in sorted(results.latencies):
+        latencies = sorted(results.latencies[endpoint])
+        row = {
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed,
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'error_rate': results.errors[endpoint] / len(latencies),
+        }
+        endpoints[endpoint] = row
+        print(f"  {endpoint:<22} {row['requests']:>8} {row['rps']:>7.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['error_rate']:>7.1%}")
+    return {
+        'terminals': count, 'seconds': elapsed, 'requests': total, 'rps': total / elapsed,
+        'errors': errors, 'database_locked': locked, 'endpoints': endpoints,
+    }
+
+
+def run_level(args, count, fixtures, target):
+    usernames = ['bench-admin'] + [f'bench-staff-{n}' for n in range(1, count)]
+    terminals = [Terminal(index, username, fixtures, args.seed) for index, username in enumerate(usernames)]
+    results = Results()
+    think = args.think_ms / 1000
+    if args.url:
+        parts = urlsplit(args.url)
+        elapsed = run_threads(terminals, parts.hostname, parts.port or 80, args.duration, think, results)
+    elif target == 'asgi':
+        from laundry_system.asgi import application
+        elapsed = run_asgi(terminals, application, args.duration, think, results)
+    else:
+        elapsed = run_threads(terminals, '127.0.0.1', args.port, args.duration, think, results)
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--url', help="Load an already running server instead (e.g. http://127.0.0.1:8000)")
+    parser.add_argument('--terminals', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=15, help="Seconds per level (default: 15)")
+    parser.add_argument('--think-ms', type=float, default=0, help="Mean pause between a terminal's actions")
+    parser.add_argument('--orders', type=int, default=20000, help="Orders to seed (in-process targets)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    lock_counter = LockCounter()
+    logging.getLogger('django.request').addHandler(lock_counter)
+    old_config = server = None
+    try:
+        if not args.url:
+            old_config = setup_databases(verbosity=0, interactive=False)
+            print(f"seeding {args.orders} orders...")
+            call_command(
+                'seed_benchmark', customers=max(1, args.orders // 5), orders=args.orders,
+                staff=max(args.terminals), seed=args.seed, verbosity=0, stdout=io.StringIO(),
+            )
+            connection.close()
+        fixtures = load_fixtures()
+
+        # Production-like request handling: no debug query log or debug pages
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost', '127.0.0.1']):
+            if not args.url and args.target == 'wsgi':
+                from laundry_system.wsgi import application
+                server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+                server.set_app(application)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                args.port = server.server_address[1]
+
+            target = 'url' if args.url else args.target
+            print(f"target: {args.url or target}, {connection.vendor} database, "
+                  f"{args.duration:g}s per level, think time {args.think_ms:g}ms")
+            levels = []
+            for count in args.terminals:
+                lock_counter.count = 0
+                results, elapsed = run_level(args, count, fixtures, target)
+                levels.append(report(count, elapsed, results, None if args.url else lock_counter.count))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if old_config is not None:
+            connection.close()
+            teardown_databases(old_config, verbosity=0)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'target': args.url or args.target, 'levels': levels}, output, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
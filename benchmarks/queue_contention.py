@@ -0,0 +1,133 @@
+"""
+Multi-worker contention benchmark for the processing queue.
+
+Seeds a throwaway test database with N queued orders, then lets W worker
+threads (each with its own database connection) drain the 'pending' stage
+concurrently, for each worker count given. Reports claims per second,
+claim latency and how many entries were handed out more than once.
+
+``--mode naive`` replays the old read-then-assign pattern
+(``get_next_in_queue()`` followed by a save) for comparison; it is expected
+to double-claim under contention, while ``engine`` (ProcessingQueue.claim_next)
+must never do so.
+
+    python -m benchmarks.queue_contention --orders 2000 --workers 1 2 4 8
+    python -m benchmarks.queue_contention --mode naive --workers 8
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+
+from benchmarks.export_memory import seed  # also sets up Django
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases  # noqa: E402
+
+from laundry.models import LaundryOrder, ProcessingQueue  # noqa: E402
+
+STAGE = 'pending'
+
+
+def reset_queue():
+    """Every order waiting, unclaimed, in the 'pending' stage"""
+    with transaction.atomic():
+        ProcessingQueue.objects.all().delete()
+        LaundryOrder.objects.update(status=STAGE)
+        ProcessingQueue.objects.bulk_create(
+            (
+                ProcessingQueue(order_id=pk, current_stage=STAGE, position=index * ProcessingQueue.POSITION_GAP)
+                for index, pk in enumerate(LaundryOrder.objects.order_by('pk').values_list('pk', flat=True), 1)
+            ),
+            batch_size=5000,
+        )
+
+
+def claim_engine(worker):
+    entry = ProcessingQueue.claim_next(STAGE, worker)
+    return entry and entry.pk
+
+
+def claim_naive(worker):
+    entry = ProcessingQueue.objects.filter(current_stage=STAGE, assigned_to__isnull=True).first()
+    if entry is None:
+        return None
+    entry.assigned_to = worker
+    entry.save(update_fields=['assigned_to'])
+    return entry.pk
+
+
+def run(workers, claim, user, work_seconds):
+    claims, latencies, errors = [], [], []
+    lock = threading.Lock()
+    start_line = threading.Barrier(workers)
+
+    def worker():
+        mine, timings = [], []
+        try:
+            start_line.wait()
+            while True:
+                started = time.perf_counter()
+                pk = claim(user)
+                if pk is None:
+                    break
+                timings.append(time.perf_counter() - started)
+                mine.append(pk)
+                if work_seconds:
+                    time.sleep(work_seconds)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+            with lock:
+                claims.extend(mine)
+                latencies.extend(timings)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    counts = Counter(claims)
+    duplicates = sum(count - 1 for count in counts.values())
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(
+        f"{workers:>7} {len(counts):>8} {len(claims) / elapsed:>10.0f} "
+        f"{statistics.median(latencies or [0]) * 1000:>8.2f} {p99 * 1000:>8.2f} {duplicates:>10} {len(errors):>6}"
+    )
+    if errors:
+        print(f"        first error: {errors[0]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--mode', choices=('engine', 'naive'), default='engine')
+    parser.add_argument(
+        '--work-ms', type=float, default=0,
+        help="Time each worker spends on an entry before claiming the next",
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = seed(args.orders, min(1000, args.orders) or 1)
+        claim = claim_engine if args.mode == 'engine' else claim_naive
+        print(f"\n{args.mode}: {args.orders} queued orders on {connection.vendor}")
+        print(f"{'workers':>7} {'claimed':>8} {'claims/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'duplicates':>10} {'errors':>6}")
+        for workers in args.workers:
+            reset_queue()
+            run(workers, claim, user, args.work_ms / 1000)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
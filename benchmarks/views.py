@@ -0,0 +1,212 @@
+"""
+View-level benchmark suite.
+
+For each data size, seeds a fresh throwaway test database with
+``manage.py seed_benchmark`` and times the main views through the test
+client, middleware included: dashboard, order_list, customer_list,
+customer_detail (the busiest customer), both CSV exports (drained to the
+last row), a create_order POST with three items, and rendering a receipt
+PDF. The data cache and receipt cache are emptied before every run, so the
+numbers are uncached worst cases.
+
+Results go to JSON; give ``--compare`` an earlier file to see the change
+per view and size.
+
+    python -m benchmarks.views --sizes 1000 10000 100000 --output before.json
+    python -m benchmarks.views --sizes 1000 10000 100000 --output after.json --compare before.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'laundry_system.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases,
+)
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from laundry import caching  # noqa: E402
+from laundry.models import ClothingType, Customer, LaundryOrder  # noqa: E402
+
+CASES = (
+    'dashboard', 'order_list', 'customer_list', 'customer_detail',
+    'export_orders_csv', 'export_customers_csv', 'create_order', 'receipt_pdf',
+)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def drain(response):
+    if response.streaming:
+        return sum(len(block) for block in response.streaming_content)
+    return len(response.content)
+
+
+class Suite:
+    def __init__(self, client, receipt_dir):
+        self.client = client
+        self.receipt_dir = receipt_dir
+        self.customer = Customer.objects.order_by('-total_spent').first()
+        self.order = LaundryOrder.objects.filter(items__isnull=False).order_by('-pk').first()
+        self.clothing = list(ClothingType.objects.values_list('pk', flat=True)[:3])
+
+    def get(self, name, *args):
+        return self.client.get(reverse(name, args=args))
+
+    def dashboard(self):
+        return self.get('dashboard')
+
+    def order_list(self):
+        return self.get('order_list')
+
+    def customer_list(self):
+        return self.get('customer_list')
+
+    def customer_detail(self):
+        return self.get('customer_detail', self.customer.pk)
+
+    def export_orders_csv(self):
+        return self.get('export_orders_csv')
+
+    def export_customers_csv(self):
+        return self.get('export_customers_csv')
+
+    def create_order(self):
+        data = {
+            'order-customer': self.customer.pk,
+            'order-expected_delivery_date': timezone.localdate().isoformat(),
+            'items-TOTAL_FORMS': len(self.clothing), 'items-INITIAL_FORMS': 0,
+        }
+        for index, pk in enumerate(self.clothing):
+            data.update({f'items-{index}-clothing_type': pk, f'items-{index}-quantity': 2})
+        return self.client.post(reverse('create_order'), data)
+
+    def receipt_pdf(self):
+        shutil.rmtree(self.receipt_dir, ignore_errors=True)
+        return self.get('receipt_pdf', self.order.pk)
+
+    def run(self, name, repeat):
+        case = getattr(self, name)
+        case()  # warm up imports and connections
+        timings, queries = [], 0
+        for _ in range(repeat):
+            caching.get_cache().clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = case()
+                size = drain(response)
+                timings.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name} returned {response.status_code}")
+            queries = len(captured)
+        timings.sort()
+        return {
+            'median_ms': statistics.median(timings) * 1000,
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            'min_ms': timings[0] * 1000,
+            'queries': queries,
+            'bytes': size,
+            'runs': repeat,
+        }
+
+
+def bench_size(orders, args):
+    customers = max(1, orders // args.orders_per_customer)
+    old_config = setup_databases(verbosity=0, interactive=False)
+    receipt_dir = tempfile.mkdtemp(prefix='bench-receipts-')
+    try:
+        started = time.perf_counter()
+        call_command(
+            'seed_benchmark', customers=customers, orders=orders, items=orders * args.items_per_order,
+            seed=args.seed, verbosity=0, stdout=io.StringIO(),
+        )
+        seeded = time.perf_counter() - started
+
+        client = Client()
+        client.login(username='bench-admin', password='benchmark')
+        results = {}
+        with override_settings(LAUNDRY_RECEIPT_CACHE_DIR=receipt_dir):
+            suite = Suite(client, receipt_dir)
+            for name in args.cases:
+                results[name] = suite.run(name, args.repeat)
+                print(
+                    f"{orders:>9} {name:<22} {results[name]['median_ms']:>9.1f} {results[name]['p95_ms']:>9.1f} "
+                    f"{results[name]['queries']:>8}"
+                )
+        return {
+            'orders': orders, 'customers': customers, 'items': orders * args.items_per_order,
+            'seed_seconds': round(seeded, 2), 'results': results,
+        }
+    finally:
+        shutil.rmtree(receipt_dir, ignore_errors=True)
+        teardown_databases(old_config, verbosity=0)
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = {size['orders']: size['results'] for size in json.load(baseline_file)['sizes']}
+    print(f"\nagainst {baseline_path} (median, new/old)")
+    for size in report['sizes']:
+        old = baseline.get(size['orders'], {})
+        for name, result in size['results'].items():
+            if name in old and old[name]['median_ms']:
+                ratio = result['median_ms'] / old[name]['median_ms']
+                flag = '  slower' if ratio > 1.2 else '  faster' if ratio < 0.8 else ''
+                print(f"{size['orders']:>9} {name:<22} {old[name]['median_ms']:>9.1f} -> "
+                      f"{result['median_ms']:>9.1f}  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help="Orders per run")
+    parser.add_argument('--orders-per-customer', type=int, default=5)
+    parser.add_argument('--items-per-order', type=int, default=3)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', metavar='JSON', help="Earlier results to compare against")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    print(f"{'orders':>9} {'view':<22} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+    report = {
+        'commit': git_commit(),
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': f"{connection.vendor} {connection.Database.sqlite_version if connection.vendor == 'sqlite' else ''}".strip(),
+        'repeat': args.repeat,
+        'sizes': [bench_size(orders, args) for orders in args.sizes],
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import Count, Sum
 from django.shortcuts import render
+from django.utils import timezone
+from django.views.generic import TemplateView
+
+from laundry.models import LaundryOrder, Payment, local_day_range
+
+User = get_user_model()
 
 # Create your views here.
 class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -11,12 +20,12 @@ class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         # Today's statistics
-        today = timezone.now().date()
+        start, end = local_day_range(timezone.localdate())
         context['today_orders'] = LaundryOrder.objects.filter(
-            registered_at__date=today
+            registered_at__gte=start, registered_at__lt=end
         ).count()
         context['today_revenue'] = Payment.objects.filter(
-            payment_date__date=today
+            payment_date__gte=start, payment_date__lt=end
         ).aggregate(total=Sum('amount'))['total'] or 0
         
         # Pending orders
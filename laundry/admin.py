@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import ClothingType, Customer, LaundryOrder, OrderItem
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.utils import timezone
+
+from reports.batch import MAX_SYNC_ORDERS, render_batch
+from .models import ClothingType, Customer, LaundryOrder, OrderItem, StageEvent
+from .pricing import deferred_repricing
 # Register your models here.
 
 @admin.register(ClothingType)
@@ -22,6 +27,49 @@ class LaundryOrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'customer', 'status', 'total_price', 'registered_at')
     list_filter = ('status', 'payment_status')
     inlines = [OrderItemInline]
+    actions = ['print_receipts', 'print_tags']
+
+    def save_related(self, request, form, formsets, change):
+        # Reprice the order once after all inline items are saved
+        with deferred_repricing():
+            super().save_related(request, form, formsets, change)
+
+    def _print(self, request, queryset, kind):
+        # Rendered in this request, without a process pool; big runs go to the command
+        count = queryset.count()
+        if count > MAX_SYNC_ORDERS:
+            self.message_user(
+                request,
+                f"{count} orders are too many to print from here (at most {MAX_SYNC_ORDERS}). "
+                f"Select fewer, or print the day's run with: python manage.py print_end_of_day --kind {kind}",
+                messages.WARNING,
+            )
+            return None
+        response = HttpResponse(render_batch(queryset, kind=kind, workers=1), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{kind}-{timezone.localdate()}.pdf"'
+        return response
+
+    @admin.action(description="Print receipts for selected orders")
+    def print_receipts(self, request, queryset):
+        return self._print(request, queryset, 'receipts')
+
+    @admin.action(description="Print garment tags for selected orders")
+    def print_tags(self, request, queryset):
+        return self._print(request, queryset, 'tags')
 
     class Media:
-        js = ('js/admin_payment_sync.js',)
\ No newline at end of file
+        js = ('js/admin_payment_sync.js',)
+
+
+@admin.register(StageEvent)
+class StageEventAdmin(admin.ModelAdmin):
+    list_display = ('code', 'order', 'from_status', 'to_status', 'scanned_by', 'scanned_at')
+    list_filter = ('to_status',)
+    list_select_related = ('order', 'scanned_by')
+
+    # Append-only scan log
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,113 @@
+"""
+Per-user view data caching with version-token invalidation.
+
+Views cache the data they compute (pages of orders, dashboard totals), never
+rendered HTML, under a key built from:
+
+* the view name and the caller's scope (role, and user id where the data
+  is user-specific) plus the filter/cursor query string;
+* the current token of every version the data depends on.
+
+Writes "bump" a version by giving it a fresh random token, so every entry
+built from the old data is simply never looked up again (and expires).
+Tokens are bumped as soon as the write happens and again when its
+transaction commits, so a reader racing the commit cannot cache old data
+under the new token.
+
+Versions:
+    ORDERS            any order/item write
+    staff_orders(pk)  writes to orders handled by that staff member
+    CUSTOMERS         any customer write
+    ALL               bulk repairs that bypass save() (reconcile, rebuilds)
+
+All processes must share the cache backend for bumps to reach them (the
+default local-memory cache is per process; see CACHES in settings).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+ORDERS = 'orders'
+CUSTOMERS = 'customers'
+ALL = 'all'
+KEY_PREFIX = 'laundry'
+
+
+def get_cache():
+    return caches[getattr(settings, 'LAUNDRY_CACHE_ALIAS', 'default')]
+
+
+def staff_orders(pk):
+    return f'staff:{pk}'
+
+
+def _version_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def versions(names):
+    """Current tokens for ``names`` (a missing token is created)"""
+    cache = get_cache()
+    keys = [_version_key(name) for name in names]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # add() keeps a token another process set first
+            cache.add(key, _new_token(), None)
+            tokens[key] = cache.get(key)
+    return [tokens[key] for key in keys]
+
+
+def _bump_now(names):
+    get_cache().set_many({_version_key(name): _new_token() for name in names}, None)
+
+
+def bump(*names):
+    names = {name for name in names if name is not None}
+    if not names:
+        return
+    _bump_now(names)
+    transaction.on_commit(lambda: _bump_now(names))
+
+
+def bump_orders(*staff_ids):
+    bump(ORDERS, *[staff_orders(pk) for pk in staff_ids if pk is not None])
+
+
+def invalidate_all():
+    bump(ALL)
+
+
+_MISSING = object()
+
+
+def cached(name, scope, depends, compute):
+    """
+    Return ``compute()``, cached per ``scope`` (a tuple of key parts) until
+    one of the ``depends`` versions is bumped.
+    """
+    cache = get_cache()
+    tokens = versions([ALL, *depends])
+    digest = hashlib.sha1(repr((scope, tokens)).encode()).hexdigest()
+    key = f'{KEY_PREFIX}:view:{name}:{digest}'
+
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'LAUNDRY_CACHE_TIMEOUT', 300))
+    return value
+
+
+def request_scope(request, per_user=True):
+    """Role, user (if the data is user-specific) and the query string as key parts"""
+    user = request.user
+    role = 'admin' if (user.is_superuser or user.user_type == 'admin') else 'staff'
+    query = tuple(sorted((key, tuple(request.GET.getlist(key))) for key in request.GET))
+    return (role, user.pk if per_user else None, query)
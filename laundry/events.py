@@ -0,0 +1,88 @@
+"""
+In-process publish/subscribe for live screens.
+
+Writes publish small deltas once, after their transaction commits; every
+connected screen (a server-sent events stream, see views.queue_events) holds
+a Subscription and receives them from memory, so the database is asked
+once per change instead of once per screen per refresh.
+
+Subscribers live in one process's event loop. Under a multi-process server
+each process only reaches the screens connected to it, so run the event
+stream from a single ASGI worker (or put a shared broker behind this
+interface).
+"""
+import asyncio
+import threading
+
+# Delivered instead of an event when a subscriber fell too far behind; the
+# screen should reload its state
+RESET = ('reset', None)
+
+
+class Subscription:
+    """One screen's queue of events, read from its event loop"""
+
+    def __init__(self, broker, max_pending):
+        self._broker = broker
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Called from any thread"""
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Next ``(kind, data)`` event, RESET after an overflow, or None on timeout"""
+        if self.overflowed and self._queue.empty():
+            return RESET
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return RESET if self.overflowed else None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def listening(self):
+        """True if anyone would receive a publish (lets writers skip building events)"""
+        return bool(self._subscribers)
+
+    def subscribe(self):
+        """New Subscription for the running event loop"""
+        subscription = Subscription(self, self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, kind, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.deliver((kind, data))
+            except RuntimeError:
+                # Its event loop has shut down
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
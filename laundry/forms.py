@@ -2,8 +2,6 @@
 from django import forms
 from .models import Customer, LaundryOrder, OrderItem
 from django.forms import inlineformset_factory
-import random
-import string
 
 class CustomerForm(forms.ModelForm):
     class Meta:
@@ -13,20 +11,6 @@ class CustomerForm(forms.ModelForm):
             'address': forms.Textarea(attrs={'rows': 3}),
         }
 
-    # This should be at the same level as the 'Meta' class
-    def save(self, commit=True):
-        instance = super().save(commit=False)
-        
-        # Generate ID if it doesn't exist (e.g., CUST-5785)
-        if not instance.customer_id:
-            last_four = instance.phone[-4:] if instance.phone else "0000"
-            random_suffix = ''.join(random.choices(string.digits, k=4))
-            instance.customer_id = f"CUST-{last_four}-{random_suffix}"
-        
-        if commit:
-            instance.save()
-        return instance
-
 class OrderItemForm(forms.ModelForm):
     class Meta:
         model = OrderItem
@@ -46,13 +30,19 @@ class OrderItemForm(forms.ModelForm):
             'description': forms.TextInput(attrs={'placeholder': 'Color, fabric, brand, etc.'}),
         }
 
+# Item lines one order can take; LAUNDRY_QUERY_BUDGETS['POST create_order']
+# is measured at this many lines
+MAX_ORDER_ITEMS = 30
+
 # Create a formset for multiple items
 OrderItemFormSet = inlineformset_factory(
     LaundryOrder, 
     OrderItem, 
     form=OrderItemForm,
     extra=1,  # Show 3 empty item forms by default
-    can_delete=True
+    can_delete=True,
+    max_num=MAX_ORDER_ITEMS,
+    validate_max=True,
 )
 
 class LaundryOrderForm(forms.ModelForm):
@@ -0,0 +1,81 @@
+"""
+Readable customer IDs built from a sequence number.
+
+Format: CUST-<last 4 phone digits>-<base-36 sequence><check character>
+Example: CUST-5785-000AK
+
+The sequence makes every ID unique on its own, so no "does it exist?"
+probing is needed. The phone digits are only there so staff can recognise
+the customer. The check character (Luhn mod 36) catches single-character
+typos and most swapped neighbours when an ID is typed in by hand.
+
+Older IDs (CUST-5785-XY and CUST-5785-1234) have shorter suffixes and can
+never clash with IDs issued here.
+"""
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+SEQUENCE_WIDTH = 4
+
+
+def encode_base36(value, width=SEQUENCE_WIDTH):
+    """Encode a non-negative integer, left-padded with zeros to ``width``"""
+    if value < 0:
+        raise ValueError("Sequence numbers cannot be negative")
+    digits = ''
+    while value:
+        value, remainder = divmod(value, len(ALPHABET))
+        digits = ALPHABET[remainder] + digits
+    return digits.rjust(width, '0')
+
+
+def check_character(code):
+    """Luhn mod 36 check character for an upper-case alphanumeric code"""
+    base = len(ALPHABET)
+    factor = 2
+    total = 0
+    for char in reversed(code):
+        addend = factor * ALPHABET.index(char)
+        factor = 1 if factor == 2 else 2
+        total += addend // base + addend % base
+    return ALPHABET[(base - total % base) % base]
+
+
+def phone_suffix(phone):
+    digits = ''.join(c for c in (phone or '') if c.isdigit())
+    return digits[-4:].rjust(4, '0')
+
+
+def format_customer_id(phone, number):
+    last_four = phone_suffix(phone)
+    sequence = encode_base36(number)
+    return f"CUST-{last_four}-{sequence}{check_character(last_four + sequence)}"
+
+
+def is_valid_customer_id(customer_id):
+    """True if ``customer_id`` is a sequence-issued ID with a correct check character"""
+    parts = (customer_id or '').upper().split('-')
+    if len(parts) != 3 or parts[0] != 'CUST' or len(parts[2]) <= SEQUENCE_WIDTH:
+        return False
+    code = parts[1] + parts[2][:-1]
+    if any(c not in ALPHABET for c in code):
+        return False
+    return check_character(code) == parts[2][-1]
+
+
+# Garment tag codes: T<base-36 item id><check character>, e.g. T00A7K
+TAG_PREFIX = 'T'
+
+
+def format_tag_code(pk):
+    sequence = encode_base36(pk)
+    return f"{TAG_PREFIX}{sequence}{check_character(sequence)}"
+
+
+def parse_tag_code(code):
+    """Item id encoded in a tag code, or None if it is not one (or misread)"""
+    code = (code or '').strip().upper()
+    if len(code) <= SEQUENCE_WIDTH + 1 or not code.startswith(TAG_PREFIX):
+        return None
+    sequence = code[len(TAG_PREFIX):-1]
+    if any(c not in ALPHABET for c in sequence) or check_character(sequence) != code[-1]:
+        return None
+    return int(sequence, len(ALPHABET))
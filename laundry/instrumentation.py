@@ -0,0 +1,352 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware measures every request: the number of SQL queries
+and the time spent in them (through ``connection.execute_wrapper``), the
+time spent rendering templates, the total time and the response size. It
+reports them in a ``Server-Timing`` header (visible in the browser's network
+panel) and keeps a rolling window of samples per endpoint, shown to admins
+at /admin/request-metrics/.
+
+Query budgets (LAUNDRY_QUERY_BUDGETS, keyed by URL name, or by method and
+URL name such as ``'POST create_order'``) cap the queries a view may issue.
+Going over is logged; with LAUNDRY_QUERY_BUDGET_RAISE it raises
+QueryBudgetExceeded instead, so tests fail when a view regresses to
+per-row queries.
+
+Queries slower than LAUNDRY_SLOW_QUERY_MS are also kept, with the view,
+the application frame that issued them and the database's query plan, in
+a bounded ring buffer (``slow_queries``). Admins see them grouped by
+statement fingerprint at /admin/slow-queries/. Only the fingerprint and
+the parameters' types are kept, never their values: they include session
+keys, password hashes and customer details.
+
+Samples live in process memory; each worker process keeps its own window.
+"""
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.base import Template
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('laundry_request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    """Counters for one request; also the execute_wrapper that fills them"""
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.size = None
+        self._rendering = False
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += elapsed
+        # Only queries that succeeded: EXPLAINing one that raised would fail
+        # too, or run in a transaction that is already broken
+        threshold = getattr(settings, 'LAUNDRY_SLOW_QUERY_MS', None)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            self._record_slow(context['connection'], sql, params, many, elapsed)
+        return result
+
+    def _record_slow(self, connection, sql, params, many, elapsed):
+        self._explaining = True
+        try:
+            plan = None if many else explain(connection, sql, params)
+        finally:
+            self._explaining = False
+        slow_queries.record(
+            sql, describe_params(params, many), elapsed, endpoint_name(self.request), self.request.path,
+            _app_stack(), plan,
+        )
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'app;dur={self.total_time * 1000:.1f}',
+        ))
+
+
+def _timed_render(render):
+    def timed_render(self, context):
+        metrics = _current.get()
+        # Only the outermost render is timed; includes are part of it
+        if metrics is None or metrics._rendering:
+            return render(self, context)
+        metrics._rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics._rendering = False
+
+    timed_render.timed = True
+    return timed_render
+
+
+def install_template_timer():
+    """Time Template.render (once per process)"""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class EndpointSummary:
+    """Rolling window of the last ``window`` requests to each endpoint"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, endpoint, metrics):
+        sample = (metrics.total_time, metrics.sql_time, metrics.template_time, metrics.queries, metrics.size)
+        with self._lock:
+            if endpoint not in self._samples:
+                self._samples[endpoint] = deque(maxlen=self.window)
+                self._counts[endpoint] = 0
+            self._samples[endpoint].append(sample)
+            self._counts[endpoint] += 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def rows(self):
+        """One dict per endpoint, slowest p95 first (times in milliseconds)"""
+        with self._lock:
+            snapshot = {endpoint: (list(samples), self._counts[endpoint]) for endpoint, samples in self._samples.items()}
+        rows = []
+        for endpoint, (samples, count) in snapshot.items():
+            n = len(samples)
+            totals = sorted(sample[0] for sample in samples)
+            queries = [sample[3] for sample in samples]
+            sizes = [sample[4] for sample in samples if sample[4] is not None]
+            rows.append({
+                'endpoint': endpoint,
+                'requests': count,
+                'window': n,
+                'p50': _percentile(totals, 0.5) * 1000,
+                'p95': _percentile(totals, 0.95) * 1000,
+                'max': totals[-1] * 1000,
+                'sql': sum(sample[1] for sample in samples) / n * 1000,
+                'template': sum(sample[2] for sample in samples) / n * 1000,
+                'queries': sum(queries) / n,
+                'max_queries': max(queries),
+                'budget': query_budget(*endpoint.split(' ', 1)),
+                'size': sum(sizes) / len(sizes) if sizes else None,
+            })
+        rows.sort(key=lambda row: row['p95'], reverse=True)
+        return rows
+
+
+summary = EndpointSummary()
+
+
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+
+def explain(connection, sql, params):
+    """The database's plan for ``sql`` as text, or None for statements without one"""
+    if not _EXPLAINABLE.match(sql):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'(no plan: {exc})'
+    # SQLite rows are (id, parent, notused, detail); others are one text column
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+_THIS_FILE = os.path.abspath(__file__)
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(_THIS_FILE))
+
+
+def _app_stack(limit=5):
+    """The innermost frames of this project's code (not Django's, not this module)"""
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_PACKAGE_ROOT) and 'site-packages' not in filename and filename != _THIS_FILE:
+            frames.append(f'{os.path.relpath(filename, _PACKAGE_ROOT)}:{frame.lineno} in {frame.name}')
+    return frames[-limit:]
+
+
+_FINGERPRINT_SUBS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\((?:\?\s*,\s*)+\?\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """``sql`` with literals and parameters replaced, so variants of one statement group together"""
+    for pattern, replacement in _FINGERPRINT_SUBS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def describe_params(params, many=False):
+    """The parameters' types (and lengths of strings), not their values"""
+    if many:
+        return f'{len(params)} rows' if hasattr(params, '__len__') else 'rows'
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        params = params.values()
+    return ', '.join(
+        f'{type(value).__name__}({len(value)})' if isinstance(value, (str, bytes)) else type(value).__name__
+        for value in params
+    )
+
+
+def redact_plan(plan):
+    """``plan`` with quoted literals removed (some databases print filter values)"""
+    return _FINGERPRINT_SUBS[0][0].sub('?', plan) if plan else plan
+
+
+class SlowQueryLog:
+    """The last ``size`` slow queries, grouped on demand"""
+
+    def __init__(self, size=500):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=size)
+
+    def record(self, sql, params, elapsed, endpoint, path, stack, plan):
+        """``params`` is describe_params() output; the statement and plan are kept redacted"""
+        entry = {
+            'params': params, 'duration': elapsed * 1000, 'endpoint': endpoint, 'path': path,
+            'stack': stack, 'plan': redact_plan(plan), 'fingerprint': fingerprint(sql), 'at': timezone.now(),
+        }
+        with self._lock:
+            self._entries.append(entry)
+        logger.info("Slow query (%.1fms) from %s: %s", entry['duration'], endpoint, entry['fingerprint'])
+
+    def resize(self, size):
+        with self._lock:
+            self._entries = deque(self._entries, maxlen=size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def groups(self):
+        """One dict per fingerprint, most total time first; ``latest`` is its newest entry"""
+        groups = {}
+        for entry in self.entries():
+            group = groups.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'], 'count': 0, 'total': 0.0, 'max': 0.0, 'endpoints': set(),
+            })
+            group['count'] += 1
+            group['total'] += entry['duration']
+            group['max'] = max(group['max'], entry['duration'])
+            group['endpoints'].add(entry['endpoint'])
+            group['latest'] = entry
+        for group in groups.values():
+            group['mean'] = group['total'] / group['count']
+            group['endpoints'] = sorted(group['endpoints'])
+        return sorted(groups.values(), key=lambda group: group['total'], reverse=True)
+
+
+slow_queries = SlowQueryLog()
+
+
+def query_budget(method, view_name):
+    budgets = getattr(settings, 'LAUNDRY_QUERY_BUDGETS', {})
+    return budgets.get(f'{method} {view_name}', budgets.get(view_name))
+
+
+def endpoint_name(request):
+    match = request.resolver_match
+    return f"{request.method} {match.view_name if match else '<unresolved>'}"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+        slow_queries.resize(getattr(settings, 'LAUNDRY_SLOW_QUERY_LOG_SIZE', 500))
+
+    def __call__(self, request):
+        if not getattr(settings, 'LAUNDRY_REQUEST_METRICS', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.total_time = time.perf_counter() - started
+        # Streamed bodies are produced after this returns and aren't counted
+        if not response.streaming:
+            metrics.size = len(response.content)
+        response['Server-Timing'] = metrics.server_timing()
+
+        endpoint = endpoint_name(request)
+        summary.record(endpoint, metrics)
+        logger.debug(
+            "%s %s: %d queries %.1fms sql, %.1fms templates, %.1fms total, %s bytes",
+            endpoint, request.path, metrics.queries, metrics.sql_time * 1000,
+            metrics.template_time * 1000, metrics.total_time * 1000, metrics.size,
+        )
+        self.check_budget(request, metrics)
+        return response
+
+    def check_budget(self, request, metrics):
+        if request.resolver_match is None:
+            return
+        budget = query_budget(request.method, request.resolver_match.view_name)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = f"{endpoint_name(request)} ({request.path}) ran {metrics.queries} queries; its budget is {budget}"
+        if getattr(settings, 'LAUNDRY_QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from laundry.models import DailyItemSales, DailyOrderSummary, DailyStatusCount
+
+ROLLUPS = {
+    'summary': DailyOrderSummary,
+    'status': DailyStatusCount,
+    'items': DailyItemSales,
+}
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day fact tables behind the dashboard and the sales report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', metavar='YYYY-MM-DD',
+            help="Only rebuild days from this date onwards (default: all history)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Rows written per INSERT (default: 1000)",
+        )
+        parser.add_argument(
+            '--only', action='append', choices=list(ROLLUPS),
+            help="Rebuild only this table (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        selected = options['only'] or list(ROLLUPS)
+        scope = f"from {since}" if since else "for all days"
+        for name, rollup in ROLLUPS.items():
+            if name not in selected:
+                continue
+            rows = rollup.rebuild(since=since, batch_size=max(1, options['batch_size']))
+            self.stdout.write(self.style.SUCCESS(f"{name}: rebuilt {scope}, {rows} row(s)"))
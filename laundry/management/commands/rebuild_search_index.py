@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from laundry import caching, search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the order/customer search index from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Rows read and indexed per batch (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        labels = {search.ORDER: 'orders', search.CUSTOMER: 'customers'}
+
+        def progress(kind, count):
+            if options['verbosity']:
+                self.stdout.write(f"\r{labels[kind]}: {count} indexed", ending='')
+
+        backend = type(search.get_backend()).__name__
+        with transaction.atomic():
+            orders, customers = search.rebuild(chunk_size=max(1, options['chunk_size']), progress=progress)
+            caching.invalidate_all()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt with {backend}: {orders} orders, {customers} customers"
+        ))
@@ -0,0 +1,236 @@
+"""
+Set-based repair of denormalised laundry data.
+
+Replaces the old update_customer_totals.py and fix_missing_registrars.py
+scripts. Each fix is a correlated-subquery UPDATE per primary-key chunk,
+touching only the rows that are actually wrong, and every chunk commits
+on its own so SQLite is never locked for the whole run.
+
+    python manage.py reconcile --dry-run -v 2
+    python manage.py reconcile --only customers --chunk-size 5000
+"""
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Round
+
+from laundry import caching, search
+from laundry.models import Customer, DailyOrderSummary, LaundryOrder, OrderItem
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+TOLERANCE = Decimal('0.005')
+
+
+def _item_sum(expression):
+    """Correlated SUM over an order's items (0 when it has none)"""
+    total = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        total=Sum(expression, output_field=MONEY)
+    ).values('total')
+    return Coalesce(Round(Subquery(total), 2), ZERO, output_field=MONEY)
+
+
+def _order_expected():
+    """Expected order pricing fields, mirroring LaundryOrder.calculate_totals()"""
+    subtotal = _item_sum('total_price')
+    urgent_total = _item_sum(ExpressionWrapper(
+        F('quantity') * F('clothing_type__urgent_price'), output_field=MONEY
+    ))
+    urgent_fee = Case(
+        When(is_urgent=True, then=urgent_total - subtotal),
+        default=ZERO,
+        output_field=MONEY,
+    )
+    total_price = ExpressionWrapper(subtotal + urgent_fee, output_field=MONEY)
+    amount_paid = Case(
+        When(payment_status='paid', then=total_price),
+        When(payment_status='pending', then=ZERO),
+        default=F('amount_paid'),
+        output_field=MONEY,
+    )
+    return {
+        'subtotal': subtotal,
+        'urgent_fee': urgent_fee,
+        'total_price': total_price,
+        'amount_paid': amount_paid,
+        'balance': ExpressionWrapper(total_price - amount_paid, output_field=MONEY),
+    }
+
+
+def _order_updates():
+    """
+    The same pricing as a sequence of UPDATEs, each building on the columns
+    written by the previous one (a single fully inlined statement is too
+    deeply nested for SQLite's parser).
+    """
+    expected = _order_expected()
+    return [
+        {'subtotal': expected['subtotal'], 'urgent_fee': expected['urgent_fee']},
+        {'total_price': ExpressionWrapper(F('subtotal') + F('urgent_fee'), output_field=MONEY)},
+        {'amount_paid': Case(
+            When(payment_status='paid', then=F('total_price')),
+            When(payment_status='pending', then=ZERO),
+            default=F('amount_paid'),
+            output_field=MONEY,
+        )},
+        {'balance': ExpressionWrapper(F('total_price') - F('amount_paid'), output_field=MONEY)},
+    ]
+
+
+def _customer_expected():
+    total = LaundryOrder.objects.filter(customer=OuterRef('pk')).values('customer').annotate(
+        total=Sum('total_price')
+    ).values('total')
+    return {'total_spent': Coalesce(Round(Subquery(total), 2), ZERO, output_field=MONEY)}
+
+
+def _registrar_expected():
+    first_order_staff = LaundryOrder.objects.filter(
+        customer=OuterRef('pk')
+    ).order_by('registered_at').values('staff')[:1]
+    return {'registered_by': Subquery(first_order_staff)}
+
+
+def _money_differs(fields):
+    q = Q()
+    for field in fields:
+        q |= Q(**{f'{field}_diff__gte': TOLERANCE}) | Q(**{f'{field}_diff__lte': -TOLERANCE})
+    return q
+
+
+def _reindex_customers(pks):
+    """The UPDATE bypasses Customer.save(); their search documents include the registrar"""
+    search.index_customers(Customer.objects.filter(pk__in=pks).select_related('registered_by'))
+
+
+class Fix:
+    def __init__(self, name, model, expected, updates=None, base_filter=Q(), money=True, reindex=None):
+        self.name = name
+        self.model = model
+        self.expected = expected
+        self.updates = updates or (lambda: [expected()])
+        self.base_filter = base_filter
+        self.money = money
+        # Called with the repaired pks when the fields feed a search document
+        self.reindex = reindex
+
+    def column(self, field):
+        return field if self.money else f'{field}_id'
+
+    def wrong_rows(self, low, high):
+        """Rows in the pk range [low, high] whose stored values differ from the expected ones"""
+        qs = self.model.objects.filter(self.base_filter, pk__gte=low, pk__lte=high)
+        expected = self.expected()
+        qs = qs.annotate(**{f'expected_{name}': expr for name, expr in expected.items()})
+        if self.money:
+            qs = qs.annotate(**{
+                f'{name}_diff': ExpressionWrapper(F(name) - F(f'expected_{name}'), output_field=MONEY)
+                for name in expected
+            })
+            return qs.filter(_money_differs(expected))
+        # Foreign keys: only fill in values that can be found
+        return qs.filter(**{f'expected_{name}__isnull': False for name in expected})
+
+    def apply(self, low, high):
+        pks = list(self.wrong_rows(low, high).values_list('pk', flat=True))
+        if pks:
+            rows = self.model.objects.filter(pk__in=pks)
+            for fields in self.updates():
+                rows.update(**fields)
+            if self.reindex:
+                self.reindex(pks)
+        return len(pks)
+
+
+FIXES = {
+    # Order pricing first: customer totals are summed from it
+    'orders': Fix('orders', LaundryOrder, _order_expected, _order_updates),
+    'customers': Fix('customers', Customer, _customer_expected),
+    'registrars': Fix(
+        'registrars', Customer, _registrar_expected,
+        base_filter=Q(registered_by__isnull=True), money=False, reindex=_reindex_customers,
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = "Recompute order pricing, customer totals and missing registrars in set-based chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report what would change without writing anything (-v 2 lists every row)",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Primary keys per UPDATE/transaction (default: 1000)",
+        )
+        parser.add_argument(
+            '--only', action='append', choices=list(FIXES),
+            help="Run only this fix (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        chunk_size = max(1, options['chunk_size'])
+        verbosity = options['verbosity']
+        selected = options['only'] or list(FIXES)
+
+        for name in FIXES:
+            if name not in selected:
+                continue
+            fix = FIXES[name]
+            bounds = fix.model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                self.stdout.write(f"{name}: nothing to check")
+                continue
+
+            changed = 0
+            state = "to fix" if dry_run else "fixed"
+            low = bounds['low']
+            span = bounds['high'] - bounds['low'] + 1
+            while low <= bounds['high']:
+                high = low + chunk_size - 1
+                if dry_run:
+                    changed += self._report(fix, low, high, verbosity)
+                else:
+                    with transaction.atomic():
+                        changed += fix.apply(low, high)
+                low = high + 1
+                if verbosity:
+                    done = min(low - bounds['low'], span)
+                    self.stdout.write(f"\r{name}: {done * 100 // span:3d}% ({changed} {state})", ending='')
+            self.stdout.write('')
+
+            verb = "would be updated" if dry_run else "updated"
+            self.stdout.write(self.style.SUCCESS(f"{name}: {changed} row(s) {verb}"))
+
+            if changed and not dry_run:
+                # Cached pages were built from the rows just repaired
+                caching.invalidate_all()
+
+            if name == 'orders' and changed and not dry_run:
+                # The UPDATEs bypass LaundryOrder.save(), so refresh the dashboard rollup
+                rows = DailyOrderSummary.rebuild()
+                self.stdout.write(self.style.SUCCESS(f"daily summary: {rows} row(s) rebuilt"))
+
+    def _report(self, fix, low, high, verbosity):
+        expected = list(fix.expected())
+        rows = fix.wrong_rows(low, high).values(
+            'pk', *[fix.column(field) for field in expected],
+            *[f'expected_{field}' for field in expected],
+        )
+        count = 0
+        for row in rows.iterator():
+            count += 1
+            if verbosity >= 2:
+                diffs = ', '.join(
+                    f"{field}: {row[fix.column(field)]} -> {row[f'expected_{field}']}"
+                    for field in expected
+                )
+                self.stdout.write(f"\n  {fix.model.__name__} #{row['pk']}: {diffs}", ending='')
+        return count
@@ -0,0 +1,345 @@
+"""
+Bulk-generate realistic data for benchmarks and load tests.
+
+Rows are written with bulk_create in chunks, bypassing the per-row save()
+bookkeeping; the derived data (daily summaries, customer totals, search and
+phone indexes, processing queue) is rebuilt from them in bulk at the end.
+
+The data is skewed the way a real shop's is: a few regular customers place
+most of the orders, a few garment types make up most of the items, business
+grows over the period, Sundays are quiet, and only the last few days'
+orders are still being processed or unpaid.
+
+    python manage.py seed_benchmark --customers 100000 --orders 650000 --items 2000000
+"""
+import bisect
+import datetime
+import io
+import itertools
+import random
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from laundry import caching
+from laundry.models import (
+    ClothingType, Customer, LaundryOrder, OrderItem, OrderNumberSequence, Payment,
+    ProcessingQueue,
+)
+
+GARMENTS = [
+    ('Shirt', 500), ('Trousers', 600), ('Jeans', 700), ('T-Shirt', 400), ('Dress', 900), ('Skirt', 600),
+    ('Suit (2 pc)', 2500), ('Blazer', 1500), ('Native Attire', 1200), ('Agbada', 3500), ('Kaftan', 1500),
+    ('Bedsheet', 800), ('Duvet', 3000), ('Pillow Case', 300), ('Curtain', 2000), ('Towel', 400),
+    ('Jacket', 1800), ('Sweater', 900), ('Gown', 2500), ('Tie', 300), ('Cap', 300), ('Blanket', 2500),
+]
+FIRST_NAMES = [
+    'Ada', 'Chinedu', 'Ngozi', 'Emeka', 'Funke', 'Tunde', 'Aisha', 'Musa', 'Bola', 'Kemi', 'Ifeoma', 'Yusuf',
+    'Grace', 'Daniel', 'Blessing', 'Samuel', 'Zainab', 'Peter', 'Amaka', 'John', 'Halima', 'David', 'Esther',
+    'Ibrahim', 'Joy', 'Uche', 'Sade', 'Femi', 'Nkechi', 'Segun',
+]
+LAST_NAMES = [
+    'Okafor', 'Adeyemi', 'Bello', 'Eze', 'Ogunleye', 'Abubakar', 'Nwosu', 'Balogun', 'Okonkwo', 'Lawal',
+    'Ibe', 'Adebayo', 'Mohammed', 'Chukwu', 'Olawale', 'Danjuma', 'Obi', 'Salami', 'Nnamdi', 'Akande',
+]
+PHONE_PREFIXES = ['0803', '0806', '0813', '0816', '0703', '0706', '0805', '0807', '0815', '0905', '0809', '0817']
+PAYMENT_METHODS = [('cash', 5), ('transfer', 4), ('card', 2), ('mobile', 1)]
+# Relative number of orders per weekday (Monday first)
+WEEKDAY_WEIGHTS = [1.0, 0.9, 0.9, 1.0, 1.2, 1.4, 0.3]
+OPENING_HOURS = (7, 20)
+TURNAROUND_DAYS = 3
+ITEM_FIELDS = (
+    'order', 'clothing_type', 'quantity', 'description', 'price_per_item', 'total_price',
+    'washing', 'ironing', 'dry_clean', 'stain_removal', 'rewashing',
+)
+PAYMENT_FIELDS = ('order', 'amount', 'payment_method', 'transaction_id', 'received_by', 'payment_date', 'notes')
+
+
+@contextmanager
+def manual_timestamps(*fields):
+    """Let bulk_create write historical values into auto_now_add fields"""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def insert_rows(model, fields, rows):
+    """
+    INSERT plain value tuples with executemany. Skips bulk_create's
+    per-value preparation, which dominates when writing millions of small
+    rows; values must already be what the database takes (see adapt_datetime).
+    """
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(field).column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+                           f'VALUES ({placeholders})', rows)
+
+
+def adapt_datetime(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def zipf_cum_weights(count, exponent, rng):
+    """Cumulative Zipf weights over ``count`` things, ranks shuffled so popularity isn't tied to creation order"""
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate users, clothing types, customers, orders, items, payments and queue entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--items', type=int, help="Total order items (default: 3 per order)")
+        parser.add_argument('--staff', type=int, default=8, help="Staff accounts besides bench-admin (default: 8)")
+        parser.add_argument('--clothing-types', type=int, default=len(GARMENTS))
+        parser.add_argument('--days', type=int, default=365, help="Days of history (default: 365)")
+        parser.add_argument('--password', default='benchmark', help="Password of the generated accounts")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (same seed, same data)")
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Orders written per transaction (default: 5000)",
+        )
+        parser.add_argument('--skip-search', action='store_true', help="Don't rebuild the search index")
+
+    def handle(self, *args, **options):
+        if options['customers'] < 1 or options['orders'] < 0 or options['days'] < 1:
+            raise CommandError("Need at least one customer and one day of history")
+        self.rng = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        items = options['items'] if options['items'] is not None else options['orders'] * 3
+        self.items_per_order = items / options['orders'] if options['orders'] else 0
+        self.now = timezone.now()
+        self.start = self.now - datetime.timedelta(days=options['days'])
+
+        staff = self.create_staff(options['staff'], options['password'])
+        self.staff_ids = [user.pk for user in staff]
+        self.staff_weights = list(itertools.accumulate(self.rng.uniform(0.5, 2) for _ in staff))
+        self.garments = self.create_clothing_types(options['clothing_types'], staff[0])
+        self.garment_weights = zipf_cum_weights(len(self.garments), 1.1, self.rng)
+
+        fields = (
+            Customer._meta.get_field('registration_date'), LaundryOrder._meta.get_field('order_date'),
+            LaundryOrder._meta.get_field('registered_at'), Payment._meta.get_field('payment_date'),
+        )
+        with manual_timestamps(*fields):
+            self.create_customers(options['customers'], max(1, options['chunk_size']))
+            active = self.create_orders(options['orders'], max(1, options['chunk_size']))
+
+        self.rebuild_derived(active, options['skip_search'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(staff)} users, {len(self.garments)} clothing types, {options['customers']} customers, "
+            f"{options['orders']} orders, {self.item_count} items, {self.payment_count} payments"
+        ))
+
+    def progress(self, label, done, total):
+        if self.verbosity:
+            self.stdout.write(f"\r{label}: {done}/{total}", ending='' if done < total else '\n')
+
+    def random_time(self, count):
+        """``count`` sorted timestamps over the period, busier towards the end and on Saturdays"""
+        days = (self.now - self.start).days + 1
+        day_weights = list(itertools.accumulate(
+            (1 + 2 * day / days) * WEEKDAY_WEIGHTS[(self.start + datetime.timedelta(days=day)).weekday()]
+            for day in range(days)
+        ))
+        first_day = timezone.localtime(self.start).replace(hour=0, minute=0, second=0, microsecond=0)
+        times = []
+        for day in self.rng.choices(range(days), cum_weights=day_weights, k=count):
+            hour = self.rng.triangular(*OPENING_HOURS, 10)
+            moment = first_day + datetime.timedelta(days=day, hours=hour)
+            times.append(min(moment, self.now))
+        times.sort()
+        return times
+
+    def create_staff(self, count, password):
+        User = get_user_model()
+        password = make_password(password)
+        wanted = [('bench-admin', 'admin')] + [(f'bench-staff-{n}', 'staff') for n in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=[name for name, _ in wanted]).values_list('username', flat=True))
+        User.objects.bulk_create(
+            User(username=name, password=password, user_type=user_type, is_staff=user_type == 'admin',
+                 first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES))
+            for name, user_type in wanted if name not in existing
+        )
+        return list(User.objects.filter(username__in=[name for name, _ in wanted]).order_by('pk'))
+
+    def create_clothing_types(self, count, creator):
+        names = GARMENTS + [(f'Garment {n}', 500 + 100 * (n % 20)) for n in range(len(GARMENTS) + 1, count + 1)]
+        existing = set(ClothingType.objects.values_list('name', flat=True))
+        ClothingType.objects.bulk_create(
+            ClothingType(
+                name=name, price=Decimal(price), urgent_price=Decimal(price * 3 // 2), created_by=creator,
+            )
+            for name, price in names[:count] if name not in existing
+        )
+        return list(ClothingType.objects.filter(is_active=True).values_list('pk', 'price', 'urgent_price'))
+
+    def create_customers(self, count, chunk_size):
+        rng = self.rng
+        self.customer_ids, self.customer_times = [], self.random_time(count)
+        for start in range(0, count, chunk_size):
+            batch = []
+            for registered in self.customer_times[start:start + chunk_size]:
+                phone = rng.choice(PHONE_PREFIXES) + f'{rng.randrange(10 ** 7):07d}'
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                batch.append(Customer(
+                    name=f'{first} {last}',
+                    phone=phone,
+                    whatsapp_number=phone if rng.random() < 0.6 else '',
+                    email=f'{first}.{last}{rng.randrange(1000)}@example.com'.lower() if rng.random() < 0.3 else '',
+                    registration_date=registered,
+                    registered_by_id=self.pick_staff(),
+                ))
+            # The manager's bulk_create assigns customer IDs and indexes them
+            with transaction.atomic():
+                Customer.objects.bulk_create(batch)
+            self.customer_ids.extend(customer.pk for customer in batch)
+            self.progress("customers", min(start + chunk_size, count), count)
+        # Only customers registered by then can place an order; they are in
+        # registration order, so they are a prefix of the list
+        self.customer_cum = zipf_cum_weights(count, 0.9, rng)
+
+    def pick_staff(self):
+        return self.staff_ids[bisect.bisect(self.staff_weights, self.rng.random() * self.staff_weights[-1])]
+
+    def pick_customer(self, moment):
+        registered = max(1, bisect.bisect_right(self.customer_times, moment))
+        point = self.rng.random() * self.customer_cum[registered - 1]
+        return self.customer_ids[min(bisect.bisect(self.customer_cum, point), registered - 1)]
+
+    def pick_status(self, age):
+        rng = self.rng
+        if age > 7:
+            status = 'collected' if rng.random() < 0.93 else 'not_collected'
+        elif age >= TURNAROUND_DAYS:
+            status = rng.choices(['ready', 'collected', 'not_collected'], [4, 5, 1])[0]
+        else:
+            status = rng.choices(['pending', 'washing', 'ironing', 'ready'], [4, 3, 2, 1])[0]
+        if status == 'collected':
+            payment = 'paid' if rng.random() < 0.97 else 'partial'
+        elif status == 'not_collected':
+            payment = rng.choices(['overdue', 'partial', 'paid'], [5, 2, 3])[0]
+        else:
+            payment = rng.choices(['pending', 'partial', 'paid'], [5, 2, 3])[0]
+        return status, payment
+
+    def item_count_for_order(self):
+        mean = self.items_per_order
+        if mean <= 1:
+            return 1 if self.rng.random() < mean else 0
+        return min(40, 1 + int(self.rng.expovariate(1 / (mean - 0.5))))
+
+    def create_orders(self, count, chunk_size):
+        """Orders with their items and payments; returns ``{status: [pk, ...]}`` of orders still in process"""
+        rng = self.rng
+        self.item_count = self.payment_count = 0
+        active = {stage: [] for stage in ProcessingQueue.STAGES}
+        times = self.random_time(count)
+        numbers = self.reserve_order_numbers(times)
+        for start in range(0, count, chunk_size):
+            orders, order_items, paid = [], [], []
+            for moment in times[start:start + chunk_size]:
+                age = (self.now - moment).days
+                status, payment = self.pick_status(age)
+                urgent = rng.random() < 0.1
+                lines = []
+                for _ in range(self.item_count_for_order()):
+                    pk, price, urgent_price = self.garments[
+                        bisect.bisect(self.garment_weights, rng.random() * self.garment_weights[-1])
+                    ]
+                    quantity = min(20, 1 + int(rng.expovariate(1 / 1.5)))
+                    rewash = rng.random() < 0.02
+                    lines.append((pk, quantity, Decimal(0) if rewash else price, urgent_price, rewash))
+                subtotal = sum(quantity * price for _, quantity, price, _, _ in lines)
+                urgent_fee = (
+                    sum(quantity * urgent_price for _, quantity, _, urgent_price, _ in lines) - subtotal
+                    if urgent else Decimal('0.00')
+                )
+                total = subtotal + urgent_fee
+                amount_paid = {
+                    'paid': total, 'pending': Decimal('0.00'), 'overdue': Decimal('0.00'),
+                }.get(payment, (total / 2).quantize(Decimal('0.01')))
+                delivery = moment.date() + datetime.timedelta(days=1 if urgent else TURNAROUND_DAYS)
+                collected = None
+                if status == 'collected':
+                    collected = min(moment + datetime.timedelta(days=rng.uniform(TURNAROUND_DAYS, 9)), self.now)
+                orders.append(LaundryOrder(
+                    order_number=next(numbers), customer_id=self.pick_customer(moment), staff_id=self.pick_staff(),
+                    order_date=moment, registered_at=moment, expected_delivery_date=delivery,
+                    status=status, payment_status=payment, is_urgent=urgent,
+                    subtotal=subtotal, urgent_fee=urgent_fee, total_price=total,
+                    amount_paid=amount_paid, balance=total - amount_paid,
+                    picked_up_at=collected, actual_delivery_date=collected,
+                ))
+                order_items.append(lines)
+                paid.append(collected or moment)
+
+            with transaction.atomic():
+                LaundryOrder.objects.bulk_create(orders)
+                items = [
+                    (order.pk, pk, quantity, None, price, quantity * price,
+                     True, rng.random() < 0.6, False, rng.random() < 0.05, rewash)
+                    for order, lines in zip(orders, order_items)
+                    for pk, quantity, price, _, rewash in lines
+                ]
+                insert_rows(OrderItem, ITEM_FIELDS, items)
+                payments = [
+                    (order.pk, order.amount_paid, rng.choices(*zip(*PAYMENT_METHODS))[0], '', order.staff_id,
+                     adapt_datetime(when), '')
+                    for order, when in zip(orders, paid) if order.amount_paid
+                ]
+                insert_rows(Payment, PAYMENT_FIELDS, payments)
+            self.item_count += len(items)
+            self.payment_count += len(payments)
+            for order in orders:
+                if order.status in active:
+                    active[order.status].append(order.pk)
+            self.progress("orders", min(start + chunk_size, count), count)
+        return active
+
+    def reserve_order_numbers(self, times):
+        """LAU-YYYYMMDD-NNNN numbers for orders at ``times``, taken from (and advancing) the per-day counters"""
+        per_day = Counter(timezone.localdate(moment) for moment in times)
+        first = {}
+        with transaction.atomic():
+            for day, count in per_day.items():
+                counter, _ = OrderNumberSequence.objects.get_or_create(
+                    day=day, defaults={'last_value': OrderNumberSequence._existing_max(day)},
+                )
+                first[day] = counter.last_value + 1
+                counter.last_value += count
+                counter.save(update_fields=['last_value'])
+
+        def numbers():
+            for moment in times:
+                day = timezone.localdate(moment)
+                yield f"LAU-{day:%Y%m%d}-{first[day]:04d}"
+                first[day] += 1
+        return numbers()
+
+    def rebuild_derived(self, active, skip_search):
+        verbosity = max(0, self.verbosity - 1)
+        stdout = self.stdout if self.verbosity else io.StringIO()
+        for stage, order_ids in active.items():
+            ProcessingQueue.follow_status(order_ids, stage)
+        call_command('reconcile', only=['customers'], chunk_size=5000, verbosity=verbosity, stdout=stdout)
+        call_command('rebuild_daily_summary', verbosity=verbosity, stdout=stdout)
+        if not skip_search:
+            call_command('rebuild_search_index', verbosity=verbosity, stdout=stdout)
+        caching.invalidate_all()
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0013_ordernumbersequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+def create_fts_index(apps, schema_editor):
+    # SQLite gets an FTS5 table (trigram tokenizer) filled from existing rows.
+    # Other databases use SearchTrigram; fill it with `manage.py rebuild_search_index`.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS laundry_search_fts "
+        "USING fts5(c0, c1, c2, c3, tokenize='trigram')"
+    )
+    schema_editor.execute(
+        "INSERT INTO laundry_search_fts (rowid, c0, c1, c2, c3) "
+        "SELECT o.id * 2, o.order_number, c.name, c.phone, '' "
+        "FROM laundry_laundryorder o JOIN laundry_customer c ON c.id = o.customer_id"
+    )
+    user_table = apps.get_model('laundry', 'Customer')._meta.get_field('registered_by').related_model._meta.db_table
+    schema_editor.execute(
+        "INSERT INTO laundry_search_fts (rowid, c0, c1, c2, c3) "
+        "SELECT c.id * 2 + 1, c.name, c.customer_id, COALESCE(u.username, ''), "
+        "substr(c.registration_date, 1, 19) "
+        f"FROM laundry_customer c LEFT JOIN {user_table} u ON u.id = c.registered_by_id"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS laundry_search_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0014_customeridsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('gram', models.CharField(max_length=3)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'gram', 'object_id'], name='laundry_trigram_lookup'), models.Index(fields=['kind', 'object_id'], name='laundry_trigram_object')],
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from laundry.phones import PHONE_FIELDS, normalize
+
+
+def index_existing_phones(apps, schema_editor):
+    Customer = apps.get_model('laundry', 'Customer')
+    CustomerPhone = apps.get_model('laundry', 'CustomerPhone')
+    rows = []
+    for pk, *numbers in Customer.objects.values_list('pk', *PHONE_FIELDS).iterator(chunk_size=2000):
+        for field, number in zip(PHONE_FIELDS, numbers):
+            e164 = normalize(number)
+            if e164:
+                rows.append(CustomerPhone(customer_id=pk, field=field, e164=e164, reversed_digits=e164[::-1]))
+        if len(rows) >= 2000:
+            CustomerPhone.objects.bulk_create(rows)
+            rows = []
+    CustomerPhone.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerPhone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('phone', 'Phone'), ('whatsapp_number', 'WhatsApp'), ('alternate_phone', 'Alternate phone')], max_length=20)),
+                ('e164', models.CharField(max_length=20)),
+                ('reversed_digits', models.CharField(max_length=20)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phone_numbers', to='laundry.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['e164', 'customer'], name='laundry_phone_e164'), models.Index(fields=['reversed_digits', 'customer'], name='laundry_phone_suffix')],
+            },
+        ),
+        migrations.RunPython(index_existing_phones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_summary(apps, schema_editor):
+    # Same rollup as DailyOrderSummary.rebuild(), on the historical models
+    LaundryOrder = apps.get_model('laundry', 'LaundryOrder')
+    DailyOrderSummary = apps.get_model('laundry', 'DailyOrderSummary')
+    rows = LaundryOrder.objects.order_by().annotate(day=TruncDate('registered_at')).values('day', 'staff').annotate(
+        order_count=Count('pk'),
+        pending_count=Count('pk', filter=Q(payment_status='pending')),
+        total_price=Sum('total_price'),
+        amount_paid=Sum('amount_paid'),
+    )
+    DailyOrderSummary.objects.bulk_create(
+        [DailyOrderSummary(staff_id=row.pop('staff'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0016_customer_phone_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('staff', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['staff', 'day'], name='laundry_summary_staff_day')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'staff'), name='laundry_summary_day_staff')],
+            },
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_facts(apps, schema_editor):
+    # Same rollups as DailyStatusCount/DailyItemSales.rebuild(), on the historical models
+    LaundryOrder = apps.get_model('laundry', 'LaundryOrder')
+    OrderItem = apps.get_model('laundry', 'OrderItem')
+    DailyStatusCount = apps.get_model('laundry', 'DailyStatusCount')
+    DailyItemSales = apps.get_model('laundry', 'DailyItemSales')
+
+    statuses = LaundryOrder.objects.order_by().annotate(day=TruncDate('registered_at')).values(
+        'day', 'status'
+    ).annotate(order_count=Count('pk'))
+    DailyStatusCount.objects.bulk_create(
+        [DailyStatusCount(**row) for row in statuses.iterator()], batch_size=1000,
+    )
+
+    items = OrderItem.objects.order_by().annotate(day=TruncDate('order__registered_at')).values(
+        'day', 'clothing_type'
+    ).annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+    DailyItemSales.objects.bulk_create(
+        [DailyItemSales(clothing_type_id=row.pop('clothing_type'), **row) for row in items.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0017_daily_order_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='laundry_status_day_status')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('clothing_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='laundry.clothingtype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'clothing_type'), name='laundry_items_day_type')],
+            },
+        ),
+        migrations.RunPython(backfill_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+STAGES = ('pending', 'washing', 'ironing')
+POSITION_GAP = 1 << 16
+
+
+def queue_by_status(apps, schema_editor):
+    # Entries now follow their order's status: same rules as
+    # ProcessingQueue.follow_status(), on the historical models
+    LaundryOrder = apps.get_model('laundry', 'LaundryOrder')
+    ProcessingQueue = apps.get_model('laundry', 'ProcessingQueue')
+    ProcessingQueue.objects.exclude(order__status__in=STAGES).delete()
+
+    entries = {entry.order_id: entry for entry in ProcessingQueue.objects.all()}
+    orders = LaundryOrder.objects.filter(status__in=STAGES).order_by('-is_urgent', 'registered_at', 'pk')
+    created, updated = [], []
+    counters = dict.fromkeys(STAGES, 0)
+    for order in orders.only('pk', 'status').iterator():
+        counters[order.status] += 1
+        entry = entries.get(order.pk) or ProcessingQueue(order_id=order.pk)
+        entry.current_stage = order.status
+        entry.position = counters[order.status] * POSITION_GAP
+        (updated if entry.pk else created).append(entry)
+    ProcessingQueue.objects.bulk_create(created, batch_size=1000)
+    ProcessingQueue.objects.bulk_update(updated, ['current_stage', 'position'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0019_stage_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='processingqueue',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='processingqueue',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='processingqueue',
+            name='position',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='processingqueue',
+            index=models.Index(fields=['current_stage', 'claimed_at', 'position'], name='laundry_queue_stage_claim'),
+        ),
+        migrations.RunPython(queue_by_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laundry', '0020_processing_queue_engine'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['registration_date', 'id'], name='laundry_customer_registered'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['total_spent'], name='laundry_customer_spent'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['order_date', 'id'], name='laundry_order_date'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['staff', 'order_date', 'id'], name='laundry_order_staff_date'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['status', 'order_date', 'id'], name='laundry_order_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['payment_status', 'order_date', 'id'], name='laundry_order_payment_date'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['staff', 'payment_status', 'order_date'], name='laundry_order_staff_payment'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['registered_at', 'id'], name='laundry_order_registered'),
+        ),
+        migrations.AddIndex(
+            model_name='laundryorder',
+            index=models.Index(fields=['staff', 'registered_at', 'id'], name='laundry_order_staff_registered'),
+        ),
+    ]
@@ -1,12 +1,22 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.conf import settings
 from django.utils import timezone 
 from django.contrib.auth.models import User
-from django.db.models import Max
-import random
-import string
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Mod, Round, TruncDate
+from django.db.models.lookups import Exact, GreaterThan
+import datetime
+import logging
+from collections import defaultdict
 from decimal import Decimal
 
+from . import caching, events, phones, pricing, search
+from .identifiers import format_customer_id, format_tag_code
+
+logger = logging.getLogger(__name__)
+
 # Create your models here.
 class ClothingType(models.Model):
     name = models.CharField(max_length=100)  # e.g., "Shirt", "Jeans", "Blouse"
@@ -28,6 +38,117 @@ class ClothingType(models.Model):
     def __str__(self):
         return f"{self.name} - ${self.price}"
 
+class CustomerIdSequence(models.Model):
+    """
+    Single-row counter behind Customer.customer_id.
+
+    ``reserve(n)`` takes a block of ``n`` numbers with one F() increment,
+    so a bulk import of thousands of customers costs one UPDATE.
+    """
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.last_value)
+
+    @classmethod
+    def reserve(cls, count=1):
+        """Reserve ``count`` consecutive numbers and return them as a range"""
+        counter = cls.objects.filter(pk=1)
+        with transaction.atomic():
+            if not counter.update(last_value=F('last_value') + count):
+                cls.objects.get_or_create(pk=1)
+                counter.update(last_value=F('last_value') + count)
+            last_value = counter.values_list('last_value', flat=True).get()
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    def assign(cls, customers):
+        """Give every customer without an ID one from a single reserved block"""
+        pending = [c for c in customers if not c.customer_id]
+        if pending:
+            for customer, number in zip(pending, cls.reserve(len(pending))):
+                customer.customer_id = format_customer_id(customer.phone, number)
+        return customers
+
+
+class CustomerQuerySet(models.QuerySet):
+    def with_order_total(self):
+        """Annotate ``order_total``: the sum of the customer's order totals"""
+        order_total = LaundryOrder.objects.filter(
+            customer=OuterRef('pk')
+        ).values('customer').annotate(total=Sum('total_price')).values('total')
+        return self.annotate(order_total=Coalesce(
+            Subquery(order_total),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ))
+
+    def with_star_rank(self, over=None):
+        """
+        Annotate ``star_rank`` (0-5) relative to the top spender in this queryset.
+
+        Same rule the customer list has always used, evaluated in SQL:
+        round(total_spent / max_spent * 5) with Python's round-half-to-even,
+        and at least 1 star for anyone who has spent something.
+
+        Pass ``over`` (a Customer queryset) to rank against the top spender
+        of that list instead, e.g. the full filtered list when this queryset
+        is narrowed down to a single page.
+        """
+        if over is None:
+            max_spent = Window(Max('total_spent'))
+        else:
+            max_spent = Subquery(over.order_by('-total_spent').values('total_spent')[:1])
+        ratio = ExpressionWrapper(
+            Cast('total_spent', models.FloatField()) / Cast(max_spent, models.FloatField()) * 5,
+            output_field=models.FloatField(),
+        )
+        floor = Floor(ratio)
+        rounded = Case(
+            # Exact halves go to the even neighbour, like Python's round()
+            When(Exact(ratio - floor, 0.5), then=floor + Mod(floor, 2)),
+            default=Round(ratio),
+            output_field=models.FloatField(),
+        )
+        has_top_spender = GreaterThan(max_spent, 0)
+        return self.annotate(star_rank=Case(
+            When(has_top_spender & GreaterThan(rounded, 0), then=Cast(rounded, models.IntegerField())),
+            When(has_top_spender & GreaterThan(F('total_spent'), 0), then=Value(1)),
+            default=Value(0),
+            output_field=models.IntegerField(),
+        ))
+
+    def drifted(self):
+        """Customers whose stored total_spent no longer matches their orders"""
+        return self.with_order_total().annotate(
+            drift=F('total_spent') - F('order_total')
+        ).filter(Q(drift__gte=Decimal('0.005')) | Q(drift__lte=Decimal('-0.005')))
+
+
+    def by_phone(self, number, exact=False):
+        """
+        Customers with ``number`` in any phone field, typed in any format.
+
+        By default ``number`` may be just the last few digits (at least
+        phones.MIN_SUFFIX_DIGITS); ``exact=True`` matches the full number only.
+        """
+        ids = phones.matching_customer_ids(number, exact=exact)
+        if ids is None:
+            return self.none()
+        return self.filter(pk__in=ids)
+
+
+class CustomerManager(models.Manager.from_queryset(CustomerQuerySet)):
+    def bulk_create(self, objs, *args, **kwargs):
+        # Bulk imports skip save(), so allocate their IDs here in one block
+        objs = CustomerIdSequence.assign(list(objs))
+        created = super().bulk_create(objs, *args, **kwargs)
+        search.index_customers([c for c in created if c.pk is not None])
+        phones.index_customers(created)
+        caching.bump(caching.CUSTOMERS)
+        return created
+
+
 class Customer(models.Model):
     customer_id = models.CharField(max_length=20, unique=True, editable=False)
     name = models.CharField(max_length=200)
@@ -39,29 +160,100 @@ class Customer(models.Model):
     registration_date = models.DateTimeField(auto_now_add=True)
     total_spent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     registered_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='registered_customers')
+
+    objects = CustomerManager()
+
+    class Meta:
+        indexes = [
+            # Customer list (keyset pages, newest first) and top-spender lookups
+            models.Index(fields=['registration_date', 'id'], name='laundry_customer_registered'),
+            models.Index(fields=['total_spent'], name='laundry_customer_spent'),
+        ]
+
+    # Fields that appear in the search index (customer and order documents)
+    SEARCH_FIELDS = {'name', 'phone', 'customer_id', 'registered_by', 'registered_by_id', 'registration_date'}
     
     def update_total_spent(self):
         """Recalculate total spent from all orders"""
         self.total_spent = self.orders.aggregate(total=models.Sum('total_price'))['total'] or 0
-        self.save()
+        self.save(update_fields=['total_spent'])
+
+    @classmethod
+    def apply_spent_deltas(cls, deltas):
+        """
+        Add ``{customer_pk: amount}`` to total_spent with atomic F() updates.
+
+        Order saves call this with the change in the order's total instead of
+        re-aggregating every order the customer has. With
+        LAUNDRY_VERIFY_TOTAL_SPENT on, each touched customer is checked
+        against a full aggregate afterwards and any drift is logged and fixed.
+        """
+        for pk, delta in deltas.items():
+            if pk is not None and delta:
+                cls.objects.filter(pk=pk).update(
+                    total_spent=Round(F('total_spent') + delta, 2)
+                )
+
+        if getattr(settings, 'LAUNDRY_VERIFY_TOTAL_SPENT', False):
+            for customer in cls.objects.filter(pk__in=deltas.keys()).drifted():
+                logger.warning(
+                    "total_spent drift for customer %s: stored %s, orders sum to %s",
+                    customer.customer_id, customer.total_spent, customer.order_total,
+                )
+                customer.update_total_spent()
 
     def __str__(self):
         return f"{self.name} - {self.phone} ({self.customer_id})"
 
     def save(self, *args, **kwargs):
         if not self.customer_id:
-            # Generate ID based on phone + random string
-            # Example: CUST-5785-XY
-            last_four = self.phone[-4:] if self.phone else "0000"
-            random_str = ''.join(random.choices(string.ascii_uppercase, k=2))
-            self.customer_id = f"CUST-{last_four}-{random_str}"
-            
-            # Check for rare collision
-            while Customer.objects.filter(customer_id=self.customer_id).exists():
-                random_str = ''.join(random.choices(string.ascii_uppercase, k=2))
-                self.customer_id = f"CUST-{last_four}-{random_str}"
+            # Generate ID based on phone + sequence number
+            # Example: CUST-5785-000AK
+            CustomerIdSequence.assign([self])
+
+        update_fields = kwargs.get('update_fields')
+        reindex = update_fields is None or bool(set(update_fields) & self.SEARCH_FIELDS)
+        reindex_phones = update_fields is None or bool(set(update_fields) & set(phones.PHONE_FIELDS))
+        previous = None
+        if (reindex or reindex_phones) and not self._state.adding:
+            previous = Customer.objects.filter(pk=self.pk).values('name', *phones.PHONE_FIELDS).first()
+
+        if not self._state.adding and update_fields is None:
+            # total_spent is kept by atomic deltas; never write back a stale copy
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'total_spent'
+            ]
                 
         super().save(*args, **kwargs)
+        caching.bump(caching.CUSTOMERS)
+
+        # Keep the search index in step
+        if reindex:
+            search.index_customers([self])
+            if previous and (previous['name'], previous['phone']) != (self.name, self.phone):
+                search.reindex_customer_orders(self)
+        if reindex_phones and (
+            previous is None
+            or any(previous[field] != getattr(self, field) for field in phones.PHONE_FIELDS)
+        ):
+            phones.index_customers([self])
+
+    def delete(self, *args, **kwargs):
+        order_pks = list(self.orders.values_list('pk', flat=True))
+        staff_ids = set(self.orders.values_list('staff_id', flat=True))
+        pk = self.pk
+        with transaction.atomic():
+            # Orders and items go with the customer without their own delete()
+            for rollup in ORDER_ROLLUPS:
+                rollup.remove(self.orders.all())
+            DailyItemSales.remove(OrderItem.objects.filter(order__customer=self))
+            result = super().delete(*args, **kwargs)
+            caching.bump(caching.CUSTOMERS)
+            caching.bump_orders(*staff_ids)
+        search.remove_customer(pk)
+        search.get_backend().remove(search.ORDER, order_pks)
+        return result
 
 
 class LaundryOrder(models.Model):
@@ -137,16 +329,19 @@ class LaundryOrder(models.Model):
     )
 
     def calculate_totals(self):
+        # Single pass over the items (clothing types joined in the same query)
+        items = list(self.items.select_related('clothing_type'))
+
         # 1. Subtotal from items
         self.subtotal = sum(
-            item.total_price for item in self.items.all()
+            item.total_price for item in items
         )
 
         # 2. Urgent pricing from admin
         if self.is_urgent:
             self.urgent_fee = sum(
                 item.quantity * item.clothing_type.urgent_price
-                for item in self.items.all()
+                for item in items
             ) - self.subtotal
         else:
             self.urgent_fee = Decimal("0.00")
@@ -164,32 +359,476 @@ class LaundryOrder(models.Model):
         self.balance = self.total_price - self.amount_paid
     
 
+    # Stored values that customer totals and the daily summary are derived from
+    TRACKED_FIELDS = (
+        'customer_id', 'staff_id', 'registered_at', 'status', 'payment_status', 'total_price', 'amount_paid',
+    )
+
     class Meta:
         ordering = ['-registered_at']
+        # The order list pages by (order_date, id), the dashboard by
+        # (registered_at, id); each filter the list offers gets an index that
+        # also yields that order, so a page is an index walk, never a sort
+        indexes = [
+            models.Index(fields=['order_date', 'id'], name='laundry_order_date'),
+            models.Index(fields=['staff', 'order_date', 'id'], name='laundry_order_staff_date'),
+            models.Index(fields=['status', 'order_date', 'id'], name='laundry_order_status_date'),
+            models.Index(fields=['payment_status', 'order_date', 'id'], name='laundry_order_payment_date'),
+            models.Index(fields=['staff', 'payment_status', 'order_date'], name='laundry_order_staff_payment'),
+            models.Index(fields=['registered_at', 'id'], name='laundry_order_registered'),
+            models.Index(fields=['staff', 'registered_at', 'id'], name='laundry_order_staff_registered'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Generate order number: LAU-YYYYMMDD-XXXX
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_order = LaundryOrder.objects.filter(
-                order_number__contains=date_str
-            ).count()
-            self.order_number = f"LAU-{date_str}-{last_order+1:04d}"
-        
+            # The number comes from the per-day counter and is taken in the
+            # same transaction as the insert, so a failed save leaves no gap
+            try:
+                with transaction.atomic():
+                    self.order_number = OrderNumberSequence.next_order_number()
+                    self._save_and_reprice(*args, **kwargs)
+            except Exception:
+                self.order_number = ''
+                raise
+        else:
+            self._save_and_reprice(*args, **kwargs)
+
+    def _save_and_reprice(self, *args, **kwargs):
         # Always recalculate totals before saving (if we have a PK)
         if self.pk:
             self.calculate_totals()
-        super().save(*args, **kwargs)
-        
-        # Update customer total spent for ranking
-        if self.customer:
-            self.customer.update_total_spent()
+
+        with transaction.atomic(savepoint=False):
+            # Lock and read the stored row so the delta is exact under concurrent edits
+            previous = None
+            if self.pk:
+                previous = LaundryOrder.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values(*self.TRACKED_FIELDS).first()
+            super().save(*args, **kwargs)
+
+            # Dashboard and report fact tables
+            current = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+            for rollup in ORDER_ROLLUPS:
+                rollup.apply_change(previous, current)
+            caching.bump_orders(previous and previous['staff_id'], self.staff_id)
+            if not previous or previous['status'] != self.status:
+                ProcessingQueue.follow_status([self.pk], self.status)
+            
+            # Update customer total spent for ranking
+            deltas = defaultdict(Decimal)
+            if previous:
+                deltas[previous['customer_id']] -= previous['total_price']
+            deltas[self.customer_id] += self.total_price
+            Customer.apply_spent_deltas(deltas)
+
+            # The search document only changes with the order number or customer
+            if not previous or previous['customer_id'] != self.customer_id:
+                search.index_orders([self])
+
+    @classmethod
+    def move_status(cls, order_ids, status, rows=None, from_status=None):
+        """
+        Set ``status`` on many orders with one UPDATE, keeping the fact
+        tables, caches and processing queue in step. A status change leaves
+        prices, customer totals and search documents alone, so the per-order
+        save() path is not needed. ``rows`` may pass the orders' locked
+        TRACKED_FIELDS and ``is_urgent`` (keyed by pk) when the caller
+        already read them. With ``from_status`` only orders still in that
+        status are moved. Returns the number of orders that changed.
+        """
+        with transaction.atomic(savepoint=False):
+            if rows is None:
+                locked = cls.objects.select_for_update().filter(pk__in=order_ids)
+                if from_status is not None:
+                    locked = locked.filter(status=from_status)
+                rows = {row['pk']: row for row in locked.values('pk', 'is_urgent', *cls.TRACKED_FIELDS)}
+            changes = [
+                (row, {**row, 'status': status}) for row in rows.values()
+                if row['status'] != status and from_status in (None, row['status'])
+            ]
+            if changes:
+                updates = cls.objects.filter(pk__in=[row['pk'] for row, _ in changes])
+                if from_status is not None:
+                    updates = updates.filter(status=from_status)
+                updates.update(status=status)
+                for rollup in ORDER_ROLLUPS:
+                    rollup.apply_changes(changes)
+                caching.bump_orders(*{row['staff_id'] for row, _ in changes})
+                ProcessingQueue.follow_status(
+                    [row['pk'] for row, _ in changes], status,
+                    urgency={row['pk']: row['is_urgent'] for row, _ in changes},
+                )
+        return len(changes)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic(savepoint=False):
+            previous = LaundryOrder.objects.select_for_update().filter(
+                pk=self.pk
+            ).values(*self.TRACKED_FIELDS).first()
+            # Items go with the order without their own delete()
+            DailyItemSales.remove(OrderItem.objects.filter(order_id=pk))
+            result = super().delete(*args, **kwargs)
+            if previous:
+                Customer.apply_spent_deltas({previous['customer_id']: -previous['total_price']})
+                for rollup in ORDER_ROLLUPS:
+                    rollup.apply_change(previous=previous)
+                caching.bump_orders(previous['staff_id'])
+            search.remove_order(pk)
+        return result
     
     def __str__(self):
         return self.order_number
 
 
 
+class OrderNumberSequence(models.Model):
+    """
+    Per-day counter behind LAU-YYYYMMDD-NNNN order numbers.
+
+    Each allocation is a single-row ``UPDATE ... SET last_value = last_value + 1``,
+    so it costs the same no matter how many orders exist, and the row lock
+    makes concurrent terminals queue for the next number instead of
+    colliding on it.
+    """
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+    @staticmethod
+    def _existing_max(day):
+        """Highest number already issued for a day (used once, when its counter row is created)"""
+        prefix = f"LAU-{day:%Y%m%d}-"
+        numbers = LaundryOrder.objects.filter(
+            order_number__startswith=prefix
+        ).values_list('order_number', flat=True)
+        suffixes = [int(n[len(prefix):]) for n in numbers if n[len(prefix):].isdigit()]
+        return max(suffixes, default=0)
+
+    @classmethod
+    def next_value(cls, day):
+        """Atomically take the next number for ``day``"""
+        counter = cls.objects.filter(day=day)
+        with transaction.atomic():
+            # Write first so the row (or database) lock is held from the start
+            if not counter.update(last_value=F('last_value') + 1):
+                cls.objects.get_or_create(
+                    day=day,
+                    defaults={'last_value': lambda: cls._existing_max(day)},
+                )
+                counter.update(last_value=F('last_value') + 1)
+            return counter.values_list('last_value', flat=True).get()
+
+    @classmethod
+    def next_order_number(cls):
+        today = timezone.now().date()
+        return f"LAU-{today:%Y%m%d}-{cls.next_value(today):04d}"
+
+
+def local_day_range(day):
+    """
+    ``(start, end)`` datetimes of a local calendar day, for half-open
+    ``field__gte=start, field__lt=end`` filters that can use an index
+    (unlike ``field__date=day``, which wraps the column in a function).
+    """
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
+
+class DailyRollup(models.Model):
+    """
+    Base for the per-day fact tables behind the dashboard and reports.
+
+    A row holds ``COUNTERS`` for one ``day`` (the order's registration
+    date) and ``GROUP_BY`` key. Writes move a single object's contribution
+    with F() deltas (``apply_change``), cascaded deletes subtract a whole
+    queryset in one grouped query (``remove``), and ``rebuild`` recomputes
+    rows from the source table.
+    """
+    day = models.DateField()
+
+    # (attname on this model, lookup on the source rows) for the rest of the key
+    GROUP_BY = ()
+    COUNTERS = ()
+    # Lookup on the source rows that gives the day
+    DAY_SOURCE = 'registered_at'
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def source(cls):
+        """Queryset the rows are computed from"""
+        raise NotImplementedError
+
+    @classmethod
+    def aggregates(cls):
+        """``{counter: aggregate}`` over the source rows of one key"""
+        raise NotImplementedError
+
+    @classmethod
+    def contribution(cls, row):
+        """``(key, counters)`` for one source row given as a dict of its fields"""
+        raise NotImplementedError
+
+    @classmethod
+    def key_fields(cls):
+        return ('day',) + tuple(attname for attname, _ in cls.GROUP_BY)
+
+    @classmethod
+    def apply_change(cls, previous=None, current=None):
+        """Move one source row's contribution from its ``previous`` to its ``current`` state"""
+        cls.apply_changes([(previous, current)])
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """``apply_change`` for many ``(previous, current)`` pairs, one update per key"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for previous, current in changes:
+            for row, sign in ((previous, -1), (current, 1)):
+                if row:
+                    key, counters = cls.contribution(row)
+                    for name, value in counters.items():
+                        deltas[key][name] += sign * value
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Add ``{key: {counter: amount}}`` with atomic F() updates"""
+        for key, counters in deltas.items():
+            changes = {name: value for name, value in counters.items() if value}
+            if not changes:
+                continue
+            values = {name: F(name) + value for name, value in changes.items()}
+            lookup = dict(zip(cls.key_fields(), key))
+            row = cls.objects.filter(**lookup)
+            with transaction.atomic(savepoint=False):
+                if row.update(**values):
+                    continue
+                # First change for this key: start the row at the delta
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(**lookup, **changes)
+                except IntegrityError:
+                    # Another transaction created it since the UPDATE
+                    row.update(**values)
+
+    @classmethod
+    def _rollup(cls, rows):
+        """``(key, counters)`` per key for a queryset of source rows"""
+        sources = [source for _, source in cls.GROUP_BY]
+        grouped = rows.order_by().annotate(day=TruncDate(cls.DAY_SOURCE)).values('day', *sources)
+        for row in grouped.annotate(**cls.aggregates()).iterator():
+            key = (row.pop('day'),) + tuple(row.pop(source) for source in sources)
+            yield key, row
+
+    @classmethod
+    def remove(cls, rows):
+        """Subtract a queryset of source rows (e.g. before a cascading delete)"""
+        cls.apply_deltas({
+            key: {name: -value for name, value in counters.items()}
+            for key, counters in cls._rollup(rows)
+        })
+
+    @classmethod
+    def rebuild(cls, since=None, batch_size=1000):
+        """Recompute the rows (from ``since``, a date, onwards); returns the rows written"""
+        rows = cls.source()
+        existing = cls.objects.all()
+        if since:
+            start, _ = local_day_range(since)
+            rows = rows.filter(**{f'{cls.DAY_SOURCE}__gte': start})
+            existing = existing.filter(day__gte=since)
+
+        written = 0
+        with transaction.atomic():
+            existing.delete()
+            batch = []
+            for key, counters in cls._rollup(rows):
+                batch.append(cls(**dict(zip(cls.key_fields(), key)), **counters))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            cls.objects.bulk_create(batch)
+        caching.invalidate_all()
+        return written + len(batch)
+
+
+class DailyOrderSummary(DailyRollup):
+    """
+    Orders rolled up per registration day and staff member.
+
+    Kept in step by LaundryOrder.save()/delete(), so the dashboard reads a
+    handful of summary rows instead of counting and summing the whole order
+    table. ``manage.py rebuild_daily_summary`` recomputes it from the orders.
+    """
+    # No database constraint: deleting a user must not rewrite history rows
+    staff = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, related_name='+',
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    GROUP_BY = (('staff_id', 'staff'),)
+    COUNTERS = ('order_count', 'pending_count', 'total_price', 'amount_paid')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'staff'], name='laundry_summary_day_staff'),
+        ]
+        indexes = [
+            models.Index(fields=['staff', 'day'], name='laundry_summary_staff_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.staff_id}: {self.order_count} orders"
+
+    @classmethod
+    def source(cls):
+        return LaundryOrder.objects.all()
+
+    @classmethod
+    def aggregates(cls):
+        return {
+            'order_count': Count('pk'),
+            'pending_count': Count('pk', filter=Q(payment_status='pending')),
+            'total_price': Sum('total_price'),
+            'amount_paid': Sum('amount_paid'),
+        }
+
+    @classmethod
+    def contribution(cls, order):
+        key = (timezone.localdate(order['registered_at']), order['staff_id'])
+        return key, {
+            'order_count': 1,
+            'pending_count': 1 if order['payment_status'] == 'pending' else 0,
+            'total_price': order['total_price'],
+            'amount_paid': order['amount_paid'],
+        }
+
+
+class DailyStatusCount(DailyRollup):
+    """Orders registered per day, by their current status (sales report)"""
+    status = models.CharField(max_length=20)
+    order_count = models.PositiveIntegerField(default=0)
+
+    GROUP_BY = (('status', 'status'),)
+    COUNTERS = ('order_count',)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='laundry_status_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.status}: {self.order_count}"
+
+    @classmethod
+    def source(cls):
+        return LaundryOrder.objects.all()
+
+    @classmethod
+    def aggregates(cls):
+        return {'order_count': Count('pk')}
+
+    @classmethod
+    def contribution(cls, order):
+        return (timezone.localdate(order['registered_at']), order['status']), {'order_count': 1}
+
+
+class DailyItemSales(DailyRollup):
+    """Garments and item revenue per order day and clothing type (sales report)"""
+    clothing_type = models.ForeignKey(ClothingType, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    GROUP_BY = (('clothing_type_id', 'clothing_type'),)
+    COUNTERS = ('quantity', 'revenue')
+    DAY_SOURCE = 'order__registered_at'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'clothing_type'], name='laundry_items_day_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.clothing_type_id}: {self.quantity}"
+
+    @classmethod
+    def source(cls):
+        return OrderItem.objects.all()
+
+    @classmethod
+    def aggregates(cls):
+        return {'quantity': Sum('quantity'), 'revenue': Sum('total_price')}
+
+    @classmethod
+    def contribution(cls, item):
+        key = (timezone.localdate(item['registered_at']), item['clothing_type_id'])
+        return key, {'quantity': item['quantity'], 'revenue': item['total_price']}
+
+
+# Fact tables updated from the order save/delete paths
+ORDER_ROLLUPS = (DailyOrderSummary, DailyStatusCount)
+
+
+class SearchTrigram(models.Model):
+    """
+    One distinct 3-character gram of an order or customer search document.
+
+    Used as the search index on databases without SQLite FTS5 (see
+    laundry/search.py); ``kind`` is search.ORDER or search.CUSTOMER.
+    """
+    kind = models.PositiveSmallIntegerField()
+    object_id = models.BigIntegerField()
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'gram', 'object_id'], name='laundry_trigram_lookup'),
+            models.Index(fields=['kind', 'object_id'], name='laundry_trigram_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}:{self.gram}"
+
+
+class CustomerPhone(models.Model):
+    """
+    One customer phone number, normalised for lookups (see laundry/phones.py).
+
+    ``e164`` answers "whose number is this?", ``reversed_digits`` answers
+    "whose number ends in these digits?" with a prefix range on the index.
+    """
+    FIELD_CHOICES = [
+        ('phone', 'Phone'),
+        ('whatsapp_number', 'WhatsApp'),
+        ('alternate_phone', 'Alternate phone'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='phone_numbers')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    e164 = models.CharField(max_length=20)
+    reversed_digits = models.CharField(max_length=20)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['e164', 'customer'], name='laundry_phone_e164'),
+            models.Index(fields=['reversed_digits', 'customer'], name='laundry_phone_suffix'),
+        ]
+
+    def __str__(self):
+        return f"+{self.e164} ({self.get_field_display()})"
+
+
 class OrderItem(models.Model):
 
     order = models.ForeignKey(
@@ -218,6 +857,15 @@ class OrderItem(models.Model):
     stain_removal = models.BooleanField(default=False)
     rewashing = models.BooleanField(default=False, help_text="If checked, item is free (rewash)")
 
+    # Stored values the item sales facts are derived from
+    TRACKED_FIELDS = ('clothing_type_id', 'quantity', 'total_price')
+
+    def _tracked_values(self):
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def _fact_row(self, values):
+        return {**values, 'registered_at': self.order.registered_at}
+
     def save(self, *args, **kwargs):
         # Always lock BASE price from admin
         if self.rewashing:
@@ -226,18 +874,68 @@ class OrderItem(models.Model):
             self.price_per_item = self.clothing_type.price
             
         self.total_price = self.quantity * self.price_per_item
-        super().save(*args, **kwargs)
+        with transaction.atomic(savepoint=False):
+            previous = None
+            if self.pk:
+                previous = OrderItem.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values(*self.TRACKED_FIELDS).first()
+            super().save(*args, **kwargs)
+            change = (previous and self._fact_row(previous), self._fact_row(self._tracked_values()))
+            # Applied with the block's other items when repricing is deferred
+            if not pricing.defer_facts(DailyItemSales, *change):
+                DailyItemSales.apply_change(*change)
         
-        # Trigger update on the parent order
-        self.order.save()
+        # Trigger update on the parent order (once per block when deferred)
+        if not pricing.mark_dirty(self.order):
+            self.order.save()
 
     def __str__(self):
         return f"{self.quantity} x {self.clothing_type.name}"
 
+    @property
+    def tag_code(self):
+        """Code printed on the item's garment tags (see scanning.resolve)"""
+        return format_tag_code(self.pk)
+
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        self.order.save()
+        with transaction.atomic(savepoint=False):
+            previous = OrderItem.objects.select_for_update().filter(
+                pk=self.pk
+            ).values(*self.TRACKED_FIELDS).first()
+            result = super().delete(*args, **kwargs)
+            if previous and not pricing.defer_facts(DailyItemSales, self._fact_row(previous)):
+                DailyItemSales.apply_change(previous=self._fact_row(previous))
+        if not pricing.mark_dirty(self.order):
+            self.order.save()
+        return result
+
+
 
+class StageEvent(models.Model):
+    """
+    One scan that moved (or confirmed) an order's processing stage.
+
+    Append-only: rows are written in bulk by scanning.ingest() and never
+    updated, so an order's history is its events in ``scanned_at`` order.
+    """
+    order = models.ForeignKey(LaundryOrder, on_delete=models.CASCADE, related_name='stage_events')
+    item = models.ForeignKey(OrderItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    code = models.CharField(max_length=30)
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    scanned_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+    )
+    scanned_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'scanned_at'], name='laundry_stage_order_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.code}: {self.from_status} -> {self.to_status}"
 
 # class OrderItem(models.Model):
     
@@ -299,31 +997,247 @@ class Payment(models.Model):
 
 
 class ProcessingQueue(models.Model):
+    """
+    Orders waiting at (or being worked on in) a processing stage.
+
+    Stages are the order statuses in ``STAGES``: an entry follows its
+    order's status (LaundryOrder.save(), LaundryOrder.move_status()) and is
+    removed once the order leaves the last stage. Finishing an entry
+    (``complete``) moves the order on to the next status.
+
+    Positions are spaced ``POSITION_GAP`` apart within a stage, so an urgent
+    order is slotted in after the earlier urgent ones by taking a position
+    in between, without renumbering the rest; a stage is only respaced when
+    a gap runs out. Equal positions (possible when two terminals append at
+    once) are ordered by id.
+
+    ``claim_next`` hands each entry to exactly one worker: with
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it,
+    otherwise with a conditional UPDATE that only one contender can win.
+    Claims older than ``CLAIM_TIMEOUT`` count as abandoned and are given
+    back on the next claim.
+
+    Every change is pushed to live screens (``events.broker``) as the
+    affected orders' current cards once its transaction commits.
+    """
+    STAGES = ('pending', 'washing', 'ironing')
+    # Status an order moves to when its entry in each stage is completed
+    NEXT_STATUS = {'pending': 'washing', 'washing': 'ironing', 'ironing': 'ready'}
+    POSITION_GAP = 1 << 16
+    CLAIM_TIMEOUT = datetime.timedelta(hours=2)
+
     order = models.OneToOneField(LaundryOrder, on_delete=models.CASCADE)
-    position = models.IntegerField()
-    current_stage = models.CharField(max_length=20)  # washing, ironing, packing
+    position = models.BigIntegerField()
+    current_stage = models.CharField(max_length=20)  # one of STAGES
     assigned_to = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.SET_NULL, 
         null=True, 
         blank=True
     )
+    claimed_at = models.DateTimeField(null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['position']
-    
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['current_stage', 'claimed_at', 'position'], name='laundry_queue_stage_claim'),
+        ]
+
+    def __str__(self):
+        return f"{self.current_stage} #{self.position}: {self.order_id}"
+
+    @classmethod
+    def _slots(cls, stage, urgent, normal):
+        """
+        Free positions for ``urgent`` urgent and ``normal`` other entries in
+        ``stage``: urgent ones after the stage's last urgent entry, the rest
+        at the tail.
+        """
+        gap = cls.POSITION_GAP
+        entries = cls.objects.filter(current_stage=stage)
+        bounds = entries.aggregate(tail=Max('position'), last_urgent=Max('position', filter=Q(order__is_urgent=True)))
+        tail, last_urgent = bounds['tail'], bounds['last_urgent']
+
+        urgent_slots = []
+        if urgent:
+            after = entries.order_by('position')
+            if last_urgent is not None:
+                after = after.filter(position__gt=last_urgent)
+            following = after.values_list('position', flat=True).first()
+            if following is None:
+                # Nothing but urgent orders: append
+                start = tail if tail is not None else 0
+                urgent_slots = [start + gap * i for i in range(1, urgent + 1)]
+                tail = urgent_slots[-1]
+            else:
+                low = last_urgent if last_urgent is not None else following - gap * (urgent + 1)
+                step = (following - low) // (urgent + 1)
+                if step < 1:
+                    cls.respace(stage)
+                    return cls._slots(stage, urgent, normal)
+                urgent_slots = [low + step * i for i in range(1, urgent + 1)]
+
+        start = tail if tail is not None else 0
+        return urgent_slots, [start + gap * i for i in range(1, normal + 1)]
+
+    @classmethod
+    def respace(cls, stage):
+        """Renumber a stage ``POSITION_GAP`` apart, keeping its order"""
+        entries = list(cls.objects.filter(current_stage=stage).order_by('position', 'id'))
+        for index, entry in enumerate(entries, start=1):
+            entry.position = index * cls.POSITION_GAP
+        cls.objects.bulk_update(entries, ['position'], batch_size=500)
+
+    @classmethod
+    def follow_status(cls, order_ids, status, urgency=None):
+        """
+        Put the orders' entries in the stage matching ``status`` (at the back
+        of it, urgent ones behind earlier urgent orders) and drop their claims;
+        remove them if ``status`` is not a queue stage. ``urgency``
+        ({pk: is_urgent}) saves a query when the caller has already read it.
+        """
+        order_ids = list(order_ids)
+        if status not in cls.STAGES:
+            cls.objects.filter(order_id__in=order_ids).delete()
+            cls._publish_on_commit(order_ids)
+            return
+        with transaction.atomic(savepoint=False):
+            existing = {
+                entry.order_id: entry
+                for entry in cls.objects.select_for_update().filter(order_id__in=order_ids)
+            }
+            if urgency is None:
+                urgency = dict(LaundryOrder.objects.filter(pk__in=order_ids).values_list('pk', 'is_urgent'))
+            moving = [
+                pk for pk in order_ids
+                if pk in urgency and (pk not in existing or existing[pk].current_stage != status)
+            ]
+            urgent = [pk for pk in moving if urgency[pk]]
+            normal = [pk for pk in moving if not urgency[pk]]
+            if not moving:
+                return
+            urgent_slots, normal_slots = cls._slots(status, len(urgent), len(normal))
+
+            created, updated = [], []
+            for pk, position in zip(urgent + normal, urgent_slots + normal_slots):
+                entry = existing.get(pk) or cls(order_id=pk)
+                entry.current_stage, entry.position = status, position
+                entry.assigned_to, entry.claimed_at = None, None
+                (updated if entry.pk else created).append(entry)
+            cls.objects.bulk_create(created)
+            cls.objects.bulk_update(updated, ['current_stage', 'position', 'assigned_to', 'claimed_at'])
+            cls._publish_on_commit(moving)
+
+    @classmethod
+    def board(cls, order_ids=None):
+        """Display-board cards (plain dicts) for every entry, or for the given orders' entries"""
+        entries = cls.objects.filter(current_stage__in=cls.STAGES)
+        if order_ids is not None:
+            entries = entries.filter(order_id__in=order_ids)
+        rows = entries.order_by('position', 'id').values_list(
+            'order_id', 'order__order_number', 'order__customer__name', 'order__is_urgent',
+            'current_stage', 'position', 'claimed_at', 'added_at',
+        )
+        return [
+            {
+                'order': order_id, 'order_number': number, 'customer': customer, 'urgent': urgent,
+                'stage': stage, 'position': position, 'claimed': claimed_at is not None, 'added_at': added_at,
+            }
+            for order_id, number, customer, urgent, stage, position, claimed_at, added_at in rows
+        ]
+
+    @classmethod
+    def publish_changes(cls, order_ids):
+        """Send live screens the current cards of these orders (``stage`` None: off the board)"""
+        if not events.broker.listening():
+            return
+        cards = cls.board(order_ids)
+        on_board = {card['order'] for card in cards}
+        cards += [{'order': pk, 'stage': None} for pk in order_ids if pk not in on_board]
+        events.broker.publish('orders', cards)
+
+    @classmethod
+    def _publish_on_commit(cls, order_ids):
+        order_ids = list(order_ids)
+        if order_ids:
+            transaction.on_commit(lambda: cls.publish_changes(order_ids))
+
     @classmethod
     def add_to_queue(cls, order):
-        last_position = cls.objects.aggregate(Max('position'))['position__max'] or 0
-        queue_item = cls.objects.create(
-            order=order,
-            position=last_position + 1,
-            current_stage='registered'
+        """Queue ``order`` at the stage matching its status"""
+        cls.follow_status([order.pk], order.status)
+        return cls.objects.filter(order=order).first()
+
+    @classmethod
+    def waiting(cls, stage):
+        """Unclaimed entries of ``stage``, next first"""
+        return cls.objects.filter(current_stage=stage, claimed_at__isnull=True).order_by('position', 'id')
+
+    @classmethod
+    def release_stale(cls, stage, now=None):
+        """Give back claims on ``stage`` older than CLAIM_TIMEOUT (abandoned by their worker)"""
+        expired = (now or timezone.now()) - cls.CLAIM_TIMEOUT
+        return cls.objects.filter(current_stage=stage, claimed_at__lt=expired).update(
+            assigned_to=None, claimed_at=None,
         )
-        return queue_item
-    
+
     @classmethod
     def get_next_in_queue(cls, stage):
-        return cls.objects.filter(current_stage=stage).first()
+        """Next entry of ``stage`` (without claiming it)"""
+        return cls.waiting(stage).first()
+
+    @classmethod
+    def claim_next(cls, stage, worker):
+        """Atomically take the next entry of ``stage`` for ``worker``; None if there is none"""
+        now = timezone.now()
+        with transaction.atomic():
+            cls.release_stale(stage, now)
+            if connection.features.has_select_for_update_skip_locked:
+                entry = cls.waiting(stage).select_for_update(skip_locked=True).first()
+                if entry:
+                    entry.assigned_to, entry.claimed_at = worker, now
+                    entry.save(update_fields=['assigned_to', 'claimed_at'])
+                    cls._publish_on_commit([entry.order_id])
+                return entry
+
+            # No SKIP LOCKED (SQLite): only one contender's conditional UPDATE
+            # of a candidate succeeds, and a loser moves on to the next one
+            tried = []
+            while True:
+                pk = cls.waiting(stage).exclude(pk__in=tried).values_list('pk', flat=True).first()
+                if pk is None:
+                    return None
+                if cls.objects.filter(pk=pk, claimed_at__isnull=True).update(assigned_to=worker, claimed_at=now):
+                    entry = cls.objects.get(pk=pk)
+                    cls._publish_on_commit([entry.order_id])
+                    return entry
+                tried.append(pk)
+
+    def release(self):
+        """Give the entry back to its stage unfinished"""
+        ProcessingQueue.objects.filter(pk=self.pk, claimed_at=self.claimed_at).update(
+            assigned_to=None, claimed_at=None,
+        )
+        self.assigned_to, self.claimed_at = None, None
+        ProcessingQueue._publish_on_commit([self.order_id])
+
+    def complete(self):
+        """
+        Finish this stage: the order moves to the next status (and its entry
+        with it). Returns False and changes nothing when this entry is stale:
+        the order has left ``current_stage`` since the entry was read (say,
+        it was scanned on), or the claim has expired and been taken again.
+        """
+        with transaction.atomic():
+            current = ProcessingQueue.objects.select_for_update().filter(
+                pk=self.pk, order_id=self.order_id, current_stage=self.current_stage,
+                assigned_to=self.assigned_to_id, claimed_at=self.claimed_at,
+            ).exists()
+            if not current:
+                return False
+            moved = LaundryOrder.move_status(
+                [self.order_id], self.NEXT_STATUS[self.current_stage], from_status=self.current_stage,
+            )
+        return moved == 1
 
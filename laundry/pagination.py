@@ -0,0 +1,156 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, each page remembers the sort key of its first and last
+row, and the next page asks for rows strictly past that key:
+
+    WHERE order_date <= :d AND (order_date < :d OR id < :id)
+    ORDER BY order_date DESC, id DESC LIMIT 51
+
+With an index on the sort key, page 5,000 costs the same as page 1.
+The cursor is an opaque, URL-safe token holding the key and direction.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 50
+# Counting stops here; the page then shows "10000+" instead of an exact total
+COUNT_CAP = 10000
+
+
+def _encode(direction, values):
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None, None
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        return None, None
+    return direction, values
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor,
+                 count=None, count_is_exact=True):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def count_label(self):
+        if self.count is None:
+            return ''
+        return str(self.count) if self.count_is_exact else f"{self.count}+"
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering``, a tuple like ('-order_date', '-id').
+
+    The last field must be unique (normally the primary key) so the order
+    is total. Filters already on the queryset are kept as they are.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PER_PAGE, count_cap=COUNT_CAP):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+        self.per_page = per_page
+        self.count_cap = count_cap
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def _serialize(self, values):
+        return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+    def _deserialize(self, values):
+        if len(values) != len(self.fields):
+            return None
+        try:
+            return [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            return None
+
+    def _after(self, values, forward):
+        """Rows strictly past ``values`` in the (forward or reversed) sort order"""
+        lookups = []
+        for descending in self.descending:
+            moves_down = descending == forward
+            lookups.append('lt' if moves_down else 'gt')
+
+        # Leading bound lets the database seek on the first key column
+        first = self.fields[0]
+        bound = Q(**{f'{first}__{lookups[0]}e': values[0]})
+        past = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookups[i]}': values[i]})
+            for j in range(i):
+                step &= Q(**{self.fields[j]: values[j]})
+            past |= step
+        return bound & past
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def estimated_count(self):
+        """Exact count up to ``count_cap``; beyond that the count stops early"""
+        if self.count_cap is None:
+            return self.queryset.count(), True
+        count = self.queryset.order_by()[:self.count_cap + 1].count()
+        if count > self.count_cap:
+            return self.count_cap, False
+        return count, True
+
+    def page(self, cursor=None, with_count=False):
+        direction, values = _decode(cursor) if cursor else (None, None)
+        key = self._deserialize(values) if values is not None else None
+        if key is None:
+            direction = None
+
+        queryset = self.queryset
+        if direction == 'prev':
+            rows = list(queryset.filter(self._after(key, forward=False))
+                        .order_by(*self._reversed_ordering())[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            if direction == 'next':
+                queryset = queryset.filter(self._after(key, forward=True))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = direction == 'next'
+
+        next_cursor = _encode('next', self._serialize(self._key(rows[-1]))) if rows and has_next else None
+        previous_cursor = _encode('prev', self._serialize(self._key(rows[0]))) if rows and has_previous else None
+
+        count, exact = self.estimated_count() if with_count else (None, True)
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor, count, exact)
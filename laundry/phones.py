@@ -0,0 +1,129 @@
+"""
+Normalised phone-number index.
+
+Customers give their number in whatever shape they remember it
+("0803 123 4567", "+234 803-123-4567", "8031234567"), and the three
+Customer phone fields store it raw. Each non-empty number gets a
+CustomerPhone row holding:
+
+* ``e164``: the full number as digits only, country code included
+  (2348031234567), for exact lookups;
+* ``reversed_digits``: the same digits reversed, so "ends with 4567"
+  becomes a prefix range on an index ('7654' <= key < '7654:'). Leading
+  zeros of a partial number are part of the ending ("0567").
+
+Rows are rewritten from Customer.save() and bulk_create, and removed with
+the customer (CASCADE).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+
+PHONE_FIELDS = ('phone', 'whatsapp_number', 'alternate_phone')
+# Numbers with at most this many digits and no international prefix are
+# national numbers without the trunk 0
+NATIONAL_MAX_DIGITS = 10
+# Fewer trailing digits than this match too many customers to be useful
+MIN_SUFFIX_DIGITS = 4
+# Characters people type inside phone numbers
+PHONE_PUNCTUATION = set(' +-().')
+
+
+def digits_only(value):
+    return ''.join(c for c in (value or '') if c.isdigit())
+
+
+def country_code():
+    return getattr(settings, 'LAUNDRY_PHONE_COUNTRY_CODE', '234')
+
+
+def lookup_key(value):
+    """
+    The digits a number must end with to match ``value``. Partial numbers
+    are taken as typed, leading zeros included ("0567" is the last four
+    digits of ...0567); only a complete number with its international or
+    trunk prefix ("+234 803...", "0803 123 4567") is normalised first.
+    """
+    value = (value or '').strip()
+    digits = digits_only(value)
+    if value.startswith('+') or (digits.startswith('0') and len(digits) > NATIONAL_MAX_DIGITS):
+        return normalize(value)
+    return digits
+
+
+def normalize(value):
+    """E.164 digits (no '+') for ``value``, or '' when it has no digits"""
+    value = (value or '').strip()
+    digits = digits_only(value)
+    if not digits:
+        return ''
+    if value.startswith('+'):
+        return digits
+    if digits.startswith('00'):
+        return digits[2:]
+    if digits.startswith('0'):
+        return country_code() + digits[1:]
+    if len(digits) <= NATIONAL_MAX_DIGITS:
+        return country_code() + digits
+    return digits
+
+
+def is_phone_query(value):
+    """True for search text that is a (partial) phone number"""
+    value = (value or '').strip()
+    return (
+        bool(value)
+        and all(c.isdigit() or c in PHONE_PUNCTUATION for c in value)
+        and len(lookup_key(value)) >= MIN_SUFFIX_DIGITS
+    )
+
+
+# Keeping the index in sync ------------------------------------------------
+
+def index_customers(customers):
+    CustomerPhone = apps.get_model('laundry', 'CustomerPhone')
+    customers = [c for c in customers if c.pk is not None]
+    if not customers:
+        return
+    CustomerPhone.objects.filter(customer__in=[c.pk for c in customers]).delete()
+    rows = []
+    for customer in customers:
+        for field in PHONE_FIELDS:
+            e164 = normalize(getattr(customer, field))
+            if e164:
+                rows.append(CustomerPhone(
+                    customer_id=customer.pk, field=field,
+                    e164=e164, reversed_digits=e164[::-1],
+                ))
+    CustomerPhone.objects.bulk_create(rows, batch_size=1000)
+
+
+# Querying -----------------------------------------------------------------
+
+def exact_filter(value):
+    """CustomerPhone filter for the full number ``value``"""
+    return Q(e164=normalize(value))
+
+
+def suffix_filter(value):
+    """CustomerPhone filter for numbers ending in the digits of ``value``"""
+    key = lookup_key(value)[::-1]
+    # Digits sort before ':', so this range is exactly "starts with key"
+    return Q(reversed_digits__gte=key, reversed_digits__lt=key + ':')
+
+
+def matching_customer_ids(value, exact=False):
+    """
+    Customer pks with any phone field matching ``value`` (usable as
+    ``pk__in=...``); None when ``value`` is too short to look up.
+    """
+    CustomerPhone = apps.get_model('laundry', 'CustomerPhone')
+    if exact:
+        if not normalize(value):
+            return None
+        condition = exact_filter(value)
+    else:
+        if len(lookup_key(value)) < MIN_SUFFIX_DIGITS:
+            return None
+        condition = suffix_filter(value)
+    return CustomerPhone.objects.filter(condition).values('customer_id')
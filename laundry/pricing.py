@@ -0,0 +1,106 @@
+"""
+Deferred order repricing.
+
+Normally every OrderItem.save()/delete() calls order.save(), which reprices the
+order and then re-totals the customer. Inside a ``deferred_repricing()`` block
+item writes only mark their order dirty, and each dirty order is repriced
+exactly once when the outermost block commits. The items' fact-table changes
+(DailyItemSales) are queued the same way and applied in one pass, one
+update per day and clothing type instead of one per item.
+
+    with deferred_repricing():
+        item_formset.save()
+
+It can also be used as a view decorator:
+
+    @deferred_repricing()
+    def create_order(request): ...
+"""
+import sys
+import threading
+from contextlib import ContextDecorator
+
+from django.db import transaction
+
+_state = threading.local()
+
+
+def _dirty_orders():
+    if not hasattr(_state, 'depth'):
+        _state.depth = 0
+        _state.orders = {}
+        _state.facts = {}
+    return _state
+
+
+def is_deferred():
+    """True when the current thread is inside a deferred_repricing() block"""
+    return getattr(_state, 'depth', 0) > 0
+
+
+def mark_dirty(order):
+    """
+    Queue an order for repricing at the end of the current block.
+
+    Returns False when repricing is not deferred, so the caller should
+    reprice straight away.
+    """
+    if not is_deferred() or order.pk is None:
+        return False
+    # Keep the most recent instance so its other field changes are saved too
+    _state.orders[order.pk] = order
+    return True
+
+
+def defer_facts(rollup, previous=None, current=None):
+    """
+    Queue a source-row change for ``rollup.apply_changes`` at the end of the
+    current block. Returns False when not deferred (apply it straight away).
+    """
+    if not is_deferred():
+        return False
+    _state.facts.setdefault(rollup, []).append((previous, current))
+    return True
+
+
+def _discard():
+    _state.orders = {}
+    _state.facts = {}
+
+
+def flush():
+    """Apply the queued fact changes, then reprice every dirty order once"""
+    state = _dirty_orders()
+    facts, state.facts = state.facts, {}
+    for rollup, changes in facts.items():
+        rollup.apply_changes(changes)
+    orders, state.orders = state.orders, {}
+    for order in orders.values():
+        order.save()
+
+
+class deferred_repricing(ContextDecorator):
+    """Batch order/customer total updates into one pass per transaction"""
+
+    def __enter__(self):
+        state = _dirty_orders()
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        state.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        state = _dirty_orders()
+        state.depth -= 1
+        try:
+            if state.depth == 0:
+                if exc_type is None:
+                    # Reprice inside the transaction, just before it commits
+                    flush()
+                else:
+                    _discard()
+        except BaseException:
+            _discard()
+            self._atomic.__exit__(*sys.exc_info())
+            raise
+        return self._atomic.__exit__(exc_type, exc_value, traceback)
@@ -0,0 +1,147 @@
+"""
+Resolve scanned codes to orders.
+
+Two kinds of code are printed:
+
+* garment tags carry the item's tag code (see identifiers.format_tag_code),
+  which encodes the item's primary key;
+* receipts carry the order number, which has its own unique index.
+
+Either way a scan is one indexed lookup, and a misread tag code fails its
+check character before the database is asked at all.
+
+``ingest`` applies a whole pile of scans (a washer load) at once: the codes
+are resolved in two queries, the orders move together through
+LaundryOrder.move_status() (one bulk UPDATE, one fact-table update per day
+and status) and every scan is logged as a StageEvent row, all in one
+transaction. ``scan`` does the same for the counter's single scan, on the
+row resolve() already loaded.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .identifiers import TAG_PREFIX, parse_tag_code
+from .models import LaundryOrder, OrderItem, StageEvent
+
+# Per-scan outcomes reported by ingest()
+MOVED = 'moved'
+UNCHANGED = 'unchanged'
+UNKNOWN = 'unknown'
+
+
+def resolve(code, staff=None, lock=False):
+    """
+    ``(order, item)`` for a scanned code in one query; ``item`` is None for
+    an order number. Returns None when nothing matches, or when ``staff``
+    is given and the order is not theirs. ``lock`` locks the order's row
+    (inside a transaction).
+    """
+    code = (code or '').strip().upper()
+    if code.startswith(TAG_PREFIX):
+        item_pk = parse_tag_code(code)
+        if item_pk is None:
+            return None
+        items = OrderItem.objects.select_related('order__customer', 'clothing_type').filter(pk=item_pk)
+        if staff is not None:
+            items = items.filter(order__staff=staff)
+        if lock:
+            items = items.select_for_update(of=('order',))
+        item = items.first()
+        return item and (item.order, item)
+
+    orders = LaundryOrder.objects.select_related('customer').filter(order_number=code)
+    if staff is not None:
+        orders = orders.filter(staff=staff)
+    if lock:
+        orders = orders.select_for_update(of=('self',))
+    order = orders.first()
+    return order and (order, None)
+
+
+def _parse(code):
+    """``(item pk, order number)`` for a scanned code; both None if it cannot match"""
+    code = (code or '').strip().upper()
+    if code.startswith(TAG_PREFIX):
+        return parse_tag_code(code), None
+    return None, code or None
+
+
+def ingest(codes, status, user=None, staff=None):
+    """
+    Move the orders behind ``codes`` to ``status`` and log every scan.
+
+    Returns one ``{'code', 'result', ...}`` dict per code, in order; the
+    result is MOVED, UNCHANGED (already there, or scanned earlier in the
+    batch) or UNKNOWN. ``staff`` limits the orders that can be moved.
+    """
+    parsed = [_parse(code) for code in codes]
+    item_pks = {item_pk for item_pk, _ in parsed if item_pk is not None}
+    numbers = {number for _, number in parsed if number is not None}
+
+    with transaction.atomic():
+        items = OrderItem.objects.filter(pk__in=item_pks)
+        if staff is not None:
+            items = items.filter(order__staff=staff)
+        item_orders = dict(items.values_list('pk', 'order_id'))
+
+        orders = LaundryOrder.objects.select_for_update().filter(
+            Q(pk__in=set(item_orders.values())) | Q(order_number__in=numbers)
+        )
+        if staff is not None:
+            orders = orders.filter(staff=staff)
+        rows = {
+            row['pk']: row
+            for row in orders.values('pk', 'order_number', 'is_urgent', *LaundryOrder.TRACKED_FIELDS)
+        }
+        by_number = {row['order_number']: pk for pk, row in rows.items()}
+
+        results, events, moving = [], [], set()
+        for code, (item_pk, number) in zip(codes, parsed):
+            order_pk = item_orders.get(item_pk) if item_pk is not None else by_number.get(number)
+            row = rows.get(order_pk)
+            if row is None:
+                results.append({'code': code, 'result': UNKNOWN})
+                continue
+            current = status if order_pk in moving else row['status']
+            if current != status:
+                moving.add(order_pk)
+            results.append({
+                'code': code,
+                'result': MOVED if current != status else UNCHANGED,
+                'order': order_pk,
+                'order_number': row['order_number'],
+                'from_status': current,
+                'status': status,
+            })
+            events.append(StageEvent(
+                order_id=order_pk, item_id=item_pk if item_pk in item_orders else None,
+                code=code[:30], from_status=current, to_status=status, scanned_by=user,
+            ))
+
+        LaundryOrder.move_status(moving, status, rows={pk: rows[pk] for pk in moving})
+        StageEvent.objects.bulk_create(events)
+    return results
+
+
+def scan(code, status, user=None, staff=None):
+    """
+    Move the order behind one scanned ``code`` to ``status`` and log the
+    scan: ``(order, item, result)`` with ``order`` already showing the new
+    status, or None for an unknown code. The code is resolved once, locked,
+    and the move reuses that row instead of reading the order again.
+    """
+    with transaction.atomic():
+        found = resolve(code, staff=staff, lock=True)
+        if not found:
+            return None
+        order, item = found
+        previous = order.status
+        if previous != status:
+            row = {'pk': order.pk, 'is_urgent': order.is_urgent}
+            row.update((name, getattr(order, name)) for name in LaundryOrder.TRACKED_FIELDS)
+            LaundryOrder.move_status([order.pk], status, rows={order.pk: row})
+            order.status = status
+        StageEvent.objects.create(
+            order=order, item=item, code=code[:30], from_status=previous, to_status=status, scanned_by=user,
+        )
+    return order, item, MOVED if previous != status else UNCHANGED
@@ -0,0 +1,283 @@
+"""
+Search index for orders and customers.
+
+The order/customer search boxes used to OR ``icontains`` over several
+joined columns, which is a full scan on every keystroke. Here each order
+and customer gets a small document of the fields staff search on, kept in
+sync from the model save paths:
+
+* SQLite: an FTS5 table with the trigram tokenizer, so a quoted query is a
+  case-insensitive substring match per field, with bm25 ranking.
+* Other databases: a SearchTrigram side table (one row per distinct
+  3-character gram). Candidates must contain every gram of the query and
+  are then checked with the original icontains filter on that small set.
+
+Queries shorter than 3 characters have no trigram to look up and fall back
+to the plain icontains filter. Customer searches that look like a phone
+number also match through the phone index (laundry/phones.py).
+``manage.py rebuild_search_index`` rebuilds everything (needed after bulk
+loads that bypass save()).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from . import phones
+
+ORDER = 0
+CUSTOMER = 1
+FTS_TABLE = 'laundry_search_fts'
+FTS_COLUMNS = 4
+MIN_QUERY_LENGTH = 3
+
+
+# Documents ----------------------------------------------------------------
+
+def order_fields(order_number, customer_name, customer_phone):
+    return [order_number, customer_name, customer_phone]
+
+
+def customer_fields(name, customer_id, registered_by, registration_date):
+    date = registration_date.strftime('%Y-%m-%d %H:%M:%S') if registration_date else ''
+    return [name, customer_id, registered_by or '', date]
+
+
+def order_document(order):
+    customer = order.customer
+    return order.pk, order_fields(order.order_number, customer.name, customer.phone)
+
+
+def customer_document(customer):
+    registered_by = customer.registered_by.username if customer.registered_by_id else ''
+    return customer.pk, customer_fields(
+        customer.name, customer.customer_id, registered_by, customer.registration_date
+    )
+
+
+def order_fallback(query):
+    return (
+        Q(order_number__icontains=query) |
+        Q(customer__name__icontains=query) |
+        Q(customer__phone__icontains=query)
+    )
+
+
+def customer_fallback(query):
+    return (
+        Q(name__icontains=query) |
+        Q(customer_id__icontains=query) |
+        Q(registered_by__username__icontains=query) |
+        Q(registration_date__icontains=query)
+    )
+
+
+# Backends -----------------------------------------------------------------
+
+class FTS5Backend:
+    """SQLite FTS5 table; rowid = object_id * 2 + kind"""
+    exact = True
+
+    def replace(self, kind, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(pk * 2 + kind,) for pk, _ in documents],
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, c0, c1, c2, c3) VALUES (%s, %s, %s, %s, %s)",
+                [
+                    (pk * 2 + kind, *(list(fields) + [''] * FTS_COLUMNS)[:FTS_COLUMNS])
+                    for pk, fields in documents
+                ],
+            )
+
+    def remove(self, kind, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(pk * 2 + kind,) for pk in pks],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    @staticmethod
+    def _phrase(query):
+        return '"' + query.replace('"', '""') + '"'
+
+    def matching_ids(self, kind, query):
+        """SQL expression usable as ``pk__in=...``"""
+        return RawSQL(
+            f"SELECT rowid / 2 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% 2 = %s",
+            [self._phrase(query), kind],
+        )
+
+    def ranked_ids(self, kind, query, limit, within=None):
+        sql = f"SELECT rowid / 2 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% 2 = %s"
+        params = [self._phrase(query), kind]
+        if within is not None:
+            within_sql, within_params = within.query.sql_with_params()
+            sql += f" AND rowid / 2 IN ({within_sql})"
+            params += within_params
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} ORDER BY rank LIMIT %s", [*params, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+def trigrams(text):
+    text = (text or '').lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramBackend:
+    """Portable n-gram side table (SearchTrigram)"""
+    exact = False
+
+    @property
+    def model(self):
+        return apps.get_model('laundry', 'SearchTrigram')
+
+    def replace(self, kind, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        self.remove(kind, [pk for pk, _ in documents])
+        self.model.objects.bulk_create(
+            [
+                self.model(kind=kind, object_id=pk, gram=gram)
+                for pk, fields in documents
+                for gram in set().union(*(trigrams(field) for field in fields))
+            ],
+            batch_size=1000,
+        )
+
+    def remove(self, kind, pks):
+        self.model.objects.filter(kind=kind, object_id__in=list(pks)).delete()
+
+    def clear(self):
+        self.model.objects.all().delete()
+
+    def _candidates(self, kind, query):
+        grams = trigrams(query)
+        return self.model.objects.filter(kind=kind, gram__in=grams).values('object_id').annotate(
+            matched=Count('gram', distinct=True)
+        ).filter(matched=len(grams))
+
+    def matching_ids(self, kind, query):
+        return self._candidates(kind, query).values('object_id')
+
+    def ranked_ids(self, kind, query, limit, within=None):
+        candidates = self._candidates(kind, query)
+        if within is not None:
+            candidates = candidates.filter(object_id__in=within)
+        # Every candidate has all grams; newest first
+        return list(candidates.order_by('-object_id').values_list('object_id', flat=True)[:limit])
+
+
+def get_backend():
+    name = getattr(settings, 'LAUNDRY_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'fts5' if connection.vendor == 'sqlite' else 'trigram'
+    return FTS5Backend() if name == 'fts5' else TrigramBackend()
+
+
+# Keeping the index in sync ------------------------------------------------
+
+def index_orders(orders):
+    get_backend().replace(ORDER, [order_document(order) for order in orders])
+
+
+def index_customers(customers):
+    get_backend().replace(CUSTOMER, [customer_document(customer) for customer in customers])
+
+
+def reindex_customer_orders(customer):
+    """Order documents carry the customer's name/phone; refresh them together"""
+    LaundryOrder = apps.get_model('laundry', 'LaundryOrder')
+    rows = LaundryOrder.objects.filter(customer=customer).values_list('pk', 'order_number')
+    get_backend().replace(ORDER, [
+        (pk, order_fields(order_number, customer.name, customer.phone))
+        for pk, order_number in rows.iterator()
+    ])
+
+
+def remove_order(pk):
+    get_backend().remove(ORDER, [pk])
+
+
+def remove_customer(pk):
+    get_backend().remove(CUSTOMER, [pk])
+
+
+def rebuild(chunk_size=2000, progress=None):
+    """Rebuild the whole index from the database; returns (orders, customers)"""
+    LaundryOrder = apps.get_model('laundry', 'LaundryOrder')
+    Customer = apps.get_model('laundry', 'Customer')
+    backend = get_backend()
+    backend.clear()
+
+    def load(kind, rows, to_fields):
+        count = 0
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append((row[0], to_fields(*row[1:])))
+            if len(batch) >= chunk_size:
+                backend.replace(kind, batch)
+                count += len(batch)
+                batch = []
+                if progress:
+                    progress(kind, count)
+        backend.replace(kind, batch)
+        return count + len(batch)
+
+    orders = load(ORDER, LaundryOrder.objects.order_by().values_list(
+        'pk', 'order_number', 'customer__name', 'customer__phone'
+    ), order_fields)
+    customers = load(CUSTOMER, Customer.objects.order_by().values_list(
+        'pk', 'name', 'customer_id', 'registered_by__username', 'registration_date'
+    ), customer_fields)
+    return orders, customers
+
+
+# Querying -----------------------------------------------------------------
+
+def _filter(queryset, kind, query, fallback):
+    query = (query or '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return queryset.filter(fallback(query))
+    backend = get_backend()
+    queryset = queryset.filter(pk__in=backend.matching_ids(kind, query))
+    if not backend.exact:
+        # Grams only narrow the candidates; confirm the real substring match
+        queryset = queryset.filter(fallback(query))
+    return queryset
+
+
+def filter_orders(queryset, query):
+    return _filter(queryset, ORDER, query, order_fallback)
+
+
+def filter_customers(queryset, query):
+    matches = _filter(queryset, CUSTOMER, query, customer_fallback)
+    if phones.is_phone_query(query):
+        # Numbers typed in any format, or their last few digits
+        matches = matches | queryset.filter(pk__in=phones.matching_customer_ids(query))
+    return matches
+
+
+def ranked_ids(kind, query, limit=10, within=None):
+    """
+    Best matches first (bm25 on FTS5); None when the query is too short.
+    ``within`` (a ``values('pk')`` queryset) restricts the matches before
+    the limit is taken, so a narrow restriction still fills it.
+    """
+    query = (query or '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return None
+    return get_backend().ranked_ids(kind, query, limit, within)
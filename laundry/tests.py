@@ -1,4 +1,37 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import threading
+import zipfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import caching, events, instrumentation, phones, scanning, search
+from .exports import XLSX_CONTENT_TYPE, xlsx_blocks
+from .forms import MAX_ORDER_ITEMS, CustomerForm
+from .identifiers import format_customer_id, format_tag_code, is_valid_customer_id, parse_tag_code
+from .models import (
+    ClothingType, Customer, DailyItemSales, DailyOrderSummary, DailyStatusCount, LaundryOrder, OrderItem,
+    ProcessingQueue, StageEvent, local_day_range,
+)
+from .pagination import KeysetPaginator
+from .pricing import deferred_repricing
+from .views import ORDERS_PER_PAGE, QUICK_SEARCH_LIMIT, _get_filtered_orders
+
+User = get_user_model()
+
 
 # Create your tests here.
 class OrderCreationTest(TestCase):
@@ -14,16 +47,1306 @@ class OrderCreationTest(TestCase):
         )
         self.shirt = ClothingType.objects.create(
             name='Shirt',
-            price=5.00
+            price=Decimal('5.00'),
+            urgent_price=Decimal('8.00')
         )
-    
+
     def test_order_creation(self):
         self.client.login(username='staff1', password='testpass123')
-        
+
         response = self.client.post(reverse('create_order'), {
-            'customer': self.customer.id,
-            'express_service': False,
+            'order-customer': self.customer.id,
+            'order-expected_delivery_date': '2030-01-01',
+            'items-TOTAL_FORMS': 1,
+            'items-INITIAL_FORMS': 0,
+            'items-0-clothing_type': self.shirt.id,
+            'items-0-quantity': 2,
+        })
+
+        order = LaundryOrder.objects.get()
+        self.assertRedirects(response, reverse('order_detail', args=[order.id]))
+        self.assertEqual(order.staff, self.user)
+        self.assertEqual(order.total_price, Decimal('10.00'))
+
+
+class DeferredRepricingTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Jane Doe', phone='08012345678')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        self.jeans = ClothingType.objects.create(name='Jeans', price=Decimal('700.00'), urgent_price=Decimal('1000.00'))
+
+    def _new_order(self, **kwargs):
+        return LaundryOrder.objects.create(
+            customer=self.customer,
+            expected_delivery_date=timezone.now().date(),
+            **kwargs
+        )
+
+    def _add_items(self, order):
+        OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=3)
+        OrderItem.objects.create(order=order, clothing_type=self.jeans, quantity=2)
+        OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1, rewashing=True)
+        doomed = OrderItem.objects.create(order=order, clothing_type=self.jeans, quantity=4)
+        doomed.delete()
+
+    def test_same_totals_as_immediate_repricing(self):
+        immediate = self._new_order(is_urgent=True, payment_status='paid')
+        self._add_items(immediate)
+
+        deferred = self._new_order(is_urgent=True, payment_status='paid')
+        with deferred_repricing():
+            self._add_items(deferred)
+
+        immediate.refresh_from_db()
+        deferred.refresh_from_db()
+        for field in ('subtotal', 'urgent_fee', 'total_price', 'amount_paid', 'balance'):
+            self.assertEqual(getattr(deferred, field), getattr(immediate, field), field)
+        self.assertEqual(deferred.subtotal, Decimal('2900.00'))
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, immediate.total_price + deferred.total_price)
+
+    def test_order_repriced_once_per_block(self):
+        order = self._new_order()
+        with CaptureQueriesContext(connection) as ctx:
+            with deferred_repricing():
+                for _ in range(10):
+                    OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+                # Nothing is repriced until the block exits
+                self.assertEqual(LaundryOrder.objects.get(pk=order.pk).total_price, 0)
+        order_updates = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE "laundry_laundryorder"')
+        ]
+        self.assertEqual(len(order_updates), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('5000.00'))
+
+    def test_item_sales_applied_once_per_block(self):
+        order = self._new_order()
+        with CaptureQueriesContext(connection) as ctx:
+            with deferred_repricing():
+                self._add_items(order)
+                self.assertFalse(DailyItemSales.objects.exists())
+        sales_writes = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith(('UPDATE "laundry_dailyitemsales"', 'INSERT INTO "laundry_dailyitemsales"'))
+        ]
+        # One row per clothing type (a miss is an UPDATE then an INSERT)
+        self.assertLessEqual(len(sales_writes), 4)
+        self.assertEqual(
+            dict(DailyItemSales.objects.values_list('clothing_type', 'quantity')),
+            {self.shirt.pk: 4, self.jeans.pk: 2},
+        )
+
+    def test_rollback_discards_dirty_orders(self):
+        order = self._new_order()
+        with self.assertRaises(RuntimeError):
+            with deferred_repricing():
+                OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+                raise RuntimeError
+        self.assertFalse(order.items.exists())
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, 0)
+
+
+class OrderNumberSequenceTest(TransactionTestCase):
+    THREADS = 8
+    ORDERS_PER_THREAD = 10
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Jane Doe', phone='08012345678')
+
+    def _create_orders(self, errors):
+        try:
+            for _ in range(self.ORDERS_PER_THREAD):
+                LaundryOrder.objects.create(
+                    customer_id=self.customer.pk,
+                    expected_delivery_date=timezone.now().date(),
+                )
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_concurrent_orders_get_unique_gapless_numbers(self):
+        errors = []
+        threads = [
+            threading.Thread(target=self._create_orders, args=(errors,))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        numbers = list(LaundryOrder.objects.values_list('order_number', flat=True))
+        suffixes = sorted(int(n.rsplit('-', 1)[1]) for n in numbers)
+        total = self.THREADS * self.ORDERS_PER_THREAD
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual(suffixes, list(range(1, total + 1)))
+
+    def test_counter_continues_from_existing_orders(self):
+        today = timezone.now().date()
+        LaundryOrder.objects.create(
+            order_number=f"LAU-{today:%Y%m%d}-0007",
+            customer=self.customer,
+            expected_delivery_date=today,
+        )
+        order = LaundryOrder.objects.create(customer=self.customer, expected_delivery_date=today)
+        self.assertEqual(order.order_number, f"LAU-{today:%Y%m%d}-0008")
+
+
+class CustomerIdAllocatorTest(TestCase):
+    def test_ids_are_unique_readable_and_checksummed(self):
+        customers = [Customer.objects.create(name=f'C{i}', phone='0801 234 5785') for i in range(50)]
+        ids = [c.customer_id for c in customers]
+        self.assertEqual(len(set(ids)), 50)
+        for customer_id in ids:
+            self.assertTrue(customer_id.startswith('CUST-5785-'))
+            self.assertTrue(is_valid_customer_id(customer_id))
+
+    def test_check_character_catches_typos(self):
+        customer_id = format_customer_id('08012345785', 1234)
+        typo = customer_id[:-2] + ('A' if customer_id[-2] != 'A' else 'B') + customer_id[-1]
+        self.assertFalse(is_valid_customer_id(typo))
+
+    def test_bulk_create_reserves_one_block(self):
+        first = Customer.objects.create(name='First', phone='1111')
+        with CaptureQueriesContext(connection) as ctx:
+            Customer.objects.bulk_create(
+                Customer(name=f'Imported {i}', phone=f'0803000{i:04d}') for i in range(100)
+            )
+        counter_updates = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE "laundry_customeridsequence"')
+        ]
+        self.assertEqual(len(counter_updates), 1)
+        imported = Customer.objects.exclude(pk=first.pk).values_list('customer_id', flat=True)
+        self.assertEqual(len(set(imported)), 100)
+        self.assertNotIn(first.customer_id, imported)
+
+    def test_form_and_model_use_same_scheme(self):
+        form = CustomerForm(data={'name': 'Form Customer', 'phone': '08099990001'})
+        self.assertTrue(form.is_valid(), form.errors)
+        customer = form.save()
+        self.assertTrue(is_valid_customer_id(customer.customer_id))
+
+
+class CustomerTotalSpentTest(TransactionTestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Corporate Client', phone='08055550000')
+        self.other = Customer.objects.create(name='Walk-in', phone='08055550001')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+
+    def _order(self, customer):
+        return LaundryOrder.objects.create(customer=customer, expected_delivery_date=timezone.now().date())
+
+    def _assert_exact(self):
+        self.assertFalse(Customer.objects.drifted().exists())
+
+    def test_deltas_follow_item_and_order_changes(self):
+        order = self._order(self.customer)
+        item = OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=2)
+        OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+        item.delete()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal('500.00'))
+
+        # Moving the order to another customer moves its total too
+        order.customer = self.other
+        order.save()
+        self.customer.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal('0.00'))
+        self.assertEqual(self.other.total_spent, Decimal('500.00'))
+
+        order.delete()
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.total_spent, Decimal('0.00'))
+        self._assert_exact()
+
+    def test_stale_customer_instance_does_not_overwrite_total(self):
+        stale = Customer.objects.get(pk=self.customer.pk)
+        OrderItem.objects.create(order=self._order(self.customer), clothing_type=self.shirt, quantity=3)
+        stale.address = 'New address'
+        stale.save()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal('1500.00'))
+        self.assertEqual(self.customer.address, 'New address')
+
+    def test_concurrent_edits_stay_exact(self):
+        orders = [self._order(self.customer) for _ in range(6)]
+        errors = []
+
+        def add_items(order):
+            try:
+                for _ in range(5):
+                    OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add_items, args=(order,)) for order in orders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal('15000.00'))
+        self._assert_exact()
+
+    @override_settings(LAUNDRY_VERIFY_TOTAL_SPENT=True)
+    def test_verification_mode_repairs_drift(self):
+        order = self._order(self.customer)
+        OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+        Customer.objects.filter(pk=self.customer.pk).update(total_spent=Decimal('99.00'))
+        self.assertTrue(Customer.objects.drifted().exists())
+
+        with self.assertLogs('laundry.models', level='WARNING'):
+            OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=1)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal('1000.00'))
+        self._assert_exact()
+
+
+class ReconcileCommandTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='desk1', password='x', user_type='staff')
+        self.customer = Customer.objects.create(name='Jane Doe', phone='08012345678')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        self.order = LaundryOrder.objects.create(
+            customer=self.customer, staff=self.staff, is_urgent=True,
+            payment_status='paid', expected_delivery_date=timezone.now().date(),
+        )
+        OrderItem.objects.create(order=self.order, clothing_type=self.shirt, quantity=3)
+        OrderItem.objects.create(order=self.order, clothing_type=self.shirt, quantity=1, rewashing=True)
+        self.order.refresh_from_db()
+        self.customer.refresh_from_db()
+        self.good = {
+            field: getattr(self.order, field)
+            for field in ('subtotal', 'urgent_fee', 'total_price', 'amount_paid', 'balance')
+        }
+
+    def _corrupt(self):
+        LaundryOrder.objects.filter(pk=self.order.pk).update(
+            subtotal=0, urgent_fee=0, total_price=0, amount_paid=0, balance=5
+        )
+        Customer.objects.filter(pk=self.customer.pk).update(total_spent=1, registered_by=None)
+
+    def test_dry_run_reports_without_writing(self):
+        self._corrupt()
+        out = StringIO()
+        call_command('reconcile', '--dry-run', verbosity=2, stdout=out)
+        self.assertIn('orders: 1 row(s) would be updated', out.getvalue())
+        self.assertIn('registrars: 1 row(s) would be updated', out.getvalue())
+        self.assertEqual(LaundryOrder.objects.get(pk=self.order.pk).total_price, 0)
+
+    def test_fixes_orders_customers_and_registrars(self):
+        self._corrupt()
+        call_command('reconcile', '--chunk-size', '1', stdout=StringIO())
+        self.order.refresh_from_db()
+        for field, value in self.good.items():
+            self.assertEqual(getattr(self.order, field), value, field)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, self.good['total_price'])
+        self.assertEqual(self.customer.registered_by, self.staff)
+        # The registrar is searchable without a manual index rebuild
+        found = search.filter_customers(Customer.objects.all(), 'desk1')
+        self.assertEqual(list(found), [self.customer])
+
+        out = StringIO()
+        call_command('reconcile', stdout=out)
+        self.assertEqual(out.getvalue().count(' 0 row(s) updated'), 3)
+
+
+def read_xlsx(data):
+    """``{sheet title: rows}`` of an .xlsx file, every cell as text"""
+    ns = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = {}
+    for number, sheet in enumerate(workbook.iterfind('m:sheets/m:sheet', ns), start=1):
+        root = ElementTree.fromstring(archive.read(f'xl/worksheets/sheet{number}.xml'))
+        sheets[sheet.get('name')] = [
+            [''.join(cell.itertext()) for cell in row.iterfind('m:c', ns)]
+            for row in root.iterfind('m:sheetData/m:row', ns)
+        ]
+    return sheets
+
+
+class StreamingExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='boss', password='testpass123', user_type='admin')
+        self.client.login(username='boss', password='testpass123')
+        customer = Customer.objects.create(name='Jane Doe', phone='08012345678', email='')
+        for status in ('pending', 'washing', 'washing'):
+            LaundryOrder.objects.create(
+                customer=customer, staff=self.admin, status=status,
+                expected_delivery_date=timezone.now().date(),
+            )
+
+    def _csv(self, response):
+        self.assertTrue(response.streaming)
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_orders_export_streams_filtered_rows(self):
+        rows = self._csv(self.client.get(reverse('export_orders_csv'), {'status': 'washing'}))
+        self.assertEqual(rows[0][0], 'Order #')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[6] for row in rows[1:]}, {'Washing'})
+        self.assertEqual(rows[1][2], 'boss')
+
+    def test_orders_xlsx_export_streams_filtered_rows(self):
+        response = self.client.get(reverse('export_orders_xlsx'), {'status': 'washing'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        rows = read_xlsx(b''.join(response.streaming_content))['Orders']
+        self.assertEqual(rows[0][0], 'Order #')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[6] for row in rows[1:]}, {'Washing'})
+        self.assertEqual(rows[1][2], 'boss')
+        # Dates are real Excel dates (serial numbers), not text
+        float(rows[1][8])
+
+    def test_xlsx_continues_on_new_sheet_past_row_limit(self):
+        rows = ([i, f'<row {i}> & "quotes"'] for i in range(5))
+        sheets = read_xlsx(b''.join(xlsx_blocks([('Log', ['n', 'text'], rows)], max_rows=3)))
+        self.assertEqual(list(sheets), ['Log', 'Log (2)', 'Log (3)'])
+        self.assertEqual(sheets['Log'][1:], [['0', '<row 0> & "quotes"'], ['1', '<row 1> & "quotes"']])
+        self.assertEqual([row[0] for row in sheets['Log (3)']], ['n', '4'])
+
+    def test_customers_export_streams_rows(self):
+        rows = self._csv(self.client.get(reverse('export_customers_csv'), {'q': 'Jane'}))
+        self.assertEqual(rows[0], ['Name', 'Customer ID', 'Phone', 'Email', 'Total Spent', 'Date Registered'])
+        self.assertEqual(rows[1][0], 'Jane Doe')
+        self.assertEqual(rows[1][3], 'N/A')
+
+
+class CustomerStarRankTest(TestCase):
+    # Includes exact halves (x.5 stars) to pin down round-half-to-even
+    TOTALS = ['0', '0.01', '50', '100', '150', '250', '300', '350', '450', '500', '700', '900', '999.99', '1000']
+
+    @staticmethod
+    def python_rank(total, max_spent):
+        # The ranking rule customer_list has always used
+        if max_spent > 0:
+            rank = round((float(total) / float(max_spent)) * 5)
+            return int(rank) if rank > 0 else (1 if total > 0 else 0)
+        return 0
+
+    def setUp(self):
+        Customer.objects.bulk_create(
+            Customer(name=f'Customer {total}', phone='0800000', total_spent=Decimal(total))
+            for total in self.TOTALS
+        )
+
+    def test_sql_rank_matches_python_rule(self):
+        max_spent = max(Decimal(t) for t in self.TOTALS)
+        for customer in Customer.objects.with_star_rank():
+            self.assertEqual(
+                customer.star_rank, self.python_rank(customer.total_spent, max_spent),
+                customer.total_spent,
+            )
+
+    def test_rank_is_relative_to_filtered_list(self):
+        filtered = Customer.objects.filter(total_spent__lte=500).with_star_rank()
+        ranks = {c.total_spent: c.star_rank for c in filtered}
+        self.assertEqual(ranks[Decimal('500.00')], 5)
+        self.assertEqual(ranks[Decimal('250.00')], 2)
+        self.assertEqual(ranks[Decimal('0.01')], 1)
+        self.assertEqual(ranks[Decimal('0.00')], 0)
+
+    def test_no_spenders_means_no_stars(self):
+        Customer.objects.update(total_spent=0)
+        self.assertEqual({c.star_rank for c in Customer.objects.with_star_rank()}, {0})
+
+    def test_customer_list_is_paginated(self):
+        User.objects.create_user(username='desk', password='testpass123')
+        self.client.login(username='desk', password='testpass123')
+        Customer.objects.bulk_create(
+            Customer(name=f'Extra {i}', phone='0800001') for i in range(60)
+        )
+        response = self.client.get(reverse('customer_list'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 50)
+        self.assertEqual(page.count, 60 + len(self.TOTALS))
+        # Stars on later pages are still relative to the whole list's top spender
+        response = self.client.get(reverse('customer_list'), {'cursor': page.next_cursor})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 60 + len(self.TOTALS) - 50)
+        self.assertEqual(
+            {c.total_spent: c.rank for c in page}[Decimal('1000.00')], 5
+        )
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='boss', password='testpass123', user_type='admin')
+        self.client.login(username='boss', password='testpass123')
+        self.customer = Customer.objects.create(name='Jane Doe', phone='08012345678')
+        LaundryOrder.objects.bulk_create(
+            LaundryOrder(
+                order_number=f'LAU-TEST-{i:04d}', customer=self.customer, staff=self.admin,
+                status='washing' if i % 3 else 'ready', expected_delivery_date=timezone.now().date(),
+            )
+            for i in range(130)
+        )
+        # Many orders share a timestamp, so the id tiebreaker has to do its job
+        same_time = timezone.now()
+        LaundryOrder.objects.filter(pk__in=LaundryOrder.objects.values('pk')[:60]).update(order_date=same_time)
+
+    def _walk(self, url, params):
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(url, dict(params, **({'cursor': cursor} if cursor else {})))
+            page = response.context['page_obj']
+            seen.extend(order.pk for order in page)
+            cursor = page.next_cursor
+            if not cursor:
+                return seen, page
+
+    def test_order_list_walks_every_filtered_order_once(self):
+        seen, last_page = self._walk(reverse('order_list'), {'status': 'washing'})
+        expected = list(
+            LaundryOrder.objects.filter(status='washing').order_by('-order_date', '-id').values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+        # Walking back from the last page returns the page before it
+        response = self.client.get(reverse('order_list'), {'status': 'washing', 'cursor': last_page.previous_cursor})
+        self.assertEqual([o.pk for o in response.context['page_obj']], expected[:50])
+
+    def test_customer_detail_pages_through_orders(self):
+        seen, _ = self._walk(reverse('customer_detail', args=[self.customer.pk]), {})
+        self.assertEqual(len(seen), 130)
+        self.assertEqual(len(set(seen)), 130)
+
+    def test_count_is_capped(self):
+        page = KeysetPaginator(LaundryOrder.objects.all(), ('-order_date', '-id'), count_cap=100).page(with_count=True)
+        self.assertEqual(page.count_label, '100+')
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('order_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous)
+
+    def test_dashboard_recent_orders_page(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['recent_orders']), 10)
+        response = self.client.get(reverse('dashboard'), {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual(len(response.context['recent_orders']), 10)
+        self.assertTrue(response.context['page_obj'].has_previous)
+
+
+class SearchIndexTestMixin:
+    def setUp(self):
+        self.admin = User.objects.create_user(username='frontdesk', password='testpass123', user_type='admin')
+        self.client.login(username='frontdesk', password='testpass123')
+        self.jane = Customer.objects.create(name='Jane Okafor', phone='08031234567', registered_by=self.admin)
+        self.john = Customer.objects.create(name='John Bello', phone='07059876543')
+        self.jane_order = LaundryOrder.objects.create(customer=self.jane, staff=self.admin, expected_delivery_date=timezone.now().date())
+        self.john_order = LaundryOrder.objects.create(customer=self.john, staff=self.admin, expected_delivery_date=timezone.now().date())
+
+    def _orders(self, q):
+        response = self.client.get(reverse('order_list'), {'q': q})
+        return {o.pk for o in response.context['page_obj']}
+
+    def _customers(self, q):
+        response = self.client.get(reverse('customer_list'), {'q': q})
+        return {c.pk for c in response.context['page_obj']}
+
+    def test_order_search_matches_number_name_and_phone(self):
+        self.assertEqual(self._orders('okaf'), {self.jane_order.pk})
+        self.assertEqual(self._orders('9876'), {self.john_order.pk})
+        self.assertEqual(self._orders(self.john_order.order_number[-6:]), {self.john_order.pk})
+        self.assertEqual(self._orders('nobody here'), set())
+
+    def test_customer_search_matches_id_and_registrar(self):
+        self.assertEqual(self._customers(self.john.customer_id.lower()), {self.john.pk})
+        self.assertEqual(self._customers('frontdesk'), {self.jane.pk})
+
+    def test_short_queries_fall_back_to_icontains(self):
+        self.assertEqual(self._customers('Jo'), {self.john.pk})
+
+    def test_index_follows_customer_changes(self):
+        self.jane.name = 'Janet Adeyemi'
+        self.jane.save()
+        self.assertEqual(self._orders('adeyemi'), {self.jane_order.pk})
+        self.assertEqual(self._orders('okafor'), set())
+        self.john_order.delete()
+        self.assertEqual(self._orders('bello'), set())
+
+    def test_rebuild_command_restores_index(self):
+        search.get_backend().clear()
+        self.assertEqual(self._orders('okaf'), set())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._orders('okaf'), {self.jane_order.pk})
+        self.assertEqual(self._customers('bello'), {self.john.pk})
+
+    def test_quick_search_returns_json(self):
+        data = self.client.get(reverse('quick_search'), {'q': 'okafor'}).json()
+        self.assertEqual([o['id'] for o in data['orders']], [self.jane_order.pk])
+        self.assertEqual([c['id'] for c in data['customers']], [self.jane.pk])
+
+    def test_quick_search_limits_staff_to_their_orders_before_ranking(self):
+        counter = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+        own = LaundryOrder.objects.create(customer=self.jane, staff=counter, expected_delivery_date=timezone.now().date())
+        # More of the other desk's matches than the result limit, all ranked alongside
+        for _ in range(QUICK_SEARCH_LIMIT + 2):
+            LaundryOrder.objects.create(customer=self.jane, staff=self.admin, expected_delivery_date=timezone.now().date())
+        self.client.login(username='counter', password='testpass123')
+        data = self.client.get(reverse('quick_search'), {'q': 'okafor'}).json()
+        self.assertEqual([o['id'] for o in data['orders']], [own.pk])
+
+
+@override_settings(LAUNDRY_SEARCH_BACKEND='fts5')
+class FTS5SearchTest(SearchIndexTestMixin, TestCase):
+    pass
+
+
+@override_settings(LAUNDRY_SEARCH_BACKEND='trigram')
+class TrigramSearchTest(SearchIndexTestMixin, TestCase):
+    pass
+
+
+class PhoneIndexTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='frontdesk', password='testpass123', user_type='admin')
+        self.client.login(username='frontdesk', password='testpass123')
+        self.ada = Customer.objects.create(
+            name='Ada Eze', phone='0803 123 4567', whatsapp_number='+234 905-111-2222',
+        )
+        self.tunde = Customer.objects.create(name='Tunde Ojo', phone='07059876543', alternate_phone='8094564567')
+
+    def test_normalize(self):
+        self.assertEqual(phones.normalize('0803 123 4567'), '2348031234567')
+        self.assertEqual(phones.normalize('+234 (803) 123-4567'), '2348031234567')
+        self.assertEqual(phones.normalize('002348031234567'), '2348031234567')
+        self.assertEqual(phones.normalize('8031234567'), '2348031234567')
+        self.assertEqual(phones.normalize('+44 20 7946 0000'), '442079460000')
+        self.assertEqual(phones.normalize(''), '')
+
+    def test_lookup_any_field_in_any_format(self):
+        self.assertEqual(list(Customer.objects.by_phone('+2348031234567', exact=True)), [self.ada])
+        self.assertEqual(list(Customer.objects.by_phone('0905 111 2222', exact=True)), [self.ada])
+        self.assertEqual(list(Customer.objects.by_phone('809-456-4567', exact=True)), [self.tunde])
+        self.assertEqual(list(Customer.objects.by_phone('4567', exact=True)), [])
+
+    def test_lookup_by_last_digits(self):
+        self.assertEqual(set(Customer.objects.by_phone('4567')), {self.ada, self.tunde})
+        self.assertEqual(list(Customer.objects.by_phone('98-76543')), [self.tunde])
+        self.assertEqual(list(Customer.objects.by_phone('567')), [])
+
+    def test_leading_zeros_are_part_of_the_suffix(self):
+        mary = Customer.objects.create(name='Mary Obi', phone='0803 111 0567')
+        Customer.objects.create(name='Femi Ade', phone='0803 111 1567')
+        self.assertEqual(list(Customer.objects.by_phone('0567')), [mary])
+        self.assertEqual(list(Customer.objects.by_phone('10567')), [mary])
+        self.assertEqual(list(Customer.objects.by_phone('00567')), [])
+        self.assertTrue(phones.is_phone_query('0567'))
+        data = self.client.get(reverse('customer_phone_lookup'), {'phone': '0567'}).json()
+        self.assertEqual([c['id'] for c in data['customers']], [mary.pk])
+
+    def test_index_follows_customer_changes(self):
+        self.ada.whatsapp_number = ''
+        self.ada.alternate_phone = '0812 000 7777'
+        self.ada.save()
+        self.assertEqual(list(Customer.objects.by_phone('09051112222')), [])
+        self.assertEqual(list(Customer.objects.by_phone('7777')), [self.ada])
+        self.tunde.delete()
+        self.assertEqual(list(Customer.objects.by_phone('4567')), [self.ada])
+
+    def test_bulk_create_is_indexed(self):
+        Customer.objects.bulk_create([Customer(name='Bulk', phone='0701 555 0101')])
+        self.assertEqual(Customer.objects.by_phone('5550101').get().name, 'Bulk')
+
+    def test_suffix_lookup_seeks_the_index(self):
+        ids = phones.matching_customer_ids('4567')
+        sql, params = ids.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('laundry_phone_suffix', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_search_and_lookup_views(self):
+        response = self.client.get(reverse('customer_list'), {'q': '0809 456 4567'})
+        self.assertEqual([c.pk for c in response.context['page_obj']], [self.tunde.pk])
+        data = self.client.get(reverse('customer_phone_lookup'), {'phone': '4567'}).json()
+        self.assertEqual({c['id'] for c in data['customers']}, {self.ada.pk, self.tunde.pk})
+        data = self.client.get(reverse('quick_search'), {'q': '1112222'}).json()
+        self.assertEqual([c['id'] for c in data['customers']], [self.ada.pk])
+
+
+class DailyOrderSummaryTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='manager', password='testpass123', user_type='admin')
+        self.staff = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        self.customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+
+    def _order(self, staff, quantity=1, payment_status='pending'):
+        order = LaundryOrder.objects.create(
+            customer=self.customer, staff=staff, expected_delivery_date=timezone.now().date(),
+        )
+        OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=quantity)
+        if payment_status != 'pending':
+            order.payment_status = payment_status
+            order.save()
+        return order
+
+    def _rows(self):
+        return {
+            (row.day, row.staff_id): (row.order_count, row.pending_count, row.total_price, row.amount_paid)
+            for row in DailyOrderSummary.objects.exclude(order_count=0)
+        }
+
+    def _facts(self):
+        return (
+            {(r.day, r.status): r.order_count for r in DailyStatusCount.objects.exclude(order_count=0)},
+            {(r.day, r.clothing_type_id): (r.quantity, r.revenue) for r in DailyItemSales.objects.exclude(quantity=0)},
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        self._order(self.admin, quantity=2, payment_status='paid')
+        self._order(self.staff, quantity=3)
+        moved = self._order(self.staff, payment_status='paid')
+        moved.staff = self.admin
+        moved.save()
+        self._order(self.staff).delete()
+
+        today = timezone.localdate()
+        self.assertEqual(self._rows(), {
+            (today, self.admin.pk): (2, 0, Decimal('1500.00'), Decimal('1500.00')),
+            (today, self.staff.pk): (1, 1, Decimal('1500.00'), Decimal('0.00')),
+        })
+        incremental = self._rows()
+        call_command('rebuild_daily_summary', stdout=StringIO())
+        self.assertEqual(self._rows(), incremental)
+
+    def test_sales_facts_follow_status_and_item_changes(self):
+        trousers = ClothingType.objects.create(name='Trousers', price=Decimal('700.00'), urgent_price=Decimal('900.00'))
+        order = self._order(self.staff, quantity=2)
+        item = OrderItem.objects.create(order=order, clothing_type=trousers, quantity=1)
+        item.quantity = 3
+        item.save()
+        order.status = 'ready'
+        order.save()
+        self._order(self.staff, quantity=4).delete()
+
+        today = timezone.localdate()
+        statuses, items = self._facts()
+        self.assertEqual(statuses, {(today, 'ready'): 1})
+        self.assertEqual(items, {
+            (today, self.shirt.pk): (2, Decimal('1000.00')),
+            (today, trousers.pk): (3, Decimal('2100.00')),
         })
-        
-        self.assertEqual(response.status_code, 302)
-        self.assertEqual(LaundryOrder.objects.count(), 1)
\ No newline at end of file
+        call_command('rebuild_daily_summary', stdout=StringIO())
+        self.assertEqual(self._facts(), (statuses, items))
+
+    def test_customer_delete_removes_its_orders(self):
+        self._order(self.staff, quantity=2)
+        self.customer.delete()
+        self.assertEqual(self._rows(), {})
+        self.assertEqual(self._facts(), ({}, {}))
+
+    def test_dashboard_reads_the_summary(self):
+        self._order(self.admin, payment_status='paid')
+        self._order(self.staff, quantity=2)
+        self.client.login(username='manager', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        order_queries = [q['sql'] for q in queries if 'FROM "laundry_laundryorder"' in q['sql']]
+        # Only the recent-orders page touches the order table
+        self.assertEqual(len(order_queries), 1)
+        self.assertEqual(response.context['total_orders'], 2)
+        self.assertEqual(response.context['pending_orders'], 1)
+        self.assertEqual(response.context['today_orders'], 2)
+        self.assertEqual(response.context['overall_revenue'], Decimal('500.00'))
+        self.assertEqual(response.context['admin_revenue'], Decimal('500.00'))
+
+        self.client.login(username='counter', password='testpass123')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['staff_orders'], 1)
+        self.assertEqual(response.context['staff_pending'], 1)
+        self.assertEqual(response.context['staff_revenue'], Decimal('0'))
+
+
+class ViewCacheTest(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.admin = User.objects.create_user(username='manager', password='testpass123', user_type='admin')
+        self.ngozi = User.objects.create_user(username='ngozi', password='testpass123', user_type='staff')
+        self.emeka = User.objects.create_user(username='emeka', password='testpass123', user_type='staff')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        self.customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        self.order = LaundryOrder.objects.create(
+            customer=self.customer, staff=self.ngozi, expected_delivery_date=timezone.now().date(),
+        )
+
+    def _get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        laundry_queries = [q['sql'] for q in queries if '"laundry_' in q['sql']]
+        return response, laundry_queries
+
+    def test_repeat_hits_are_served_from_cache(self):
+        self.client.login(username='manager', password='testpass123')
+        for url in (reverse('dashboard'), reverse('order_list'), reverse('customer_list')):
+            self.assertTrue(self._get(url)[1])
+            self.assertEqual(self._get(url)[1], [])
+        # A different filter set is a different entry
+        self.assertTrue(self._get(reverse('order_list'), status='ready')[1])
+
+    def test_order_and_item_writes_invalidate(self):
+        self.client.login(username='manager', password='testpass123')
+        response, _ = self._get(reverse('order_list'))
+        self.assertEqual(response.context['page_obj'].object_list[0].total_price, Decimal('0.00'))
+
+        OrderItem.objects.create(order=self.order, clothing_type=self.shirt, quantity=2)
+        response, queries = self._get(reverse('order_list'))
+        self.assertTrue(queries)
+        self.assertEqual(response.context['page_obj'].object_list[0].total_price, Decimal('1000.00'))
+        response, _ = self._get(reverse('dashboard'))
+        self.assertEqual(response.context['total_orders'], 1)
+
+        response, _ = self._get(reverse('customer_list'))
+        self.customer.name = 'Ada Nwosu'
+        self.customer.save()
+        response, _ = self._get(reverse('customer_list'))
+        self.assertEqual(response.context['page_obj'].object_list[0].name, 'Ada Nwosu')
+
+    def test_staff_entries_survive_other_staff_writes(self):
+        self.client.login(username='ngozi', password='testpass123')
+        self._get(reverse('order_list'))
+        LaundryOrder.objects.create(
+            customer=self.customer, staff=self.emeka, expected_delivery_date=timezone.now().date(),
+        )
+        self.assertEqual(self._get(reverse('order_list'))[1], [])
+
+        # Reassigning an order invalidates both staff members
+        self.order.staff = self.emeka
+        self.order.save()
+        response, queries = self._get(reverse('order_list'))
+        self.assertTrue(queries)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class ScanTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+        User.objects.create_user(username='other', password='testpass123', user_type='staff')
+        shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        self.order = LaundryOrder.objects.create(
+            customer=customer, staff=self.staff, expected_delivery_date=timezone.now().date(), status='washing',
+        )
+        self.item = OrderItem.objects.create(order=self.order, clothing_type=shirt, quantity=2)
+        self.client.login(username='counter', password='testpass123')
+
+    def test_tag_codes(self):
+        for pk in (1, 35, 36, 123456789):
+            self.assertEqual(parse_tag_code(format_tag_code(pk).lower()), pk)
+        code = format_tag_code(1234)
+        misread = code[:-2] + ('0' if code[-2] != '0' else '1') + code[-1]
+        self.assertIsNone(parse_tag_code(misread))
+        self.assertIsNone(parse_tag_code('LAU-20260101-0001'))
+
+    def test_resolve_in_one_query(self):
+        with self.assertNumQueries(1):
+            order, item = scanning.resolve(self.item.tag_code)
+            self.assertEqual((order, item), (self.order, self.item))
+            self.assertEqual(order.customer.name, 'Ada Eze')
+        with self.assertNumQueries(1):
+            self.assertEqual(scanning.resolve(self.order.order_number.lower()), (self.order, None))
+        with self.assertNumQueries(0):
+            self.assertIsNone(scanning.resolve(self.item.tag_code[:-1] + '!'))
+
+    def test_scan_to_status(self):
+        url = reverse('scan_code')
+        response = self.client.get(url, {'code': self.item.tag_code})
+        self.assertEqual(response.json()['order']['status'], 'washing')
+        self.assertEqual(response.json()['item']['clothing_type'], 'Shirt')
+
+        response = self.client.post(url, {'code': self.item.tag_code, 'status': 'ironing'})
+        self.assertEqual(response.json()['order']['status'], 'ironing')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'ironing')
+
+        self.assertEqual(self.client.post(url, {'code': self.item.tag_code, 'status': 'dry'}).status_code, 400)
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(url, {'code': self.item.tag_code}).status_code, 404)
+
+    def test_scan_queries(self):
+        url = reverse('scan_code')
+        # Session, user, then the one indexed lookup
+        with self.assertNumQueries(3):
+            self.client.get(url, {'code': self.item.tag_code})
+
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.post(url, {'code': self.item.tag_code, 'status': 'ironing'})
+        self.assertEqual(response.json()['order']['status'], 'ironing')
+        self.assertLessEqual(len(first), instrumentation.query_budget('POST', 'scan_code'))
+        # The code is looked up once, not again for the response
+        self.assertEqual(len([q for q in first if q['sql'].startswith('SELECT "laundry_orderitem"')]), 1)
+        # Later scans don't create the day's count row (INSERT and its savepoint)
+        with CaptureQueriesContext(connection) as steady:
+            self.client.post(url, {'code': self.order.order_number, 'status': 'washing'})
+        self.assertEqual(len(steady), len(first) - 3)
+        self.assertEqual(StageEvent.objects.count(), 2)
+
+    def test_batch_ingest(self):
+        shirt = self.item.clothing_type
+        second = LaundryOrder.objects.create(
+            customer=self.order.customer, staff=self.staff, expected_delivery_date=timezone.now().date(),
+            status='washing',
+        )
+        done = LaundryOrder.objects.create(
+            customer=self.order.customer, staff=self.staff, expected_delivery_date=timezone.now().date(),
+            status='ironing',
+        )
+        extra = OrderItem.objects.create(order=self.order, clothing_type=shirt, quantity=1)
+        codes = [self.item.tag_code, second.order_number, extra.tag_code, done.order_number, 'T0000Q', 'junk']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('scan_batch'), {'status': 'ironing', 'codes': codes}, content_type='application/json',
+            )
+        body = response.json()
+        self.assertEqual(
+            [result['result'] for result in body['results']],
+            ['moved', 'moved', 'unchanged', 'unchanged', 'unknown', 'unknown'],
+        )
+        self.assertEqual(body['counts'], {'moved': 2, 'unchanged': 2, 'unknown': 2})
+        # Resolving, moving and logging do not grow with the number of scans
+        self.assertFalse([q for q in queries if 'SELECT' in q['sql'] and 'laundry_orderitem' in q['sql']][1:])
+
+        self.assertEqual(
+            set(LaundryOrder.objects.values_list('status', flat=True)), {'ironing'},
+        )
+        self.assertEqual(StageEvent.objects.count(), 4)
+        self.assertEqual(StageEvent.objects.filter(item=extra).get().from_status, 'ironing')
+
+        counts = list(DailyStatusCount.objects.filter(order_count__gt=0).values_list('status', 'order_count'))
+        DailyStatusCount.rebuild()
+        self.assertEqual(counts, list(DailyStatusCount.objects.values_list('status', 'order_count')))
+
+        self.client.login(username='other', password='testpass123')
+        response = self.client.post(
+            reverse('scan_batch'), {'status': 'ready', 'codes': codes[:2]}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['counts']['unknown'], 2)
+        self.assertEqual(
+            self.client.post(reverse('scan_batch'), {'status': 'dry'}, content_type='application/json').status_code,
+            400,
+        )
+
+
+class ProcessingQueueTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='washer', password='testpass123', user_type='staff')
+        self.customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+
+    def _order(self, **fields):
+        return LaundryOrder.objects.create(
+            customer=self.customer, staff=self.staff, expected_delivery_date=timezone.now().date(), **fields,
+        )
+
+    def _stage(self, stage):
+        return list(ProcessingQueue.objects.filter(current_stage=stage).values_list('order_id', flat=True))
+
+    def test_urgent_orders_slot_in_without_renumbering(self):
+        first, second = self._order(), self._order()
+        positions = dict(ProcessingQueue.objects.values_list('order_id', 'position'))
+        urgent = self._order(is_urgent=True)
+        later_urgent = self._order(is_urgent=True)
+        third = self._order()
+
+        self.assertEqual(self._stage('pending'), [urgent.pk, later_urgent.pk, first.pk, second.pk, third.pk])
+        self.assertEqual(
+            dict(ProcessingQueue.objects.filter(order__in=[first, second]).values_list('order_id', 'position')),
+            positions,
+        )
+
+    def test_respace_when_gap_runs_out(self):
+        urgent, normal = self._order(is_urgent=True), self._order()
+        ProcessingQueue.objects.filter(order=urgent).update(position=1)
+        ProcessingQueue.objects.filter(order=normal).update(position=2)
+        later_urgent = self._order(is_urgent=True)
+        self.assertEqual(self._stage('pending'), [urgent.pk, later_urgent.pk, normal.pk])
+        positions = list(ProcessingQueue.objects.values_list('position', flat=True))
+        self.assertTrue(all(b - a > 1 for a, b in zip(positions, positions[1:])))
+
+    def test_claim_release_complete(self):
+        orders = [self._order() for _ in range(3)]
+        entry = ProcessingQueue.claim_next('pending', self.staff)
+        self.assertEqual(entry.order_id, orders[0].pk)
+        self.assertEqual(ProcessingQueue.claim_next('pending', self.staff).order_id, orders[1].pk)
+
+        entry.release()
+        self.assertEqual(ProcessingQueue.get_next_in_queue('pending').order_id, orders[0].pk)
+        entry = ProcessingQueue.claim_next('pending', self.staff)
+
+        entry.complete()
+        self.assertEqual(LaundryOrder.objects.get(pk=orders[0].pk).status, 'washing')
+        moved = ProcessingQueue.objects.get(order=orders[0])
+        self.assertEqual((moved.current_stage, moved.claimed_at), ('washing', None))
+
+        # Abandoned claims become claimable again
+        ProcessingQueue.objects.filter(order=orders[1]).update(
+            claimed_at=timezone.now() - ProcessingQueue.CLAIM_TIMEOUT * 2,
+        )
+        self.assertEqual(ProcessingQueue.claim_next('pending', self.staff).order_id, orders[1].pk)
+        self.assertEqual(ProcessingQueue.claim_next('pending', self.staff).order_id, orders[2].pk)
+        self.assertIsNone(ProcessingQueue.claim_next('pending', self.staff))
+
+    def test_stale_entries_do_not_complete(self):
+        order = self._order()
+        entry = ProcessingQueue.claim_next('pending', self.staff)
+        LaundryOrder.move_status([order.pk], 'ironing')
+        self.assertFalse(entry.complete())
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'ironing')
+        self.assertEqual(self._stage('ironing'), [order.pk])
+
+        # A claim that expired and was taken by another worker
+        other = User.objects.create_user(username='presser', password='testpass123', user_type='staff')
+        mine = ProcessingQueue.claim_next('ironing', self.staff)
+        mine.claimed_at = timezone.now() - ProcessingQueue.CLAIM_TIMEOUT * 2
+        ProcessingQueue.objects.filter(pk=mine.pk).update(claimed_at=mine.claimed_at)
+        theirs = ProcessingQueue.claim_next('ironing', other)
+        self.assertFalse(mine.complete())
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'ironing')
+        self.assertTrue(theirs.complete())
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'ready')
+
+    def test_entries_follow_order_status(self):
+        order = self._order()
+        order.status = 'ironing'
+        order.save()
+        self.assertEqual(self._stage('ironing'), [order.pk])
+
+        ProcessingQueue.objects.get(order=order).complete()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'ready')
+        self.assertFalse(ProcessingQueue.objects.exists())
+        counts = dict(DailyStatusCount.objects.filter(order_count__gt=0).values_list('status', 'order_count'))
+        self.assertEqual(counts, {'ready': 1})
+
+
+class ProcessingQueueContentionTest(TransactionTestCase):
+    WORKERS = 6
+    ORDERS = 30
+
+    def test_every_entry_claimed_once(self):
+        staff = User.objects.create_user(username='washer', password='testpass123', user_type='staff')
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        for _ in range(self.ORDERS):
+            LaundryOrder.objects.create(customer=customer, staff=staff, expected_delivery_date=timezone.now().date())
+
+        claimed, errors = [], []
+
+        def work():
+            try:
+                while entry := ProcessingQueue.claim_next('pending', staff):
+                    claimed.append(entry.pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(claimed), self.ORDERS)
+        self.assertEqual(len(set(claimed)), self.ORDERS)
+
+
+class QueueEventsTest(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='washer', password='testpass123', user_type='staff')
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        self.order = LaundryOrder.objects.create(
+            customer=customer, staff=self.staff, expected_delivery_date=timezone.now().date(),
+        )
+
+    def _start_washing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProcessingQueue.objects.get(order=self.order).complete()
+
+    def test_board_page(self):
+        self.client.login(username='washer', password='testpass123')
+        response = self.client.get(reverse('queue_board'))
+        self.assertContains(response, 'data-stage="washing"')
+        self.assertContains(response, reverse('queue_events'))
+
+    def test_stream_refused_under_wsgi(self):
+        self.client.login(username='washer', password='testpass123')
+        response = self.client.get(reverse('queue_events'))
+        self.assertEqual(response.status_code, 501)
+        self.assertContains(response, 'ASGI', status_code=501)
+
+    def test_no_work_without_screens(self):
+        with self.assertNumQueries(0):
+            ProcessingQueue.publish_changes([self.order.pk])
+
+    @mock.patch.object(events, 'broker', events.Broker())
+    async def test_stream_sends_snapshot_then_deltas(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('queue_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        try:
+            snapshot = await anext(chunks)
+            self.assertTrue(snapshot.startswith(b'event: snapshot\n'))
+            self.assertIn(self.order.order_number.encode(), snapshot)
+
+            await sync_to_async(self._start_washing)()
+            delta = await asyncio.wait_for(anext(chunks), 5)
+            self.assertTrue(delta.startswith(b'event: orders\n'))
+            self.assertIn(b'"stage": "washing"', delta)
+        finally:
+            await chunks.aclose()
+
+    async def test_slow_screen_is_reset(self):
+        broker = events.Broker(max_pending=1)
+        subscription = broker.subscribe()
+        for number in range(3):
+            broker.publish('orders', [number])
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(timeout=1), ('orders', [0]))
+        self.assertIs(await subscription.get(timeout=1), events.RESET)
+        subscription.close()
+        self.assertFalse(broker.listening())
+
+
+class QueryPlanTest(TestCase):
+    """The hot queries must be index searches or ordered index walks, never table scans"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='manager', password='testpass123', user_type='admin')
+        cls.staff = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+
+    def assertIndexed(self, queryset, sorted_ok=False):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if ' SCAN ' in f' {line} ' and ' USING ' not in line:
+                self.fail(f"Full table scan:\n{plan}\n{queryset.query}")
+            if 'TEMP B-TREE' in line and not sorted_ok:
+                self.fail(f"Sorts instead of walking an index:\n{plan}\n{queryset.query}")
+
+    def _order_page(self, user, **params):
+        request = RequestFactory().get('/', params)
+        request.user = user
+        return _get_filtered_orders(request).order_by('-order_date', '-id')[:ORDERS_PER_PAGE + 1]
+
+    def test_order_list_filters(self):
+        for user, params in (
+            (self.admin, {}),
+            (self.staff, {}),
+            (self.admin, {'status': 'ready'}),
+            (self.admin, {'payment': 'pending'}),
+            (self.staff, {'payment': 'pending'}),
+            (self.admin, {'date': '2026-03-14'}),
+            (self.admin, {'staff': self.staff.pk}),
+        ):
+            with self.subTest(user=user.username, **params):
+                self.assertIndexed(self._order_page(user, **params))
+
+    def test_dashboard_and_customer_lists(self):
+        self.assertIndexed(LaundryOrder.objects.order_by('-registered_at', '-id')[:11])
+        self.assertIndexed(LaundryOrder.objects.filter(staff=self.staff).order_by('-registered_at', '-id')[:11])
+        self.assertIndexed(Customer.objects.order_by('-registration_date', '-id')[:51])
+        self.assertIndexed(Customer.objects.order_by('-total_spent').values('total_spent')[:1])
+
+    def test_date_ranges(self):
+        from reports.batch import end_of_day_orders
+        start, end = local_day_range(timezone.localdate())
+        self.assertIndexed(LaundryOrder.objects.filter(registered_at__gte=start, registered_at__lt=end))
+        self.assertIndexed(end_of_day_orders(), sorted_ok=True)
+
+
+@override_settings(LAUNDRY_QUERY_BUDGET_RAISE=True)
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        instrumentation.summary.clear()
+        self.admin = User.objects.create_user(
+            username='manager', password='testpass123', user_type='admin', is_staff=True, is_superuser=True,
+        )
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        self.customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        for _ in range(5):
+            order = LaundryOrder.objects.create(
+                customer=self.customer, staff=self.admin, expected_delivery_date=timezone.now().date(),
+            )
+            OrderItem.objects.create(order=order, clothing_type=self.shirt, quantity=2)
+        self.order = order
+        self.client.force_login(self.admin)
+
+    def test_server_timing_and_summary(self):
+        response = self.client.get(reverse('order_list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, app;dur=[\d.]+$')
+
+        self.client.get(reverse('order_list'))
+        row = next(row for row in instrumentation.summary.rows() if row['endpoint'] == 'GET order_list')
+        self.assertEqual(row['requests'], 2)
+        self.assertEqual(row['budget'], 8)
+        self.assertGreater(row['template'], 0)
+        self.assertGreater(row['size'], 0)
+
+        response = self.client.get(reverse('request_metrics'))
+        self.assertContains(response, 'GET order_list')
+
+    def test_hot_views_stay_within_budget(self):
+        # Any view over its LAUNDRY_QUERY_BUDGETS entry raises here
+        for name, args in (
+            ('dashboard', ()), ('order_list', ()), ('order_detail', (self.order.pk,)), ('customer_list', ()),
+            ('customer_detail', (self.customer.pk,)), ('create_order', ()),
+        ):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name, args=args)).status_code, 200)
+
+        data = {
+            'order-customer': self.customer.pk, 'order-expected_delivery_date': '2030-01-01',
+            'items-TOTAL_FORMS': 10, 'items-INITIAL_FORMS': 0,
+        }
+        for i in range(10):
+            data.update({f'items-{i}-clothing_type': self.shirt.pk, f'items-{i}-quantity': 1})
+        self.assertEqual(self.client.post(reverse('create_order'), data).status_code, 302)
+        self.assertEqual(LaundryOrder.objects.latest('pk').items.count(), 10)
+
+    def test_largest_order_within_budget(self):
+        types = ClothingType.objects.bulk_create(
+            ClothingType(name=f'Type {i}', price=Decimal('100.00'), urgent_price=Decimal('150.00'))
+            for i in range(MAX_ORDER_ITEMS + 1)
+        )
+        data = {
+            'order-customer': self.customer.pk, 'order-expected_delivery_date': '2030-01-01',
+            'items-INITIAL_FORMS': 0,
+        }
+        for i, clothing_type in enumerate(types):
+            data.update({f'items-{i}-clothing_type': clothing_type.pk, f'items-{i}-quantity': 1})
+
+        # Every line a clothing type the day has no sales row for yet
+        data['items-TOTAL_FORMS'] = MAX_ORDER_ITEMS
+        self.assertEqual(self.client.post(reverse('create_order'), data).status_code, 302)
+        self.assertEqual(LaundryOrder.objects.latest('pk').items.count(), MAX_ORDER_ITEMS)
+
+        data['items-TOTAL_FORMS'] = MAX_ORDER_ITEMS + 1
+        response = self.client.post(reverse('create_order'), data)
+        self.assertContains(response, f'Please submit at most {MAX_ORDER_ITEMS} forms.')
+
+    @override_settings(LAUNDRY_QUERY_BUDGETS={'order_list': 1})
+    def test_budget_exceeded(self):
+        with self.assertRaises(instrumentation.QueryBudgetExceeded):
+            self.client.get(reverse('order_list'))
+        with self.settings(LAUNDRY_QUERY_BUDGET_RAISE=False), self.assertLogs('laundry.instrumentation', 'WARNING') as logs:
+            self.assertEqual(self.client.get(reverse('order_list')).status_code, 200)
+        self.assertIn('GET order_list', logs.output[0])
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        instrumentation.slow_queries.clear()
+        self.admin = User.objects.create_user(
+            username='manager', password='testpass123', user_type='admin', is_staff=True, is_superuser=True,
+        )
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        LaundryOrder.objects.create(customer=customer, staff=self.admin, expected_delivery_date=timezone.now().date())
+        self.client.force_login(self.admin)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            instrumentation.fingerprint('SELECT * FROM t WHERE a IN (%s, %s,  %s) AND b = \'x\'\'y\' LIMIT 51'),
+            'SELECT * FROM t WHERE a IN (...) AND b = ? LIMIT ?',
+        )
+
+    def test_captures_view_frame_and_plan(self):
+        with self.settings(LAUNDRY_SLOW_QUERY_MS=None):
+            expected = self.client.get(reverse('order_list'), {'status': 'ready'})['Server-Timing']
+        self.assertEqual(instrumentation.slow_queries.entries(), [])
+
+        with self.settings(LAUNDRY_SLOW_QUERY_MS=0):
+            response = self.client.get(reverse('order_list'), {'status': 'pending'})
+        # EXPLAINs run for the log are not counted as the view's queries
+        self.assertEqual(
+            response['Server-Timing'].split(',')[0].split('desc=')[1], expected.split(',')[0].split('desc=')[1],
+        )
+
+        group = next(
+            group for group in instrumentation.slow_queries.groups()
+            if 'FROM "laundry_laundryorder"' in group['fingerprint'] and 'LIMIT' in group['fingerprint']
+        )
+        self.assertEqual(group['endpoints'], ['GET order_list'])
+        self.assertIn('"status" = ?', group['fingerprint'])
+        entry = group['latest']
+        self.assertTrue(any(frame.startswith('laundry/views.py') for frame in entry['stack']))
+        self.assertIn('laundry_order_status_date', entry['plan'])
+
+        response = self.client.get(reverse('slow_queries'))
+        self.assertContains(response, 'GET order_list')
+
+    def test_parameter_values_are_not_kept(self):
+        customer = Customer.objects.create(name='Secret Sauce', phone='08099990000')
+        with self.settings(LAUNDRY_SLOW_QUERY_MS=0):
+            self.client.get(reverse('customer_list'), {'q': 'Secret Sauce'})
+            self.client.get(reverse('customer_detail', args=[customer.pk]))
+        session_key = self.client.session.session_key
+        password = User.objects.get(pk=self.admin.pk).password
+        entries = instrumentation.slow_queries.entries()
+        self.assertTrue(any('django_session' in entry['fingerprint'] for entry in entries))
+        self.assertTrue(any('str(32)' in entry['params'] for entry in entries))
+
+        page = self.client.get(reverse('slow_queries')).content.decode()
+        for secret in (session_key, password, 'Secret Sauce', '08099990000'):
+            self.assertNotIn(secret, repr(entries))
+            self.assertNotIn(secret, page)
+
+
+    def test_failed_queries_are_not_recorded(self):
+        metrics = instrumentation.RequestMetrics(RequestFactory().get('/'))
+        with self.settings(LAUNDRY_SLOW_QUERY_MS=0), connection.execute_wrapper(metrics):
+            with self.assertRaises(DatabaseError), connection.cursor() as cursor:
+                cursor.execute('SELECT * FROM laundry_no_such_table')
+        self.assertEqual(metrics.queries, 1)
+        self.assertEqual(instrumentation.slow_queries.entries(), [])
+
+
+class SeedBenchmarkTest(TestCase):
+    def test_seeded_data_is_consistent(self):
+        call_command(
+            'seed_benchmark', customers=30, orders=200, items=600, staff=3, days=30, chunk_size=70, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(username__startswith='bench-').count(), 4)
+        self.assertEqual(Customer.objects.count(), 30)
+        self.assertEqual(LaundryOrder.objects.count(), 200)
+        self.assertGreater(OrderItem.objects.count(), 400)
+        self.assertEqual(Customer.objects.drifted().count(), 0)
+
+        summary = DailyOrderSummary.objects.aggregate(orders=Sum('order_count'), total=Sum('total_price'))
+        orders = LaundryOrder.objects.aggregate(total=Sum('total_price'))
+        self.assertEqual((summary['orders'], summary['total']), (200, orders['total']))
+        self.assertEqual(
+            set(ProcessingQueue.objects.values_list('order_id', flat=True)),
+            set(LaundryOrder.objects.filter(status__in=ProcessingQueue.STAGES).values_list('pk', flat=True)),
+        )
+
+        # Live orders continue the seeded numbering
+        order = LaundryOrder.objects.create(
+            customer=Customer.objects.first(), expected_delivery_date=timezone.localdate(),
+        )
+        self.assertEqual(LaundryOrder.objects.filter(order_number=order.order_number).count(), 1)
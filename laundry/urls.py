@@ -9,6 +9,7 @@ urlpatterns = [
     path('order/new/', views.create_order, name='create_order'),
     path('orders/', views.order_list, name='order_list'),
     path('orders/export/', views.export_orders_csv, name='export_orders_csv'),
+    path('orders/export/xlsx/', views.export_orders_xlsx, name='export_orders_xlsx'),
     path('order/<int:order_id>/', views.order_detail, name='order_detail'),
     path('order/<int:order_id>/edit/', views.create_order, name='order_update'), # Reusing view for edits
     
@@ -20,4 +21,11 @@ urlpatterns = [
     path('customers/<int:customer_id>/', views.customer_detail, name='customer_detail'),
     path('customers/', views.customer_list, name='customer_list'),
     path('customers/export/', views.export_customers_csv, name='export_customers_csv'),
+    path('customers/lookup/', views.customer_phone_lookup, name='customer_phone_lookup'),
+    path('search/', views.quick_search, name='quick_search'),
+    path('scan/', views.scan_station, name='scan_station'),
+    path('scan/code/', views.scan_code, name='scan_code'),
+    path('scan/batch/', views.scan_batch, name='scan_batch'),
+    path('queue/', views.queue_board, name='queue_board'),
+    path('queue/events/', views.queue_events, name='queue_events'),
 ]
\ No newline at end of file
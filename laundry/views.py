@@ -1,12 +1,24 @@
-import csv
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.db.models import Count, Sum, Max, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
-from .models import Customer, LaundryOrder, OrderItem, ClothingType
+from .models import (
+    Customer, DailyOrderSummary, LaundryOrder, OrderItem, ClothingType, ProcessingQueue, local_day_range,
+)
+from .pricing import deferred_repricing
+from .exports import iter_values, streaming_csv_response, streaming_xlsx_response
+from .pagination import KeysetPaginator
+from . import caching, events, instrumentation, phones, scanning, search
+from django.conf import settings
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from asgiref.sync import sync_to_async
 from .forms import (
     CustomerForm, 
     LaundryOrderForm, 
@@ -14,8 +26,19 @@ from .forms import (
     OrderItemFormSet, 
     CustomerRegistrationForm
 )
+import datetime
+import json
 import random
 import string
+from decimal import Decimal
+
+CUSTOMERS_PER_PAGE = 50
+ORDERS_PER_PAGE = 50
+DASHBOARD_ORDERS_PER_PAGE = 10
+QUICK_SEARCH_LIMIT = 10
+MAX_BATCH_SCANS = 500
+# Seconds between keep-alive comments on idle event streams
+EVENT_STREAM_KEEPALIVE = 15
 
 # Create your views here.
 # Helper functions for permission checks
@@ -39,53 +62,51 @@ def dashboard(request):
     """Main dashboard view for all users"""
     context = {}
     
+    today = timezone.localdate()
+    scope = caching.request_scope(request) + (today,)
+    
     if request.user.user_type == 'admin' or request.user.is_superuser:
-        # Admin dashboard
-        total_orders = LaundryOrder.objects.count()
-        pending_orders = LaundryOrder.objects.filter(payment_status='pending').count()
-        today_orders = LaundryOrder.objects.filter(
-            registered_at__date=timezone.now().date()
-        ).count()
-        
-        # Overall system revenue (from all users)
-        overall_revenue = LaundryOrder.objects.aggregate(
-            total=Sum('amount_paid')
-        )['total'] or 0
-        
-        # Admin's personal revenue (orders handled by current admin)
-        admin_revenue = LaundryOrder.objects.filter(
-            staff=request.user
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        # Admin dashboard: every figure from one query over the daily summary
+        def admin_data():
+            data = DailyOrderSummary.objects.aggregate(
+                total_orders=Coalesce(Sum('order_count'), 0),
+                pending_orders=Coalesce(Sum('pending_count'), 0),
+                today_orders=Coalesce(Sum('order_count', filter=Q(day=today)), 0),
+                # Overall system revenue (from all users)
+                overall_revenue=Coalesce(Sum('amount_paid'), Decimal('0')),
+                # Admin's personal revenue (orders handled by current admin)
+                admin_revenue=Coalesce(Sum('amount_paid', filter=Q(staff=request.user)), Decimal('0')),
+            )
+            data['recent_orders'] = _recent_orders_page(request, LaundryOrder.objects.all())
+            return data
         
-        context.update({
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'today_orders': today_orders,
-            'overall_revenue': overall_revenue,
-            'admin_revenue': admin_revenue,
-            'recent_orders': LaundryOrder.objects.all()[:10],
-        })
+        context.update(caching.cached('dashboard', scope, [caching.ORDERS, caching.CUSTOMERS], admin_data))
+        context['page_obj'] = context['recent_orders']
     else:
         # Staff dashboard
-        staff_orders = LaundryOrder.objects.filter(staff=request.user).count()
-        staff_pending = LaundryOrder.objects.filter(
-            staff=request.user,
-            payment_status='pending'
-        ).count()
-        
-        staff_revenue = LaundryOrder.objects.filter(
-            staff=request.user
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        def staff_data():
+            data = DailyOrderSummary.objects.filter(staff=request.user).aggregate(
+                staff_orders=Coalesce(Sum('order_count'), 0),
+                staff_pending=Coalesce(Sum('pending_count'), 0),
+                staff_revenue=Coalesce(Sum('amount_paid'), Decimal('0')),
+            )
+            data['my_orders'] = _recent_orders_page(request, LaundryOrder.objects.filter(staff=request.user))
+            return data
         
-        context.update({
-            'staff_orders': staff_orders,
-            'staff_pending': staff_pending,
-            'staff_revenue': staff_revenue,
-            'my_orders': LaundryOrder.objects.filter(staff=request.user)[:10],
-        })
+        depends = [caching.staff_orders(request.user.pk), caching.CUSTOMERS]
+        context.update(caching.cached('dashboard', scope, depends, staff_data))
+        context['page_obj'] = context['my_orders']
     
     return render(request, 'laundry/dashboard.html', context)
 
+def _recent_orders_page(request, orders):
+    """Dashboard activity list: 10 orders per page, newest first"""
+    return KeysetPaginator(
+        orders.select_related('customer', 'staff'),
+        ('-registered_at', '-id'),
+        per_page=DASHBOARD_ORDERS_PER_PAGE,
+    ).page(request.GET.get('cursor'))
+
 # @login_required
 # @user_passes_test(is_staff)
 # def create_order(request):
@@ -152,14 +173,10 @@ def _get_filtered_orders(request):
     else:
         orders = LaundryOrder.objects.select_related('customer', 'staff').filter(staff=request.user).order_by('-order_date')
     
-    # Basic Text Search
+    # Basic Text Search (order number, customer name, phone) via the search index
     query = request.GET.get('q')
     if query:
-        orders = orders.filter(
-            Q(order_number__icontains=query) | 
-            Q(customer__name__icontains=query) |
-            Q(customer__phone__icontains=query)
-        )
+        orders = search.filter_orders(orders, query)
 
     # Status Filter
     status_filter = request.GET.get('status')
@@ -171,10 +188,15 @@ def _get_filtered_orders(request):
     if payment_filter:
         orders = orders.filter(payment_status=payment_filter)
 
-    # Date Filter
+    # Date Filter (a range on order_date, so the index is used)
     date_filter = request.GET.get('date')
     if date_filter:
-        orders = orders.filter(order_date__date=date_filter)
+        try:
+            start, end = local_day_range(datetime.date.fromisoformat(date_filter))
+        except ValueError:
+            pass
+        else:
+            orders = orders.filter(order_date__gte=start, order_date__lt=end)
 
     # Staff Filter (Admin Only)
     staff_filter = request.GET.get('staff')
@@ -185,45 +207,84 @@ def _get_filtered_orders(request):
 
 @login_required
 def order_list(request):
-    orders = _get_filtered_orders(request)
+    is_admin_user = request.user.is_superuser or request.user.user_type == 'admin'
+
+    def page():
+        orders = _get_filtered_orders(request)
+        return KeysetPaginator(orders, ('-order_date', '-id'), per_page=ORDERS_PER_PAGE).page(
+            request.GET.get('cursor'), with_count=True
+        )
+
+    # Admins all see the same list; staff only their own orders
+    if is_admin_user:
+        depends = [caching.ORDERS, caching.CUSTOMERS]
+    else:
+        depends = [caching.staff_orders(request.user.pk), caching.CUSTOMERS]
+    page_obj = caching.cached('order_list', caching.request_scope(request, per_user=not is_admin_user), depends, page)
 
     # Context data for filter dropdowns
     User = get_user_model()
-    staff_list = User.objects.filter(is_active=True) if (request.user.is_superuser or request.user.user_type == 'admin') else None
+    staff_list = User.objects.filter(is_active=True) if is_admin_user else None
 
     return render(request, 'laundry/order_list.html', {
-        'orders': orders,
+        'orders': page_obj,
+        'page_obj': page_obj,
         'order_status_choices': LaundryOrder.ORDER_STATUS,
         'payment_status_choices': LaundryOrder.PAYMENT_STATUS,
         'staff_list': staff_list
     })
 
+ORDER_EXPORT_HEADER = ['Order #', 'Customer', 'Staff', 'Total Price', 'Paid', 'Balance', 'Status', 'Payment', 'Date']
+
+
+def _order_export_rows(orders):
+    """Order history rows for the exports (the date is left as a datetime)"""
+    status_labels = dict(LaundryOrder.ORDER_STATUS)
+    payment_labels = dict(LaundryOrder.PAYMENT_STATUS)
+
+    # Plain tuples straight from the cursor; no model instances are built
+    for (order_number, customer_name, staff_username, total_price, amount_paid,
+         balance, status, payment_status, order_date) in iter_values(orders, [
+            'order_number', 'customer__name', 'staff__username', 'total_price',
+            'amount_paid', 'balance', 'status', 'payment_status', 'order_date']):
+        yield [
+            order_number,
+            customer_name,
+            staff_username or 'N/A',
+            total_price,
+            amount_paid,
+            balance,
+            status_labels.get(status, status),
+            payment_labels.get(payment_status, payment_status),
+            order_date,
+        ]
+
 @login_required
 @user_passes_test(is_admin)
 def export_orders_csv(request):
     """Export filtered orders to a CSV file"""
     orders = _get_filtered_orders(request)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="order_history_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Order #', 'Customer', 'Staff', 'Total Price', 'Paid', 'Balance', 'Status', 'Payment', 'Date'])
-    
-    for order in orders:
-        writer.writerow([
-            order.order_number,
-            order.customer.name,
-            order.staff.username if order.staff else 'N/A',
-            order.total_price,
-            order.amount_paid,
-            order.balance,
-            order.get_status_display(),
-            order.get_payment_status_display(),
-            order.order_date.strftime("%Y-%m-%d %H:%M")
-        ])
-        
-    return response
+
+    def rows():
+        for row in _order_export_rows(orders):
+            row[-1] = timezone.localtime(row[-1]).strftime("%Y-%m-%d %H:%M")
+            yield row
+
+    return streaming_csv_response(
+        f'order_history_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        ORDER_EXPORT_HEADER,
+        rows(),
+    )
+
+@login_required
+@user_passes_test(is_admin)
+def export_orders_xlsx(request):
+    """Export filtered orders to an Excel workbook, streamed sheet by sheet"""
+    orders = _get_filtered_orders(request)
+    return streaming_xlsx_response(
+        f'order_history_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
+        [('Orders', ORDER_EXPORT_HEADER, _order_export_rows(orders))],
+    )
 
 @login_required
 def order_detail(request, order_id):
@@ -280,15 +341,14 @@ def create_order(request):
             if not order.expected_delivery_date:
                 order.expected_delivery_date = timezone.now().date() + timezone.timedelta(days=3)
 
-            order.save()
-
-            # SAVE ORDER ITEMS
-            item_formset.instance = order
-            item_formset.save()
-
             # 🔥 SINGLE SOURCE OF TRUTH FOR PRICING
-            order.calculate_totals()
-            order.save()
+            # Item saves only mark the order dirty; it is repriced once on exit
+            with deferred_repricing():
+                order.save()
+
+                # SAVE ORDER ITEMS
+                item_formset.instance = order
+                item_formset.save()
 
             return redirect('order_detail', order_id=order.id)
 
@@ -414,67 +474,296 @@ def _get_filtered_customers(request):
     """Helper to apply filters to customers based on request parameters"""
     customers = Customer.objects.all().order_by('-registration_date')
     
-    # Search functionality
+    # Search functionality (name, ID, registrar, date) via the search index
     query = request.GET.get('q')
     if query:
-        customers = customers.filter(
-            Q(name__icontains=query) |
-            Q(customer_id__icontains=query) |
-            Q(registered_by__username__icontains=query) |
-            Q(registration_date__icontains=query)
-        )
+        customers = search.filter_customers(customers, query)
     return customers
 
+@login_required
+def quick_search(request):
+    """Best-ranked orders and customers for the search-as-you-type box (JSON)"""
+    query = request.GET.get('q', '')
+    limit = QUICK_SEARCH_LIMIT
+
+    # Staff only see their own orders; restrict before the limit is taken
+    visible = None
+    if not (request.user.is_superuser or request.user.user_type == 'admin'):
+        visible = LaundryOrder.objects.filter(staff=request.user).values('pk')
+    order_ids = search.ranked_ids(search.ORDER, query, limit, within=visible)
+    customer_ids = search.ranked_ids(search.CUSTOMER, query, limit)
+    if order_ids is None:
+        return JsonResponse({'orders': [], 'customers': []})
+    if phones.is_phone_query(query):
+        # Phone matches first: staff typing digits are looking someone up
+        phone_ids = list(Customer.objects.by_phone(query).order_by('-pk').values_list('pk', flat=True)[:limit])
+        customer_ids = (phone_ids + [pk for pk in customer_ids if pk not in phone_ids])[:limit]
+
+    orders = LaundryOrder.objects.filter(pk__in=order_ids).select_related('customer')
+    if visible is not None:
+        orders = orders.filter(staff=request.user)
+    orders = {o.pk: o for o in search.filter_orders(orders, query)}
+    customers = {c.pk: c for c in search.filter_customers(Customer.objects.filter(pk__in=customer_ids), query)}
+
+    return JsonResponse({
+        'orders': [
+            {
+                'id': orders[pk].pk,
+                'order_number': orders[pk].order_number,
+                'customer': orders[pk].customer.name,
+                'status': orders[pk].get_status_display(),
+                'url': reverse('order_detail', args=[pk]),
+            }
+            for pk in order_ids if pk in orders
+        ],
+        'customers': [
+            {
+                'id': customers[pk].pk,
+                'customer_id': customers[pk].customer_id,
+                'name': customers[pk].name,
+                'phone': customers[pk].phone,
+                'url': reverse('customer_detail', args=[pk]),
+            }
+            for pk in customer_ids if pk in customers
+        ],
+    })
+
+@login_required
+def customer_phone_lookup(request):
+    """
+    Resolve a phone number (any format, any of the three phone fields) or
+    its last few digits to customers (JSON). ``exact=1`` skips suffix matches.
+    """
+    number = request.GET.get('phone', '')
+    exact = request.GET.get('exact') == '1'
+    customers = Customer.objects.by_phone(number, exact=exact).order_by('-pk')[:QUICK_SEARCH_LIMIT]
+    return JsonResponse({
+        'customers': [
+            {
+                'id': customer.pk,
+                'customer_id': customer.customer_id,
+                'name': customer.name,
+                'phone': customer.phone,
+                'whatsapp_number': customer.whatsapp_number,
+                'alternate_phone': customer.alternate_phone,
+                'url': reverse('customer_detail', args=[customer.pk]),
+            }
+            for customer in customers
+        ],
+    })
+
+def _scan_result(code, order, item):
+    return {
+        'code': code,
+        'order': {
+            'id': order.pk,
+            'order_number': order.order_number,
+            'customer': order.customer.name,
+            'status': order.status,
+            'status_display': order.get_status_display(),
+            'url': reverse('order_detail', args=[order.pk]),
+        },
+        'item': item and {
+            'id': item.pk,
+            'tag_code': item.tag_code,
+            'clothing_type': item.clothing_type.name,
+            'quantity': item.quantity,
+        },
+    }
+
+def _scan_staff(user):
+    """Whose orders ``user`` may scan (None: everyone's)"""
+    return None if (user.is_superuser or user.user_type == 'admin') else user
+
+@login_required
+def scan_station(request):
+    """Counter page for barcode scanners: scan a tag or receipt, optionally move its order on"""
+    return render(request, 'laundry/scan.html', {'statuses': LaundryOrder.ORDER_STATUS})
+
+@login_required
+def scan_code(request):
+    """
+    Resolve a scanned tag code or order number (JSON). POST with ``status``
+    also moves the order to that status.
+    """
+    data = request.POST if request.method == 'POST' else request.GET
+    code = data.get('code', '').strip()
+    staff = _scan_staff(request.user)
+    if request.method == 'POST':
+        status = data.get('status')
+        if status not in dict(LaundryOrder.ORDER_STATUS):
+            return JsonResponse({'code': code, 'error': 'Invalid status'}, status=400)
+        found = scanning.scan(code, status, user=request.user, staff=staff)
+    else:
+        found = scanning.resolve(code, staff=staff)
+    if not found:
+        return JsonResponse({'code': code, 'error': 'Unknown code'}, status=404)
+    order, item = found[:2]
+    return JsonResponse(_scan_result(code, order, item))
+
+@login_required
+@require_POST
+def scan_batch(request):
+    """
+    Apply a pile of scans at once (JSON body ``{"status": ..., "codes": [...]}``)
+    and report the outcome of each one.
+    """
+    try:
+        payload = json.loads(request.body)
+        status, codes = payload['status'], payload['codes']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"status": ..., "codes": [...]}'}, status=400)
+    if status not in dict(LaundryOrder.ORDER_STATUS):
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        return JsonResponse({'error': 'codes must be a list of strings'}, status=400)
+    if len(codes) > MAX_BATCH_SCANS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_SCANS} scans per request'}, status=400)
+
+    results = scanning.ingest(codes, status, user=request.user, staff=_scan_staff(request.user))
+    counts = {outcome: 0 for outcome in (scanning.MOVED, scanning.UNCHANGED, scanning.UNKNOWN)}
+    for result in results:
+        counts[result['result']] += 1
+    return JsonResponse({'status': status, 'counts': counts, 'results': results})
+
+@login_required
+def queue_board(request):
+    """Wall-screen queue board; the cards arrive over queue_events"""
+    stages = [(stage, label) for stage, label in LaundryOrder.ORDER_STATUS if stage in ProcessingQueue.STAGES]
+    return render(request, 'laundry/queue_display.html', {'stages': stages})
+
+def _sse(kind, data):
+    return f"event: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+@login_required
+async def queue_events(request):
+    """
+    Server-sent events for the queue board: a ``snapshot`` of every card,
+    then ``orders`` deltas as entries move, are claimed or leave the board.
+    Serve it from an ASGI server (see laundry_system/asgi.py); each open
+    stream holds a connection. Under WSGI the endless stream would be
+    buffered to an end that never comes, tying up a worker thread per
+    screen, so it is refused there.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "The live queue board needs the ASGI server: uvicorn laundry_system.asgi:application",
+            status=501, content_type='text/plain',
+        )
+    # Subscribe before reading, so no change falls between the two
+    subscription = events.broker.subscribe()
+    try:
+        snapshot = await sync_to_async(ProcessingQueue.board)()
+    except BaseException:
+        subscription.close()
+        raise
+
+    async def stream():
+        try:
+            yield _sse('snapshot', snapshot)
+            while True:
+                event = await subscription.get(timeout=EVENT_STREAM_KEEPALIVE)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event is events.RESET:
+                    # Too far behind: the browser reconnects and gets a new snapshot
+                    yield _sse('reset', None)
+                    return
+                else:
+                    yield _sse(*event)
+        finally:
+            subscription.close()
+
+    return StreamingHttpResponse(stream(), content_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 @login_required
 def customer_list(request):
-    customers = _get_filtered_customers(request)
-    
-    # Calculate ranking base
-    max_spent = customers.aggregate(max_val=Max('total_spent'))['max_val'] or 0
-    
-    for customer in customers:
-        # Calculate rank: 1-5 stars
-        if max_spent > 0:
-            rank = round((float(customer.total_spent) / float(max_spent)) * 5)
-            customer.rank = int(rank) if rank > 0 else (1 if customer.total_spent > 0 else 0)
-        else:
-            customer.rank = 0
-            
-        customer.star_range = range(customer.rank)
-        customer.empty_star_range = range(5 - customer.rank)
+    def page():
+        # Rank: 1-5 stars, computed by the database over the whole filtered list
+        filtered = _get_filtered_customers(request)
+        customers = filtered.select_related('registered_by').with_star_rank(over=filtered)
+
+        page_obj = KeysetPaginator(customers, ('-registration_date', '-id'), per_page=CUSTOMERS_PER_PAGE).page(
+            request.GET.get('cursor'), with_count=True
+        )
+        for customer in page_obj:
+            customer.rank = customer.star_rank
+            customer.star_range = range(customer.rank)
+            customer.empty_star_range = range(5 - customer.rank)
+        return page_obj
+
+    # Same list for every user; totals (and so ranks) move with order writes
+    page_obj = caching.cached(
+        'customer_list', caching.request_scope(request, per_user=False),
+        [caching.CUSTOMERS, caching.ORDERS], page,
+    )
         
-    return render(request, 'laundry/customer_list.html', {'customers': customers})
+    return render(request, 'laundry/customer_list.html', {
+        'customers': page_obj,
+        'page_obj': page_obj,
+    })
 
 @login_required
 @user_passes_test(is_admin)
 def export_customers_csv(request):
     """Export filtered customers to a CSV file"""
     customers = _get_filtered_customers(request)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="customer_list_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'Customer ID', 'Phone', 'Email', 'Total Spent', 'Date Registered'])
-    
-    for customer in customers:
-        writer.writerow([
-            customer.name,
-            customer.customer_id,
-            customer.phone,
-            customer.email or 'N/A',
-            customer.total_spent,
-            customer.registration_date.strftime("%Y-%m-%d")
-        ])
-        
-    return response
+
+    def rows():
+        for name, customer_id, phone, email, total_spent, registration_date in iter_values(customers, [
+                'name', 'customer_id', 'phone', 'email', 'total_spent', 'registration_date']):
+            yield [
+                name,
+                customer_id,
+                phone,
+                email or 'N/A',
+                total_spent,
+                registration_date.strftime("%Y-%m-%d")
+            ]
+
+    return streaming_csv_response(
+        f'customer_list_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        ['Name', 'Customer ID', 'Phone', 'Email', 'Total Spent', 'Date Registered'],
+        rows(),
+    )
 
 @login_required
 def customer_detail(request, customer_id):
     customer = get_object_or_404(Customer, id=customer_id)
-    orders = customer.orders.select_related('staff').order_by('-order_date')
+    orders = customer.orders.select_related('staff')
+    page_obj = KeysetPaginator(orders, ('-order_date', '-id'), per_page=ORDERS_PER_PAGE).page(
+        request.GET.get('cursor'), with_count=True
+    )
     
     return render(request, 'laundry/customer_detail.html', {
         'customer': customer,
-        'orders': orders
-    })
\ No newline at end of file
+        'orders': page_obj,
+        'page_obj': page_obj,
+    })
+
+
+def request_metrics(request):
+    """Admin page: rolling per-endpoint request timings (see instrumentation)"""
+    if request.method == 'POST':
+        instrumentation.summary.clear()
+        return redirect('request_metrics')
+    return render(request, 'admin/request_metrics.html', {
+        'title': 'Request metrics',
+        'rows': instrumentation.summary.rows(),
+        'window': instrumentation.summary.window,
+    })
+
+
+def slow_queries(request):
+    """Admin page: recent slow queries grouped by statement fingerprint"""
+    if request.method == 'POST':
+        instrumentation.slow_queries.clear()
+        return redirect('slow_queries')
+    return render(request, 'admin/slow_queries.html', {
+        'title': 'Slow queries',
+        'groups': instrumentation.slow_queries.groups(),
+        'threshold': getattr(settings, 'LAUNDRY_SLOW_QUERY_MS', None),
+    })
@@ -3,6 +3,18 @@ ASGI config for laundry_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the live queue board's event stream (laundry.views.queue_events) from
+here: each wall screen holds one open connection, which an ASGI server parks
+in its event loop instead of tying up a worker thread. uvicorn is in
+requirements.txt; run the whole site with it, in development too:
+
+    uvicorn laundry_system.asgi:application --host 0.0.0.0 --port 8000
+
+Changes reach screens through the in-process broker in laundry/events.py,
+so run a single worker process (uvicorn's default; see that module). Under
+WSGI (runserver, WSGI_APPLICATION) the stream answers 501 instead of
+hanging, and the rest of the site works as before.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
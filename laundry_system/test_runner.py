@@ -0,0 +1,18 @@
+"""
+Test runner for the project: query budgets (LAUNDRY_QUERY_BUDGETS) raise
+QueryBudgetExceeded during tests, so a view that regresses to per-row
+queries fails the suite instead of logging a warning.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class LaundryTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict_budgets = override_settings(LAUNDRY_QUERY_BUDGET_RAISE=True)
+        self._strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
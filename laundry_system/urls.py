@@ -18,12 +18,20 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+
+from laundry.views import request_metrics, slow_queries
 
 urlpatterns = [
+    path('admin/request-metrics/', admin.site.admin_view(request_metrics), name='request_metrics'),
+    path('admin/slow-queries/', admin.site.admin_view(slow_queries), name='slow_queries'),
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
+    path('reports/', include('reports.urls')),
     path('', include('laundry.urls')),  # Main laundry app URLs
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # runserver serves these itself; uvicorn (laundry_system/asgi.py) does not
+    urlpatterns += staticfiles_urlpatterns()
@@ -0,0 +1,83 @@
+"""
+End-of-day batch printing of receipts and garment tags.
+
+Orders, items and clothing types are loaded in bulk, copied into plain
+objects and split into chunks; the chunks are rendered in parallel on a
+process pool and their pages joined into one PDF. Workers never touch the
+database or Django, so the pool works with any multiprocessing start method.
+
+The pool belongs in ``manage.py print_end_of_day``, not in web requests:
+the admin actions render at most MAX_SYNC_ORDERS orders, in-process.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from laundry.models import LaundryOrder, OrderItem, local_day_range
+
+from .pdf import join_pdfs
+from .utils import RENDERERS, render_pdf
+
+KINDS = tuple(RENDERERS)
+# Orders per worker task; small enough to spread a day's orders over the pool
+CHUNK_SIZE = 50
+# Most rendering processes one batch starts, whatever the CPU count
+MAX_WORKERS = 4
+# Most orders rendered inside a web request (a couple of seconds of tags)
+MAX_SYNC_ORDERS = 200
+
+
+def end_of_day_orders(day=None):
+    """Orders that are ready, or were registered on ``day`` (default: today)"""
+    start, end = local_day_range(day or timezone.localdate())
+    return LaundryOrder.objects.filter(
+        Q(status='ready') | Q(registered_at__gte=start, registered_at__lt=end)
+    ).order_by('pk')
+
+
+def _copy(instance, fields, **related):
+    return SimpleNamespace(**{field: getattr(instance, field) for field in fields}, **related)
+
+
+def load_batch(orders):
+    """
+    ``(order, items)`` pairs for ``orders`` (a queryset) as plain, picklable
+    copies, in two queries.
+    """
+    orders = orders.select_related('customer').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('clothing_type').order_by('pk'))
+    )
+    batch = []
+    for order in orders:
+        items = [
+            _copy(item, ('tag_code', 'quantity', 'price_per_item', 'total_price', 'rewashing'),
+                  clothing_type=_copy(item.clothing_type, ('name',)))
+            for item in order.items.all()
+        ]
+        copy = _copy(order, (
+            'pk', 'order_number', 'registered_at', 'expected_delivery_date', 'is_urgent',
+            'subtotal', 'urgent_fee', 'total_price', 'amount_paid', 'balance',
+        ), customer=_copy(order.customer, ('name', 'customer_id')))
+        batch.append((copy, items))
+    return batch
+
+
+def render_batch(orders, kind='receipts', workers=None, chunk_size=CHUNK_SIZE):
+    """
+    One PDF (bytes) with the receipts or tags of every order in ``orders``.
+    Renders in-process when there is only one chunk or ``workers`` is 1;
+    never starts more than MAX_WORKERS processes.
+    """
+    batch = load_batch(orders)
+    chunks = [batch[start:start + chunk_size] for start in range(0, len(batch), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, MAX_WORKERS, len(chunks))
+    if workers <= 1:
+        return render_pdf(kind, batch)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        documents = list(pool.map(partial(render_pdf, kind), chunks))
+    return join_pdfs(documents)
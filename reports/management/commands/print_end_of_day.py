@@ -0,0 +1,62 @@
+"""
+Render the closing-time print run into one PDF.
+
+    python manage.py print_end_of_day
+    python manage.py print_end_of_day --kind tags --date 2026-03-14 --workers 4
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports.batch import CHUNK_SIZE, KINDS, MAX_WORKERS, end_of_day_orders, render_batch
+
+
+class Command(BaseCommand):
+    help = "Render receipts or garment tags for every ready order and every order registered that day"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=KINDS, default='receipts')
+        parser.add_argument(
+            '--date', metavar='YYYY-MM-DD',
+            help="Day whose new orders are included (default: today)",
+        )
+        parser.add_argument(
+            '--output', metavar='PATH',
+            help="Where to write the PDF (default: <kind>-<date>.pdf)",
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help=f"Rendering processes (default: one per CPU, at most {MAX_WORKERS})",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f"Orders per worker task (default: {CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date: {options['date']}")
+
+        orders = end_of_day_orders(day)
+        count = orders.count()
+        if not count:
+            self.stdout.write(f"No orders to print for {day}")
+            return
+
+        kind = options['kind']
+        started = time.perf_counter()
+        document = render_batch(
+            orders, kind=kind, workers=options['workers'], chunk_size=max(1, options['chunk_size']),
+        )
+        output = options['output'] or f'{kind}-{day}.pdf'
+        with open(output, 'wb') as handle:
+            handle.write(document)
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind}: {count} order(s) written to {output} in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,21 @@
+"""
+Concatenate rendered documents into one PDF.
+
+Batch printing renders chunks of receipts in separate processes; this
+stitches their pages back together without re-rendering, through pypdf's
+writer (it parses each document properly, so it does not depend on the
+layout ReportLab happens to write).
+"""
+import io
+
+from pypdf import PdfReader, PdfWriter
+
+
+def join_pdfs(documents):
+    """One PDF (bytes) with the pages of every document in ``documents``, in order"""
+    writer = PdfWriter()
+    for document in documents:
+        writer.append(PdfReader(io.BytesIO(document)))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
@@ -0,0 +1,86 @@
+"""
+Receipt PDFs, rendered once per version of an order.
+
+A receipt only shows the order, its customer and its items, so a hash of
+exactly those fields names the cached file:
+
+    <LAUNDRY_RECEIPT_CACHE_DIR>/<order id>-<version>.pdf
+
+Adding items, repricing, payments or a customer rename all change the
+version, so the next request renders a new file (and removes the order's
+older ones); reprinting an unchanged order is a file read. The version is
+also the response's ETag, so browsers revalidate without a download.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from laundry.models import LaundryOrder
+
+from .utils import generate_receipt_pdf
+
+# Bump when the receipt layout changes so cached files are re-rendered
+LAYOUT_VERSION = 2
+
+
+def load_order(order_id):
+    """The order with everything its receipt needs, in two queries"""
+    order = LaundryOrder.objects.select_related('customer', 'staff').get(pk=order_id)
+    items = list(order.items.select_related('clothing_type').order_by('pk'))
+    return order, items
+
+
+def receipt_version(order, items):
+    parts = [
+        LAYOUT_VERSION, order.pk, order.order_number, order.registered_at.isoformat(),
+        order.customer.name, order.customer.customer_id,
+        order.is_urgent, order.subtotal, order.urgent_fee, order.total_price,
+        order.amount_paid, order.balance,
+    ]
+    for item in items:
+        parts.append([
+            item.pk, item.clothing_type.name, item.quantity,
+            item.price_per_item, item.total_price, item.rewashing,
+        ])
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()[:20]
+
+
+def cache_dir():
+    return Path(getattr(settings, 'LAUNDRY_RECEIPT_CACHE_DIR', settings.BASE_DIR / 'receipt_cache'))
+
+
+def cached_receipt(order, items, version=None):
+    """
+    The receipt PDF for this version of the order, opened for reading and
+    rendered if needed. It is opened here rather than returned as a path:
+    a concurrent request for a newer version may remove the file at any
+    moment, and an open file stays readable after that.
+    """
+    version = version or receipt_version(order, items)
+    directory = cache_dir()
+    path = directory / f'{order.pk}-{version}.pdf'
+    try:
+        return path.open('rb')
+    except FileNotFoundError:
+        pass
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Write aside and rename, so a concurrent reader never sees half a file
+    fd, temp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            temp.write(generate_receipt_pdf(order, items).getbuffer())
+        receipt = open(temp_name, 'rb')
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+    for stale in directory.glob(f'{order.pk}-*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return receipt
@@ -1,3 +1,237 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+
+from laundry.models import ClothingType, Customer, LaundryOrder, OrderItem
+from laundry.tests import read_xlsx
+
+from reports import receipts
+from reports import batch
+from reports.batch import end_of_day_orders, render_batch
+
+User = get_user_model()
+
+
+class SalesReportViewTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='manager', password='testpass123', user_type='admin')
+        self.staff = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+        shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        gown = ClothingType.objects.create(name='Gown', price=Decimal('1500.00'), urgent_price=Decimal('2000.00'))
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+
+        for quantity, item_type, status in ((3, shirt, 'ready'), (1, gown, 'pending'), (2, shirt, 'ready')):
+            order = LaundryOrder.objects.create(
+                customer=customer, staff=self.staff, expected_delivery_date=timezone.now().date(),
+            )
+            OrderItem.objects.create(order=order, clothing_type=item_type, quantity=quantity)
+            order.status = status
+            order.save()
+
+    def test_report_reads_fact_tables(self):
+        self.client.login(username='manager', password='testpass123')
+        today = timezone.localdate()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('sales_report'), {
+                'start_date': (today - datetime.timedelta(days=365)).isoformat(),
+                'end_date': today.isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        scanned = [q['sql'] for q in queries if 'FROM "laundry_laundryorder"' in q['sql'] or 'FROM "laundry_orderitem"' in q['sql']]
+        self.assertEqual(scanned, [])
+
+        report = response.context['report_data']
+        self.assertEqual(report['total_orders'], 3)
+        self.assertEqual(report['total_revenue'], Decimal('4000.00'))
+        self.assertEqual(report['average_order_value'], Decimal('4000.00') / 3)
+        self.assertEqual(
+            [(row['status'], row['count']) for row in report['orders_by_status']],
+            [('ready', 2), ('pending', 1)],
+        )
+        self.assertEqual(
+            [(row['clothing_type__name'], row['total_quantity']) for row in report['top_items']],
+            [('Shirt', 5), ('Gown', 1)],
+        )
+        self.assertEqual([row['orders'] for row in report['daily']], [3])
+
+    def test_excel_export(self):
+        self.client.login(username='manager', password='testpass123')
+        response = self.client.get(reverse('sales_report'), {'export': 'excel'})
+        self.assertTrue(response.streaming)
+        sheets = read_xlsx(b''.join(response.streaming_content))
+        self.assertEqual(list(sheets), ['Summary', 'Daily', 'Orders by Status', 'Top Items'])
+        self.assertIn(['Orders', '3'], sheets['Summary'])
+        self.assertEqual(len(sheets['Daily']), 2)
+        self.assertEqual(
+            [(name, int(quantity), Decimal(revenue)) for name, quantity, revenue in sheets['Top Items'][1:]],
+            [('Shirt', 5, Decimal('2500')), ('Gown', 1, Decimal('1500'))],
+        )
+
+    def test_range_excludes_other_days(self):
+        self.client.login(username='manager', password='testpass123')
+        response = self.client.get(reverse('sales_report'), {'start_date': '2020-01-01', 'end_date': '2020-01-31'})
+        self.assertEqual(response.context['report_data']['total_orders'], 0)
+
+    def test_staff_cannot_view_report(self):
+        self.client.login(username='counter', password='testpass123')
+        response = self.client.get(reverse('sales_report'))
+        self.assertEqual(response.status_code, 403)
+
+
+class ReceiptPdfTest(TestCase):
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(LAUNDRY_RECEIPT_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.staff = User.objects.create_user(username='counter', password='testpass123', user_type='staff')
+        User.objects.create_user(username='other', password='testpass123', user_type='staff')
+        self.shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        self.order = LaundryOrder.objects.create(
+            customer=customer, staff=self.staff, expected_delivery_date=timezone.now().date(),
+        )
+        OrderItem.objects.create(order=self.order, clothing_type=self.shirt, quantity=2)
+        self.url = reverse('receipt_pdf', args=[self.order.pk])
+        self.client.login(username='counter', password='testpass123')
+
+    def test_renders_once_per_version(self):
+        with mock.patch('reports.receipts.generate_receipt_pdf', wraps=receipts.generate_receipt_pdf) as render:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            etag = response['ETag']
+
+            again = self.client.get(self.url)
+            b''.join(again.streaming_content)
+            self.assertEqual(again['ETag'], etag)
+            self.assertEqual(render.call_count, 1)
+
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(render.call_count, 1)
+
+    def test_order_change_renders_new_version(self):
+        first = self.client.get(self.url)
+        b''.join(first.streaming_content)
+        OrderItem.objects.create(order=self.order, clothing_type=self.shirt, quantity=1, rewashing=True)
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        b''.join(second.streaming_content)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        # The superseded file is removed
+        self.assertEqual(len(list(self.cache_dir.glob(f'{self.order.pk}-*.pdf'))), 1)
+
+    def test_file_removed_before_it_is_read(self):
+        b''.join(self.client.get(self.url).streaming_content)
+        # A concurrent request for a newer version removes this one first
+        real_open = Path.open
+
+        def open_after_removal(path, *args, **kwargs):
+            path.unlink(missing_ok=True)
+            return real_open(path, *args, **kwargs)
+
+        with mock.patch.object(Path, 'open', open_after_removal):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_other_staff_denied(self):
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+def page_count(document):
+    return len(PdfReader(io.BytesIO(document)).pages)
+
+
+class BatchPrintTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='boss', password='testpass123', user_type='admin')
+        shirt = ClothingType.objects.create(name='Shirt', price=Decimal('500.00'), urgent_price=Decimal('800.00'))
+        customer = Customer.objects.create(name='Ada Eze', phone='08031234567')
+        self.orders = []
+        for quantity in (1, 2, 3, 4, 5):
+            order = LaundryOrder.objects.create(
+                customer=customer, staff=self.admin, expected_delivery_date=timezone.now().date(),
+            )
+            OrderItem.objects.create(order=order, clothing_type=shirt, quantity=quantity)
+            self.orders.append(order)
+        # Registered last week: only printed while it is ready
+        last_week = timezone.now() - datetime.timedelta(days=7)
+        LaundryOrder.objects.filter(pk__in=[self.orders[0].pk, self.orders[1].pk]).update(registered_at=last_week)
+        LaundryOrder.objects.filter(pk=self.orders[0].pk).update(status='ready')
+
+    def test_end_of_day_selection(self):
+        selected = list(end_of_day_orders().values_list('pk', flat=True))
+        self.assertEqual(selected, [self.orders[0].pk] + [order.pk for order in self.orders[2:]])
+
+    def test_parallel_render_matches_serial(self):
+        orders = LaundryOrder.objects.order_by('pk')
+        with self.assertNumQueries(2):
+            serial = render_batch(orders, kind='tags', workers=1)
+        parallel = render_batch(orders, kind='tags', workers=2, chunk_size=2)
+        self.assertEqual(page_count(serial), 15)
+        self.assertEqual(page_count(parallel), 15)
+
+        receipts_pdf = render_batch(orders, kind='receipts', workers=2, chunk_size=2)
+        self.assertTrue(receipts_pdf.startswith(b'%PDF'))
+        self.assertEqual(page_count(receipts_pdf), 5)
+
+    def test_joined_pdf_reads_back(self):
+        orders = LaundryOrder.objects.order_by('pk')
+        serial = PdfReader(io.BytesIO(render_batch(orders, kind='receipts', workers=1)), strict=True)
+        joined = PdfReader(io.BytesIO(render_batch(orders, kind='receipts', workers=2, chunk_size=2)), strict=True)
+        self.assertEqual(len(joined.pages), 5)
+        for page, expected, order in zip(joined.pages, serial.pages, self.orders):
+            text = page.extract_text()
+            self.assertIn(order.order_number, text)
+            self.assertEqual(text, expected.extract_text())
+
+    def test_worker_count_is_capped(self):
+        orders = LaundryOrder.objects.order_by('pk')
+        with mock.patch.object(batch, 'MAX_WORKERS', 2), \
+                mock.patch.object(batch, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            render_batch(orders, kind='tags', workers=16, chunk_size=1)
+        self.assertEqual(pool.call_args.kwargs['max_workers'], 2)
+
+    def test_command_writes_pdf(self):
+        output = Path(tempfile.mkdtemp()) / 'receipts.pdf'
+        self.addCleanup(shutil.rmtree, output.parent, ignore_errors=True)
+        call_command('print_end_of_day', output=str(output), workers=2, chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(page_count(output.read_bytes()), 4)
+
+    def test_admin_action(self):
+        self.client.login(username='boss', password='testpass123')
+        response = self.client.post(reverse('admin:laundry_laundryorder_changelist'), {
+            'action': 'print_tags', '_selected_action': [self.orders[0].pk, self.orders[1].pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(page_count(response.content), 3)
+
+    def test_admin_action_leaves_big_runs_to_the_command(self):
+        self.client.login(username='boss', password='testpass123')
+        with mock.patch('laundry.admin.MAX_SYNC_ORDERS', 1), mock.patch('laundry.admin.render_batch') as render:
+            response = self.client.post(reverse('admin:laundry_laundryorder_changelist'), {
+                'action': 'print_tags', '_selected_action': [self.orders[0].pk, self.orders[1].pk],
+            }, follow=True)
+        render.assert_not_called()
+        self.assertContains(response, 'print_end_of_day --kind tags')
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('sales/', views.SalesReportView.as_view(), name='sales_report'),
+    path('receipt/<int:order_id>/', views.receipt_pdf, name='receipt_pdf'),
+]
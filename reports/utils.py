@@ -1,52 +1,137 @@
+from reportlab.graphics.barcode import code128
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from io import BytesIO
 
-def generate_receipt_pdf(order):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    
-    # Company header
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(1*inch, 10.5*inch, "Clean & Fresh Laundry")
-    
-    # Order details
-    p.setFont("Helvetica", 10)
+# Standard PDF fonts have no naira sign
+CURRENCY = "NGN "
+# Garment tag labels, one per page
+TAG_SIZE = (2.25*inch, 1.25*inch)
+
+
+def _money(value):
+    return f"{CURRENCY}{value:,.2f}"
+
+
+def draw_barcode(p, value, x, y, height, bar_width=0.011*inch):
+    """Code128 barcode of ``value`` with its lower left corner at (x, y)"""
+    barcode = code128.Code128(value, barHeight=height, barWidth=bar_width, humanReadable=False)
+    barcode.drawOn(p, x, y)
+    return barcode.width
+
+
+def draw_receipt(p, order, items):
+    """Draw one order's receipt on ``p``, starting a new page as items run over"""
+    def header():
+        p.setFont("Helvetica-Bold", 16)
+        p.drawString(1*inch, 10.5*inch, "Clean & Fresh Laundry")
+        p.setFont("Helvetica", 10)
+
+    header()
+
+    # Order details; the barcode is scanned at the counter (laundry.scanning)
+    draw_barcode(p, order.order_number, 5*inch, 10*inch, 0.5*inch)
     p.drawString(1*inch, 10*inch, f"Receipt #: {order.order_number}")
     p.drawString(1*inch, 9.7*inch, f"Date: {order.registered_at.strftime('%Y-%m-%d %H:%M')}")
-    p.drawString(1*inch, 9.4*inch, f"Customer: {order.customer.name}")
-    
+    p.drawString(1*inch, 9.4*inch, f"Customer: {order.customer.name} ({order.customer.customer_id})")
+
     # Items table
     y = 9*inch
     p.drawString(1*inch, y, "Item")
     p.drawString(4*inch, y, "Qty")
     p.drawString(5*inch, y, "Price")
-    p.drawString(7*inch, y, "Total")
-    
+    p.drawString(6.5*inch, y, "Total")
+
     y -= 0.3*inch
-    for item in order.items.all():
-        p.drawString(1*inch, y, item.clothing_type.name)
+    for item in items:
+        if y < 1.5*inch:
+            p.showPage()
+            header()
+            y = 10*inch
+        name = item.clothing_type.name + (" (rewash)" if item.rewashing else "")
+        p.drawString(1*inch, y, name)
         p.drawString(4*inch, y, str(item.quantity))
-        p.drawString(5*inch, y, f"${item.unit_price}")
-        p.drawString(7*inch, y, f"${item.subtotal}")
+        p.drawString(5*inch, y, _money(item.price_per_item))
+        p.drawString(6.5*inch, y, _money(item.total_price))
         y -= 0.3*inch
-    
+
     # Totals
+    lines = [("Subtotal:", order.subtotal)]
+    if order.is_urgent:
+        lines.append(("Urgent Fee:", order.urgent_fee))
+    if order.amount_paid:
+        lines.append(("Paid:", order.amount_paid))
+        lines.append(("Balance:", order.balance))
+    if y < (len(lines) + 2) * 0.3*inch + 1*inch:
+        p.showPage()
+        header()
+        y = 10*inch
+
     y -= 0.3*inch
-    p.drawString(5*inch, y, "Subtotal:")
-    p.drawString(7*inch, y, f"${order.total_amount - order.express_charge}")
-    
-    if order.express_service:
+    for label, value in lines:
+        p.drawString(5*inch, y, label)
+        p.drawString(6.5*inch, y, _money(value))
         y -= 0.3*inch
-        p.drawString(5*inch, y, "Express Charge:")
-        p.drawString(7*inch, y, f"${order.express_charge}")
-    
-    y -= 0.3*inch
+
     p.setFont("Helvetica-Bold", 12)
     p.drawString(5*inch, y, "TOTAL:")
-    p.drawString(7*inch, y, f"${order.total_amount}")
-    
+    p.drawString(6.5*inch, y, _money(order.total_price))
+    p.showPage()
+
+
+def draw_tags(p, order, items):
+    """Draw a scannable tag for every garment of ``order``, one tag per page"""
+    for item in items:
+        for piece in range(1, item.quantity + 1):
+            p.setPageSize(TAG_SIZE)
+            p.setFont("Helvetica-Bold", 12)
+            p.drawString(0.12*inch, 1.05*inch, order.order_number)
+            if order.is_urgent:
+                p.drawRightString(2.13*inch, 1.05*inch, "URGENT")
+            p.setFont("Helvetica", 7)
+            p.drawString(0.12*inch, 0.92*inch, order.customer.name[:45])
+            name = item.clothing_type.name + (" (rewash)" if item.rewashing else "")
+            p.drawString(0.12*inch, 0.8*inch, f"{name[:35]}  {piece}/{item.quantity}")
+            p.drawString(0.12*inch, 0.68*inch, f"Due: {order.expected_delivery_date:%Y-%m-%d}")
+
+            width = draw_barcode(p, item.tag_code, 0.12*inch, 0.22*inch, 0.4*inch)
+            p.setFont("Helvetica-Bold", 9)
+            p.drawString(0.12*inch + width + 0.08*inch, 0.36*inch, item.tag_code)
+            p.showPage()
+
+
+RENDERERS = {
+    'receipts': (draw_receipt, letter),
+    'tags': (draw_tags, TAG_SIZE),
+}
+
+
+def render_pdf(kind, orders):
+    """
+    One PDF (bytes) with a receipt or the tags for each ``(order, items)``
+    pair. Only reads attributes, so it also runs in worker processes on
+    plain copies of the data.
+    """
+    draw, pagesize = RENDERERS[kind]
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=pagesize)
+    for order, items in orders:
+        draw(p, order, items)
+    p.save()
+    return buffer.getvalue()
+
+
+def generate_receipt_pdf(order, items=None):
+    """
+    Render ``order``'s receipt. Pass ``items`` (with clothing types loaded)
+    to avoid querying them again.
+    """
+    if items is None:
+        items = order.items.select_related('clothing_type')
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    draw_receipt(p, order, items)
     p.save()
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
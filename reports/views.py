@@ -1,30 +1,154 @@
+import datetime
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Sum
+from django.http import FileResponse, Http404
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.views import View
+
+from laundry.exports import streaming_xlsx_response
+from laundry.models import DailyItemSales, DailyOrderSummary, DailyStatusCount, LaundryOrder
+
+from . import receipts
+
+# Range shown when no dates are given
+DEFAULT_REPORT_DAYS = 30
+TOP_ITEMS = 10
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def top_items(start_date, end_date, limit=TOP_ITEMS):
+    """Clothing types by garments cleaned in the range (all of them when ``limit`` is None)"""
+    rows = DailyItemSales.objects.filter(day__range=[start_date, end_date]).values('clothing_type__name').annotate(
+        total_quantity=Sum('quantity'), revenue=Sum('revenue'),
+    ).filter(total_quantity__gt=0).order_by('-total_quantity')
+    return rows[:limit] if limit else rows
+
+
+def daily_breakdown(start_date, end_date):
+    return DailyOrderSummary.objects.filter(day__range=[start_date, end_date]).values('day').annotate(
+        orders=Sum('order_count'), revenue=Sum('total_price'), paid=Sum('amount_paid'),
+    ).filter(orders__gt=0).order_by('day')
+
+
+def build_sales_report(start_date, end_date):
+    """
+    Sales figures for ``start_date``..``end_date`` (inclusive), read from the
+    daily fact tables: about one row per day (and status/clothing type)
+    instead of every order and item in the range.
+    """
+    days = {'day__range': [start_date, end_date]}
+
+    totals = DailyOrderSummary.objects.filter(**days).aggregate(
+        total_orders=Sum('order_count'),
+        total_revenue=Sum('total_price'),
+        amount_paid=Sum('amount_paid'),
+    )
+    total_orders = totals['total_orders'] or 0
+    total_revenue = totals['total_revenue'] or 0
+
+    status_labels = dict(LaundryOrder.ORDER_STATUS)
+    orders_by_status = [
+        {'status': row['status'], 'label': status_labels.get(row['status'], row['status']), 'count': row['count']}
+        for row in DailyStatusCount.objects.filter(**days).values('status').annotate(
+            count=Sum('order_count')
+        ).filter(count__gt=0).order_by('-count')
+    ]
+
+    return {
+        'total_orders': total_orders,
+        'total_revenue': total_revenue,
+        'amount_paid': totals['amount_paid'] or 0,
+        'average_order_value': total_revenue / total_orders if total_orders else 0,
+        'orders_by_status': orders_by_status,
+        'top_items': list(top_items(start_date, end_date)),
+        'daily': list(daily_breakdown(start_date, end_date)),
+    }
+
 
-# Create your views here.
 class SalesReportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        user = self.request.user
+        return user.is_superuser or user.user_type == 'admin'
+
     def get(self, request):
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        
-        if start_date and end_date:
-            orders = LaundryOrder.objects.filter(
-                registered_at__date__range=[start_date, end_date]
-            )
-            
-            # Generate report data
-            report_data = {
-                'total_orders': orders.count(),
-                'total_revenue': orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
-                'average_order_value': orders.aggregate(Avg('total_amount'))['total_amount__avg'] or 0,
-                'orders_by_status': orders.values('status').annotate(count=Count('id')),
-                'top_items': OrderItem.objects.filter(
-                    order__in=orders
-                ).values('clothing_type__name').annotate(
-                    total_quantity=Sum('quantity')
-                ).order_by('-total_quantity')[:10]
-            }
-            
-            if request.GET.get('export') == 'excel':
-                return self.export_to_excel(report_data, start_date, end_date)
-        
-        return render(request, 'reports/sales_report.html', context)
\ No newline at end of file
+        end_date = _parse_date(request.GET.get('end_date')) or timezone.localdate()
+        start_date = _parse_date(request.GET.get('start_date')) or (
+            end_date - datetime.timedelta(days=DEFAULT_REPORT_DAYS - 1)
+        )
+        if start_date > end_date:
+            start_date, end_date = end_date, start_date
+
+        report_data = build_sales_report(start_date, end_date)
+        if request.GET.get('export') == 'excel':
+            return self.export_to_excel(report_data, start_date, end_date)
+
+        context = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'report_data': report_data,
+        }
+        return render(request, 'reports/sales_report.html', context)
+
+    def export_to_excel(self, report_data, start_date, end_date):
+        """Summary, per-day breakdown, status and top-items sheets, streamed"""
+        summary = [
+            ['From', start_date],
+            ['To', end_date],
+            ['Orders', report_data['total_orders']],
+            ['Revenue', report_data['total_revenue']],
+            ['Collected', report_data['amount_paid']],
+            ['Average order value', round(report_data['average_order_value'], 2)],
+        ]
+        daily = (
+            [row['day'], row['orders'], row['revenue'], row['paid']]
+            for row in daily_breakdown(start_date, end_date).iterator()
+        )
+        statuses = ([row['label'], row['count']] for row in report_data['orders_by_status'])
+        items = (
+            [row['clothing_type__name'], row['total_quantity'], row['revenue']]
+            for row in top_items(start_date, end_date, limit=None).iterator()
+        )
+        return streaming_xlsx_response(f'sales_report_{start_date}_{end_date}.xlsx', [
+            ('Summary', ['Metric', 'Value'], summary),
+            ('Daily', ['Date', 'Orders', 'Revenue', 'Collected'], daily),
+            ('Orders by Status', ['Status', 'Orders'], statuses),
+            ('Top Items', ['Item', 'Quantity', 'Revenue'], items),
+        ])
+
+
+@login_required
+def receipt_pdf(request, order_id):
+    """
+    The order's receipt as a PDF, from the on-disk cache. The ETag is the
+    receipt version, so an unchanged receipt is answered with 304.
+    """
+    try:
+        order, items = receipts.load_order(order_id)
+    except LaundryOrder.DoesNotExist:
+        raise Http404("No such order")
+    if not (request.user.is_superuser or request.user.user_type == 'admin' or order.staff_id == request.user.pk):
+        raise PermissionDenied
+
+    version = receipts.receipt_version(order, items)
+    etag = f'"{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(
+            receipts.cached_receipt(order, items, version),
+            content_type='application/pdf', filename=f'receipt_{order.order_number}.pdf',
+        )
+    response['ETag'] = etag
+    # Always revalidate: the receipt changes whenever the order does
+    response['Cache-Control'] = 'private, no-cache'
+    return response